@@ -0,0 +1,84 @@
+"""
+Password hashing and token validation benchmark.
+
+Fires a burst of concurrent logins (one password verification each) at an
+event loop that also runs a 10ms heartbeat, first verifying inline as a
+plain ``async def`` handler would and then on the password pool
+(``verify_password_async``). Reports login throughput and the worst
+heartbeat delay, i.e. how long every other request on the worker would
+have stalled. Then times ``get_current_user`` with and without the token
+claims cache.
+
+Usage:
+    python benchmarks/auth_throughput.py [--logins N] [--scheme bcrypt]
+"""
+import argparse
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from propfair_api import auth
+from propfair_api.auth import create_access_token, get_current_user
+
+
+async def heartbeat(delays: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        delays.append(time.perf_counter() - start - 0.01)
+
+
+async def login_burst(logins: int, hashed: str, pooled: bool):
+    async def login():
+        if pooled:
+            return await auth.verify_password_async("secret", hashed)
+        return auth.verify_password("secret", hashed)
+
+    delays: list = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(delays, stop))
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    assert all(results)
+    return logins / elapsed, max(delays) * 1000
+
+
+async def token_overhead(requests: int, cached: bool) -> float:
+    token = create_access_token({"sub": "user-1", "email": "ana@example.com"})
+    start = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            auth.token_cache.clear()
+        await get_current_user(token)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def run(args) -> None:
+    auth.pwd_context = CryptContext(schemes=[args.scheme])
+    hashed = auth.hash_password("secret")
+    workers = auth.settings.password_hash_workers
+    print(f"{args.logins} concurrent logins ({args.scheme}, {workers} pool workers)")
+    for label, pooled in (("inline", False), ("pool", True)):
+        throughput, stall = await login_burst(args.logins, hashed, pooled)
+        print(f"  {label:<8} {throughput:8.1f} logins/s   worst event-loop stall {stall:8.1f} ms")
+
+    print(f"get_current_user over {args.requests} requests")
+    for label, cached in (("uncached", False), ("cached", True)):
+        print(f"  {label:<8} {await token_overhead(args.requests, cached):8.1f} us/request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--scheme", default="bcrypt", help="passlib scheme to hash with")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
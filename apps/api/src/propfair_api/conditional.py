@@ -0,0 +1,109 @@
+"""
+Conditional GET: strong ETags and Last-Modified from the columns a response
+is built from, so a revalidation whose validators still match is answered
+with an empty 304 before the body is serialized.
+"""
+import hashlib
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from propfair_api.models import Listing
+
+# Bump when a response schema changes, so cached bodies of the old shape miss
+RESPONSE_VERSION = "1"
+
+# Shared caches may store responses but must revalidate them every time
+REVALIDATE = "public, no-cache"
+
+
+def listing_version(listing: Listing) -> tuple[Any, ...]:
+    """Columns a listing's response changes with (last_seen_at moves every crawl)."""
+    return (
+        listing.id,
+        listing.content_hash,
+        listing.updated_at,
+        listing.last_seen_at,
+        listing.is_active,
+        # Set by offline backfills that don't bump updated_at
+        listing.latitude,
+        listing.longitude,
+        listing.coordinates_approximate,
+        listing.barrio,
+        listing.localidad,
+    )
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag over the given values (None, datetimes and tuples included)."""
+    digest = hashlib.sha256(RESPONSE_VERSION.encode())
+    for part in parts:
+        value = part.isoformat() if isinstance(part, datetime) else repr(part)
+        digest.update(value.encode())
+        digest.update(b"\x00")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def latest(values: Iterable[Optional[datetime]]) -> Optional[datetime]:
+    present = [_aware(value) for value in values if value is not None]
+    return max(present) if present else None
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole seconds
+    return _aware(last_modified).replace(microsecond=0) <= _aware(since)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if last_modified is not None:
+        utc = _aware(last_modified).astimezone(timezone.utc)
+        headers["Last-Modified"] = format_datetime(utc, usegmt=True)
+    return headers
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    A 304 when the request's validators match, else None after setting the
+    validators on ``response``. ``If-None-Match`` takes precedence over
+    ``If-Modified-Since`` (RFC 9110).
+    """
+    headers = validator_headers(etag, last_modified)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = (
+            if_modified_since is not None
+            and last_modified is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        )
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
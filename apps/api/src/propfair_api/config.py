@@ -1,10 +1,24 @@
-from pydantic_settings import BaseSettings
 from pydantic import Field
+from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     # Database
     database_url: str = Field(default="sqlite:///:memory:")
+    # Read replicas for read-only routes; they fail over to the primary
+    database_replica_urls: list[str] = []
+    # Seconds a replica that failed to connect is skipped
+    database_replica_retry_seconds: float = 30
+
+    # Connection pools (PostgreSQL), for the primary and for each replica
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_replica_pool_size: int = 10
+    db_replica_max_overflow: int = 20
+    db_replica_pool_timeout: float = 5
+    db_replica_pool_recycle: int = 1800
 
     # Redis
     redis_url: str = Field(default="redis://localhost:6379/0")
@@ -15,9 +29,66 @@ class Settings(BaseSettings):
     secret_key: str = Field(default="test-secret-key-not-for-production")
     debug: bool = False
 
+    # Heatmap tiles written by the scrapers (propfair_scrapers.heatmap)
+    heatmap_tiles_path: str = "heatmap.mbtiles"
+
+    # Map pins endpoint: most pins per response, and seconds a payload is cached
+    map_points_limit: int = 100_000
+    map_points_cache_ttl: float = 300
+
+    # Rate limiting: token buckets per client and route class ("N/second|minute|hour").
+    # "memory" keeps buckets per worker; "redis" shares them through redis_url
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limits: dict[str, str] = {
+        "auth": "20/minute",
+        "search": "300/minute",
+        "tiles": "3000/minute",
+        "export": "30/hour",
+        "default": "600/minute",
+    }
+    # Signed-in users get this many times the anonymous (per-IP) limits
+    rate_limit_authenticated_factor: float = 2.0
+
+    # Load shedding: fast 503s instead of queueing for a database connection
+    shed_max_db_in_flight: int = 30
+    shed_max_pool_wait_ms: float = 250
+    shed_retry_after_seconds: int = 1
+
+    # Database timing: Server-Timing header, /metrics, and a log of statements
+    # slower than slow_query_ms (with their plan when slow_query_explain is set)
+    server_timing_enabled: bool = True
+    slow_query_ms: float = 200
+    slow_query_explain: bool = False
+
+    # Startup warmup, reported by /ready: pooled connections opened per database,
+    # URLs requested once to prime caches, and seconds between retries of failed steps
+    warmup_enabled: bool = True
+    warmup_db_connections: int = 5
+    warmup_urls: list[str] = [
+        "/api/v1/listings",
+        "/api/v1/listings?city=Bogotá",
+        "/api/v1/analysis/neighborhoods?city=Bogotá",
+    ]
+    warmup_retry_seconds: float = 5
+
+    # Request profiler, installed only when enabled: profiles a random sample of
+    # requests and any with a signed X-Profile header (python -m propfair_api.profiling),
+    # written as collapsed stacks to profile_dir (the profile_keep newest are kept)
+    profiling_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5
+    profile_token_ttl_seconds: float = 300
+    profile_dir: str = "profiles"
+    profile_keep: int = 200
+
     # Auth
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    # Threads hashing/verifying passwords (bcrypt) off the event loop
+    password_hash_workers: int = 2
+    # Validated access tokens kept in memory until they expire
+    token_cache_size: int = 1024
 
     class Config:
         env_file = ".env"
@@ -1,22 +1,140 @@
+import itertools
+import logging
+import threading
+import time
 from collections.abc import Generator
+from typing import Any
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
 
 from propfair_api.config import settings
+from propfair_api.instrumentation import install_query_hooks, record_pool_wait
+from propfair_api.throttling import load_shedder
+
+logger = logging.getLogger(__name__)
+
+
+def make_engine(
+    url: str,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+) -> Engine:
+    # Pool sizing only applies to PostgreSQL (SQLite uses its own pools)
+    engine_kwargs: dict[str, Any] = {"pool_pre_ping": True}
+    if url.startswith("postgresql"):
+        engine_kwargs.update(
+            {
+                "pool_size": pool_size,
+                "max_overflow": max_overflow,
+                "pool_timeout": pool_timeout,
+                "pool_recycle": pool_recycle,
+            }
+        )
+    return create_engine(url, **engine_kwargs)
 
-# Create engine with PostgreSQL-specific settings only for PostgreSQL
-engine_kwargs = {"pool_pre_ping": True}
-if settings.database_url.startswith("postgresql"):
-    engine_kwargs.update({"pool_size": 10, "max_overflow": 20})
 
-engine = create_engine(settings.database_url, **engine_kwargs)
+engine = make_engine(
+    settings.database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+install_query_hooks()
+
+
+class ReplicaSet:
+    """
+    Read replicas taken round robin. A replica whose connection checkout
+    fails (``pool_pre_ping`` health check, refused connection, pool timeout)
+    is skipped for ``retry_after`` seconds; with none healthy, reads go to
+    ``primary``.
+    """
+
+    def __init__(self, replicas: list[Engine], primary: Engine, retry_after: float = 30):
+        self.replicas = replicas
+        self.primary = primary
+        self.retry_after = retry_after
+        self._down_until: dict[Engine, float] = {}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def candidates(self) -> list[Engine]:
+        """Healthy replicas starting from the next in turn, then the primary."""
+        now = time.monotonic()
+        healthy = [replica for replica in self.replicas if self._down_until.get(replica, 0) <= now]
+        if healthy:
+            start = next(self._turn) % len(healthy)
+            healthy = healthy[start:] + healthy[:start]
+        return healthy + [self.primary]
+
+    def mark_down(self, replica: Engine) -> None:
+        with self._lock:
+            self._down_until[replica] = time.monotonic() + self.retry_after
+
+
+replicas = ReplicaSet(
+    [
+        make_engine(
+            url,
+            pool_size=settings.db_replica_pool_size,
+            max_overflow=settings.db_replica_max_overflow,
+            pool_timeout=settings.db_replica_pool_timeout,
+            pool_recycle=settings.db_replica_pool_recycle,
+        )
+        for url in settings.database_replica_urls
+    ],
+    engine,
+    retry_after=settings.database_replica_retry_seconds,
+)
+
+
+def _connect(db: Session) -> None:
+    # Check the connection out up front so the pool wait is measured
+    start = time.perf_counter()
+    db.connection()
+    waited = time.perf_counter() - start
+    load_shedder.record_pool_wait(waited)
+    record_pool_wait(waited)
+
 
 def get_db_session() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    """Session on the primary, for routes that write."""
+    with load_shedder.admit():
+        db = SessionLocal()
+        try:
+            _connect(db)
+            yield db
+        finally:
+            db.close()
+
+
+def get_read_session() -> Generator[Session, None, None]:
+    """Session on a healthy read replica (the primary without replicas), for read-only routes."""
+    with load_shedder.admit():
+        for candidate in replicas.candidates():
+            db = SessionLocal(bind=candidate)
+            try:
+                _connect(db)
+                break
+            except (DBAPIError, PoolTimeoutError):
+                db.close()
+                if candidate is replicas.primary:
+                    raise
+                logger.warning(
+                    "Read replica %s unavailable, failing over", candidate.url, exc_info=True
+                )
+                replicas.mark_down(candidate)
+        try:
+            yield db
+        finally:
+            db.close()
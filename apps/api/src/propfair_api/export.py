@@ -0,0 +1,240 @@
+"""
+Bulk export of listings, optionally with their price history, as NDJSON or CSV.
+
+Usage:
+    python -m propfair_api.export --output listings.ndjson.gz [--format csv] [--history]
+        [--city Bogotá] [--after-id ID] [--updated-since 2026-03-01]
+
+Listings are read in primary-key order through a server-side cursor, in
+batches of ``batch_size`` (plus one price-history query per batch), so
+memory stays constant however many rows are exported. Every record carries
+its ``id``: an interrupted export resumes from the last id written with
+``after_id`` (``--after-id``). The same generator backs the
+``/api/v1/export/listings`` endpoint.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any, Optional, TextIO
+
+from sqlalchemy import Select, create_engine, select
+from sqlalchemy.orm import Session
+
+from propfair_api.models import Listing, PriceHistory
+
+COLUMNS = [
+    "id",
+    "source",
+    "external_id",
+    "url",
+    "title",
+    "price",
+    "admin_fee",
+    "bedrooms",
+    "bathrooms",
+    "parking_spaces",
+    "area",
+    "estrato",
+    "address",
+    "neighborhood",
+    "barrio",
+    "localidad",
+    "city",
+    "latitude",
+    "longitude",
+    "is_active",
+    "first_seen_at",
+    "last_seen_at",
+    "updated_at",
+]
+FORMATS = ("ndjson", "csv")
+DEFAULT_BATCH_SIZE = 1000
+
+# A listing row by column name, plus "price_history" when asked for
+Record = dict[str, Any]
+
+
+def export_query(
+    city: Optional[str] = None,
+    barrio: Optional[str] = None,
+    localidad: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    bedrooms: Optional[int] = None,
+    include_inactive: bool = False,
+    updated_since: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+) -> Select[Any]:
+    query = select(*(getattr(Listing, column) for column in COLUMNS))
+    if not include_inactive:
+        query = query.where(Listing.is_active)
+    if city:
+        query = query.where(Listing.city == city)
+    if barrio:
+        query = query.where(Listing.barrio == barrio)
+    if localidad:
+        query = query.where(Listing.localidad == localidad)
+    if min_price:
+        query = query.where(Listing.price >= min_price)
+    if max_price:
+        query = query.where(Listing.price <= max_price)
+    if bedrooms:
+        query = query.where(Listing.bedrooms >= bedrooms)
+    if updated_since:
+        query = query.where(Listing.updated_at >= updated_since)
+    # Keyset order: resuming after the last exported id skips nothing
+    if after_id:
+        query = query.where(Listing.id > after_id)
+    return query.order_by(Listing.id)
+
+
+def _history(session: Session, listing_ids: list[str]) -> dict[str, list[Record]]:
+    history: dict[str, list[Record]] = {listing_id: [] for listing_id in listing_ids}
+    rows = session.execute(
+        select(
+            PriceHistory.listing_id,
+            PriceHistory.price,
+            PriceHistory.admin_fee,
+            PriceHistory.recorded_at,
+        )
+        .where(PriceHistory.listing_id.in_(listing_ids))
+        .order_by(PriceHistory.listing_id, PriceHistory.recorded_at)
+    )
+    for listing_id, price, admin_fee, recorded_at in rows:
+        history[listing_id].append(
+            {"price": price, "admin_fee": admin_fee, "recorded_at": recorded_at}
+        )
+    return history
+
+
+def iter_records(
+    session: Session,
+    query: Select[Any],
+    with_history: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[Record]:
+    """Listing dicts (with ``price_history`` if asked) streamed from a server-side cursor."""
+    result = session.execute(query.execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        records = [dict(zip(COLUMNS, row)) for row in batch]
+        if with_history:
+            history = _history(session, [record["id"] for record in records])
+            for record in records:
+                record["price_history"] = history[record["id"]]
+        yield from records
+
+
+def _json_default(value: object) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def ndjson_lines(records: Iterator[Record]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def csv_lines(
+    records: Iterator[Record], with_history: bool = False, header: bool = True
+) -> Iterator[str]:
+    """CSV rows (after a header row); price history is a JSON array in its own column."""
+    columns = COLUMNS + ["price_history"] if with_history else COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for record in records:
+        if with_history:
+            history = json.dumps(record["price_history"], default=_json_default)
+            record = dict(record, price_history=history)
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (record[column] for column in columns)
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_lines(
+    records: Iterator[Record],
+    format: str = "ndjson",
+    with_history: bool = False,
+    header: bool = True,
+) -> Iterator[str]:
+    if format == "csv":
+        return csv_lines(records, with_history, header)
+    return ndjson_lines(records)
+
+
+def _open_output(path: str, append: bool) -> TextIO:
+    # gzip members can be concatenated, so resuming appends to .gz files too
+    if path.endswith(".gz"):
+        return gzip.open(path, "at" if append else "wt", encoding="utf-8", newline="")
+    return open(path, "a" if append else "w", encoding="utf-8", newline="")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--output", required=True, help="File to write; gzipped if it ends in .gz")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument(
+        "--history", action="store_true", help="Include each listing's price history"
+    )
+    parser.add_argument("--city")
+    parser.add_argument("--include-inactive", action="store_true")
+    parser.add_argument("--updated-since", type=datetime.fromisoformat)
+    parser.add_argument("--after-id", help="Resume after this listing id, appending to --output")
+    args = parser.parse_args(argv)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL not set", file=sys.stderr)
+        return 1
+
+    query = export_query(
+        city=args.city,
+        include_inactive=args.include_inactive,
+        updated_since=args.updated_since,
+        after_id=args.after_id,
+    )
+    progress: dict[str, Any] = {"last_id": args.after_id, "exported": 0}
+
+    def tracked(records: Iterator[Record]) -> Iterator[Record]:
+        # A record counts once its line has been written (the next one is asked for)
+        for record in records:
+            yield record
+            progress["last_id"] = record["id"]
+            progress["exported"] += 1
+
+    engine = create_engine(database_url)
+    try:
+        with Session(engine) as session, _open_output(
+            args.output, append=bool(args.after_id)
+        ) as output:
+            records = tracked(iter_records(session, query, args.history))
+            for line in export_lines(records, args.format, args.history, header=not args.after_id):
+                output.write(line)
+    except KeyboardInterrupt:
+        print(f"Interrupted; resume with --after-id {progress['last_id']}", file=sys.stderr)
+        return 130
+    finally:
+        engine.dispose()
+    print(
+        f"Exported {progress['exported']} listings to {args.output} "
+        f"(last id {progress['last_id']})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
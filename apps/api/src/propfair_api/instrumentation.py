@@ -0,0 +1,190 @@
+"""
+Database timing per request.
+
+SQLAlchemy cursor events time every statement. ``TimingMiddleware`` collects
+the statements of each request, together with its connection pool checkout
+wait (``record_pool_wait``), and reports them:
+
+- ``Server-Timing`` response header: total database time, pool wait, each
+  statement in order (``sql-1``, ``sql-2``, ...) and the remaining
+  application time (handler code, serialization)
+- ``/metrics``: statement latency and rows per operation, pool wait and
+  request latency per route
+
+Statements slower than ``slow_query_ms`` are logged with their bound
+parameters and, with ``slow_query_explain``, the query plan.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExceptionContext
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from propfair_api.config import settings
+from propfair_api.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statements listed one by one in Server-Timing; the rest only count in "db"
+MAX_TIMED_STATEMENTS = 10
+
+
+@dataclass
+class RequestTimings:
+    # (seconds, rows or -1 when the driver doesn't report them)
+    statements: list[tuple[float, int]] = field(default_factory=list)
+    pool_wait: float = 0.0
+
+    @property
+    def db_time(self) -> float:
+        return sum(duration for duration, _ in self.statements)
+
+    @property
+    def rows(self) -> int:
+        return sum(rows for _, rows in self.statements if rows > 0)
+
+    def server_timing(self, total: float) -> str:
+        summary = f"{len(self.statements)} queries/{self.rows} rows"
+        entries = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{summary}"',
+            f"pool;dur={self.pool_wait * 1000:.1f}",
+        ]
+        for number, (duration, _) in enumerate(self.statements[:MAX_TIMED_STATEMENTS], 1):
+            entries.append(f"sql-{number};dur={duration * 1000:.1f}")
+        app_time = max(total - self.db_time - self.pool_wait, 0.0)
+        entries.append(f"app;dur={app_time * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record_pool_wait(seconds: float) -> None:
+    metrics.observe("db_pool_wait_seconds", seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.pool_wait += seconds
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def explain(connection: Connection, cursor: Any, statement: str, parameters: Any) -> Optional[str]:
+    """Plan of a SELECT from a fresh DBAPI cursor (no events, nothing executed)."""
+    if _operation(statement) not in ("SELECT", "WITH"):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(value) for value in row) for row in plan_cursor.fetchall())
+    except Exception:
+        logger.debug("Could not explain slow statement", exc_info=True)
+        return None
+    finally:
+        plan_cursor.close()
+
+
+def _before_cursor_execute(
+    connection: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    connection.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    connection: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    duration = time.perf_counter() - connection.info["statement_started"].pop()
+    rows = cursor.rowcount if cursor.rowcount is not None else -1
+    operation = _operation(statement)
+
+    metrics.observe("db_statement_seconds", duration, operation=operation)
+    if rows > 0:
+        metrics.inc("db_rows_total", rows, operation=operation)
+    timings = _current.get()
+    if timings is not None:
+        timings.statements.append((duration, rows))
+
+    if duration * 1000 >= settings.slow_query_ms:
+        metrics.inc("db_slow_statements_total", operation=operation)
+        plan = None
+        if settings.slow_query_explain:
+            plan = explain(connection, cursor, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms, %s rows): %s; parameters: %r%s",
+            duration * 1000,
+            rows,
+            statement,
+            parameters,
+            f"\nplan:\n{plan}" if plan else "",
+        )
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_started"):
+        connection.info["statement_started"].pop()
+
+
+def install_query_hooks() -> None:
+    """Time the statements of every engine (idempotent)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+class TimingMiddleware:
+    """ASGI middleware collecting each request's database timings."""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                header = timings.server_timing(time.perf_counter() - start)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            metrics.observe(
+                "http_request_seconds",
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+            )
@@ -1,18 +1,84 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
-from propfair_api.routers import listings, analysis, auth, favorites
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from propfair_api.config import settings
+from propfair_api.instrumentation import TimingMiddleware
+from propfair_api.metrics import metrics
+from propfair_api.profiling import ProfilerMiddleware, Sampler
+from propfair_api.routers import analysis, auth, export, favorites, listings, maps
+from propfair_api.throttling import RateLimitMiddleware, build_rate_limiter
+from propfair_api.warmup import Warmup, prime_urls, warm_database, warm_password_hashing
+
+
+async def prime_caches() -> str:
+    return await prime_urls(app, settings.warmup_urls)
+
+
+warmup = Warmup()
+warmup.add("database", warm_database)
+warmup.add("password_hashing", warm_password_hashing, required=False)
+warmup.add("caches", prime_caches, required=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if not settings.warmup_enabled:
+        warmup.skip()
+        yield
+        return
+    # In the background, so /health answers while warming
+    task = asyncio.create_task(warmup.run_until_ready(settings.warmup_retry_seconds))
+    yield
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
 
 app = FastAPI(
     title="PropFair API",
     description="Colombian Real Estate Intelligence Platform",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, limiter=build_rate_limiter())
+app.add_middleware(TimingMiddleware, server_timing=settings.server_timing_enabled)
+# Outermost, so profiles include the other middleware
+if settings.profiling_enabled:
+    app.add_middleware(
+        ProfilerMiddleware,
+        sampler=Sampler(settings.profile_interval_ms / 1000),
+        sample_rate=settings.profile_sample_rate,
+        secret=settings.secret_key,
+        token_ttl=settings.profile_token_ttl_seconds,
+        directory=settings.profile_dir,
+        keep=settings.profile_keep,
+    )
+
 app.include_router(listings.router)
 app.include_router(analysis.router)
 app.include_router(auth.router)
 app.include_router(favorites.router)
+app.include_router(maps.router)
+app.include_router(export.router)
 
 
 @app.get("/health")
 async def health_check() -> dict[str, str]:
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """503 until startup warmup has finished, with each step's status and timing."""
+    return JSONResponse(warmup.report(), status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics() -> str:
+    return metrics.render_prometheus()
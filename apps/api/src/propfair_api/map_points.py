@@ -0,0 +1,195 @@
+"""
+Map pins as a compact columnar payload.
+
+Active listings in a viewport are sent as parallel arrays instead of
+listing objects::
+
+    {"count": 3, "precision": 5, "delta": true, "truncated": false,
+     "id": ["a", "b", "c"], "lat": [460971, 12, -3], "lng": [-7408170, 40, 7],
+     "price": [2500000, 3100000, 1800000]}
+
+With ``precision`` the coordinates are integers (degrees x 10**precision);
+with ``delta`` each one after the first is the difference to the previous
+pin. Pins are sorted along a Z-order curve so that neighbours in the arrays
+are neighbours on the map and the deltas stay small. Decode with a running
+sum and divide by 10**precision. Without ``precision`` coordinates are plain
+floats. Without ids (``include_ids=False``) the ``id`` array is left out:
+random listing ids make up ~3/4 of a compressed payload, and a zoomed-out
+view of thousands of pins only needs positions and prices. The payload is
+produced and gzipped in chunks.
+"""
+import gzip
+import hashlib
+import itertools
+import json
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, Callable, Optional
+
+# (id, latitude, longitude, price)
+Point = tuple[str, float, float, int]
+
+# Filter values a cached payload is stored under
+CacheKey = tuple[Any, ...]
+
+# Array items per chunk written to the compressor
+CHUNK_ITEMS = 4096
+
+
+def snap_viewport(
+    south: float, west: float, north: float, east: float, step: float = 0.01
+) -> tuple[float, float, float, float]:
+    """Grow a viewport to a grid of ``step`` degrees so nearby viewports share a cache entry."""
+
+    def snap(value: float, direction: Callable[[float], int]) -> float:
+        # Rounding first keeps 4.6 / 0.01 = 459.99999999999994 on 460
+        return round(direction(round(value / step, 6)) * step, 6)
+
+    return (
+        snap(south, math.floor),
+        snap(west, math.floor),
+        snap(north, math.ceil),
+        snap(east, math.ceil),
+    )
+
+
+def _spread(value: int) -> int:
+    """Interleave zeros between the low 32 bits of ``value``."""
+    value &= 0xFFFFFFFF
+    value = (value | value << 16) & 0x0000FFFF0000FFFF
+    value = (value | value << 8) & 0x00FF00FF00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F0F0F0F0F
+    value = (value | value << 2) & 0x3333333333333333
+    return (value | value << 1) & 0x5555555555555555
+
+
+def z_order(points: Sequence[Point]) -> list[Point]:
+    if not points:
+        return []
+    min_lat = min(point[1] for point in points)
+    min_lng = min(point[2] for point in points)
+
+    def key(point: Point) -> int:
+        # ~1 m cells relative to the viewport corner
+        y = int((point[1] - min_lat) * 1e5)
+        x = int((point[2] - min_lng) * 1e5)
+        return _spread(y) << 1 | _spread(x)
+
+    return sorted(points, key=key)
+
+
+def _quantize(values: Iterable[float], precision: int, delta: bool) -> list[int]:
+    scale = 10 ** precision
+    result = []
+    previous = 0
+    for value in values:
+        quantized = round(value * scale)
+        result.append(quantized - previous if delta else quantized)
+        if delta:
+            previous = quantized
+    return result
+
+
+def _array(values: Sequence[object]) -> Iterator[str]:
+    yield "["
+    for start in range(0, len(values), CHUNK_ITEMS):
+        chunk = json.dumps(values[start:start + CHUNK_ITEMS], separators=(",", ":"))[1:-1]
+        yield ("," if start else "") + chunk
+    yield "]"
+
+
+def encode_points(
+    points: Sequence[Point],
+    precision: Optional[int] = 5,
+    delta: bool = True,
+    truncated: bool = False,
+    include_ids: bool = True,
+) -> Iterator[str]:
+    """The columnar JSON document in pieces."""
+    points = z_order(points)
+    header = {
+        "count": len(points),
+        "precision": precision,
+        "delta": bool(delta and precision is not None),
+        "truncated": truncated,
+    }
+    latitudes: Sequence[float] = [point[1] for point in points]
+    longitudes: Sequence[float] = [point[2] for point in points]
+    if precision is not None:
+        latitudes = _quantize(latitudes, precision, delta)
+        longitudes = _quantize(longitudes, precision, delta)
+
+    columns: list[tuple[str, Sequence[object]]] = [
+        ("lat", latitudes), ("lng", longitudes), ("price", [point[3] for point in points]),
+    ]
+    if include_ids:
+        columns.insert(0, ("id", [point[0] for point in points]))
+
+    yield json.dumps(header, separators=(",", ":"))[:-1]
+    for name, values in columns:
+        yield f',"{name}":'
+        yield from _array(values)
+    yield "}"
+
+
+def gzip_chunks(pieces: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of text pieces, yielding compressed chunks as they fill."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        data = compressor.compress(piece.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class PointsCache:
+    """Gzipped payloads by filter set, kept ``ttl`` seconds (``max_entries`` most recent)."""
+
+    def __init__(self, ttl: float = 300, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, tuple[float, bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey, now: Optional[float] = None) -> Optional[tuple[bytes, str]]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key: CacheKey, body: bytes, now: Optional[float] = None) -> str:
+        """Store a gzipped payload; returns its ETag."""
+        now = time.monotonic() if now is None else now
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        with self._lock:
+            self._entries[key] = (now + self.ttl, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def decode_points(body: bytes) -> dict[str, Any]:
+    """Inverse of ``encode_points`` + ``gzip_chunks`` (coordinates back to degrees)."""
+    payload: dict[str, Any] = json.loads(gzip.decompress(body))
+    precision = payload["precision"]
+    if precision is not None:
+        scale = 10 ** precision
+        for name in ("lat", "lng"):
+            values = payload[name]
+            if payload["delta"]:
+                values = list(itertools.accumulate(values))
+            payload[name] = [value / scale for value in values]
+    return payload
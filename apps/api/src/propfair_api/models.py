@@ -1,6 +1,7 @@
-from typing import Optional, List
+from typing import Any, Optional, List
 from datetime import datetime
 from sqlalchemy import String, Integer, Float, DateTime, Boolean, ARRAY, JSON
+from sqlalchemy import Index, UniqueConstraint, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY
 
@@ -39,7 +40,9 @@ class Listing(Base):
     floor: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     total_floors: Mapped[Optional[int]] = mapped_column("total_floors", Integer, nullable=True)
     building_age: Mapped[Optional[int]] = mapped_column("building_age", Integer, nullable=True)
-    property_condition: Mapped[Optional[str]] = mapped_column("property_condition", String, nullable=True)
+    property_condition: Mapped[Optional[str]] = mapped_column(
+        "property_condition", String, nullable=True
+    )
 
     # Location
     address: Mapped[str] = mapped_column(String)
@@ -47,6 +50,13 @@ class Listing(Base):
     city: Mapped[str] = mapped_column(String)
     latitude: Mapped[float] = mapped_column(Float)
     longitude: Mapped[float] = mapped_column(Float)
+    # City centroid stood in for a page without a map and an unknown neighborhood
+    coordinates_approximate: Mapped[bool] = mapped_column(
+        "coordinates_approximate", Boolean, default=False
+    )
+    # Official neighborhood containing the coordinates (point-in-polygon)
+    barrio: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    localidad: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
     # Media & amenities
     images: Mapped[List[str]] = mapped_column(JSON)
@@ -57,9 +67,37 @@ class Listing(Base):
     last_seen_at: Mapped[datetime] = mapped_column("last_seen_at", DateTime(timezone=True))
     is_active: Mapped[bool] = mapped_column("is_active", Boolean, default=True)
     content_hash: Mapped[str] = mapped_column("content_hash", String)
+    # Canonical property shared by the same apartment listed on several portals
+    property_id: Mapped[Optional[str]] = mapped_column("property_id", String, nullable=True)
     created_at: Mapped[datetime] = mapped_column("created_at", DateTime(timezone=True))
     updated_at: Mapped[datetime] = mapped_column("updated_at", DateTime(timezone=True))
 
+    # Same names as the Prisma schema. Search only reads active listings, so
+    # its indexes are partial; Prisma can't declare that and creates them whole
+    __table_args__ = (
+        UniqueConstraint("source", "external_id", name="listings_source_external_id_key"),
+        Index(
+            "listings_city_price_created_at_idx",
+            "city",
+            "price",
+            "created_at",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        Index(
+            "listings_created_at_idx",
+            "created_at",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        Index("listings_city_neighborhood_idx", "city", "neighborhood"),
+        Index("listings_city_barrio_idx", "city", "barrio"),
+        Index("listings_city_localidad_idx", "city", "localidad"),
+        Index("listings_property_id_idx", "property_id"),
+        Index("listings_latitude_longitude_idx", "latitude", "longitude"),
+        Index("listings_updated_at_idx", "updated_at"),
+    )
+
 
 class PriceHistory(Base):
     """Price history for tracking listing price changes."""
@@ -70,3 +108,39 @@ class PriceHistory(Base):
     price: Mapped[int] = mapped_column(Integer)
     admin_fee: Mapped[Optional[int]] = mapped_column("admin_fee", Integer, nullable=True)
     recorded_at: Mapped[datetime] = mapped_column("recorded_at", DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("price_history_listing_id_recorded_at_idx", "listing_id", "recorded_at"),
+    )
+
+
+class NeighborhoodStats(Base):
+    """Market statistics of active listings per neighborhood, maintained by the scrapers."""
+    __tablename__ = "neighborhood_stats"
+
+    city: Mapped[str] = mapped_column(String, primary_key=True)
+    # Official barrio when assigned, else the portal's neighborhood; "" is the city-wide row
+    neighborhood: Mapped[str] = mapped_column(String, primary_key=True)
+
+    active_listings: Mapped[int] = mapped_column("active_listings", Integer)
+    price_p25: Mapped[Optional[float]] = mapped_column("price_p25", Float, nullable=True)
+    price_median: Mapped[Optional[float]] = mapped_column("price_median", Float, nullable=True)
+    price_p75: Mapped[Optional[float]] = mapped_column("price_p75", Float, nullable=True)
+    price_per_m2_p25: Mapped[Optional[float]] = mapped_column(
+        "price_per_m2_p25", Float, nullable=True
+    )
+    price_per_m2_median: Mapped[Optional[float]] = mapped_column(
+        "price_per_m2_median", Float, nullable=True
+    )
+    price_per_m2_p75: Mapped[Optional[float]] = mapped_column(
+        "price_per_m2_p75", Float, nullable=True
+    )
+    area_median: Mapped[Optional[float]] = mapped_column("area_median", Float, nullable=True)
+
+    # Trends over the last 30 days
+    new_listings_30d: Mapped[int] = mapped_column("new_listings_30d", Integer, default=0)
+    price_changes_30d: Mapped[int] = mapped_column("price_changes_30d", Integer, default=0)
+
+    # Serialized quantile sketches the percentiles are read from, merged on update
+    sketches: Mapped[dict[str, Any]] = mapped_column(JSON)
+    updated_at: Mapped[datetime] = mapped_column("updated_at", DateTime(timezone=True))
@@ -0,0 +1,261 @@
+"""
+Sampling profiler for single requests.
+
+Usage:
+    python -m propfair_api.profiling   # prints a signed X-Profile header
+
+A background thread samples the interpreter every ``interval`` seconds
+while any request is being profiled. A sample counts for a request when the
+request's middleware frame is on a thread's stack (its task is running on
+the event loop), and as ``[await]`` otherwise: waiting on I/O, on a worker
+thread, or for other requests. Work handed to worker threads (sync
+dependencies, streamed bodies) therefore shows up as ``[await]``.
+
+Requests are profiled at random (``profile_sample_rate``), or when they
+carry an ``X-Profile`` header signed with the secret key. Each profile is
+written to ``profile_dir`` as ``<id>.folded`` (collapsed stacks, one
+``frame;frame;frame count`` line per stack, for flamegraph.pl, speedscope
+or inferno) next to ``<id>.json`` with the route, status and timings.
+Unless ``profiling_enabled`` is set the middleware isn't installed.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import suppress
+from datetime import datetime, timezone
+from types import CodeType, FrameType
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from propfair_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+AWAIT = "[await]"
+
+
+def _label(code: CodeType) -> str:
+    filename = code.co_filename
+    for marker in ("site-packages/", "/src/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+def _stack_under(frame: Optional[FrameType], root: object) -> Optional[str]:
+    """The collapsed stack from ``root`` down to ``frame``, if ``root`` is on it."""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        if frame is root:
+            return ";".join(reversed(labels))
+        frame = frame.f_back
+    return None
+
+
+class Profile:
+    def __init__(self, root: object) -> None:
+        self.root = root
+        self.stacks: Counter[str] = Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class Sampler:
+    """Samples every profile in progress from one thread, started on first use."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._profiles: list[Profile] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, root: object) -> Profile:
+        profile = Profile(root)
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+            self._wake.set()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def sample(self, profiles: list[Profile]) -> None:
+        frames = list(sys._current_frames().values())
+        for profile in profiles:
+            stack = None
+            for frame in frames:
+                stack = _stack_under(frame, profile.root)
+                if stack is not None:
+                    break
+            profile.stacks[stack or AWAIT] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    # Cleared under the lock, so a start() can't be missed
+                    self._wake.clear()
+            if not profiles:
+                self._wake.wait()
+                continue
+            try:
+                self.sample(profiles)
+            except Exception:
+                logger.exception("Profiler sample failed")
+            time.sleep(self.interval)
+
+
+def sign_profile_token(secret: str, now: Optional[float] = None) -> str:
+    issued = str(int(time.time() if now is None else now))
+    mac = hmac.new(secret.encode(), f"profile:{issued}".encode(), hashlib.sha256).hexdigest()
+    return f"{issued}.{mac}"
+
+
+def verify_profile_token(
+    token: str, secret: str, ttl: float, now: Optional[float] = None
+) -> bool:
+    issued, _, mac = token.partition(".")
+    if not issued.isdigit():
+        return False
+    expected = sign_profile_token(secret, int(issued)).partition(".")[2]
+    age = (time.time() if now is None else now) - int(issued)
+    return hmac.compare_digest(mac, expected) and 0 <= age <= ttl
+
+
+def write_profile(
+    directory: str, profile_id: str, folded: str, metadata: dict[str, Any], keep: int
+) -> None:
+    """Write a profile and its metadata, then drop all but the ``keep`` newest."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{profile_id}.folded"), "w") as f:
+        f.write(folded)
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    # Ids start with a timestamp, so names sort oldest first
+    names = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+    for name in names[: max(len(names) - keep, 0)]:
+        for suffix in (".json", ".folded"):
+            with suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, name + suffix))
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling sampled requests and those with a signed ``X-Profile``."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sampler: Sampler,
+        sample_rate: float = 0.0,
+        secret: str = "",
+        token_ttl: float = 300,
+        directory: str = "profiles",
+        keep: int = 200,
+    ) -> None:
+        self.app = app
+        self.sampler = sampler
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.token_ttl = token_ttl
+        self.directory = directory
+        self.keep = keep
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                token = value.decode("latin-1")
+                if verify_profile_token(token, self.secret, self.token_ttl):
+                    return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = datetime.now(timezone.utc)
+        profile_id = f"{started_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status = None
+
+        async def send_with_profile(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trigger == "header":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", profile_id.encode())
+                    ]
+            await send(message)
+
+        start = time.perf_counter()
+        profile = self.sampler.start(sys._getframe())
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self.sampler.stop(profile)
+            duration = time.perf_counter() - start
+            route = scope.get("route")
+            metadata: dict[str, Any] = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", "unmatched"),
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(duration * 1000, 3),
+                "interval_ms": self.sampler.interval * 1000,
+                "samples": profile.samples,
+                "await_samples": profile.stacks[AWAIT],
+            }
+            try:
+                await asyncio.to_thread(
+                    write_profile,
+                    self.directory,
+                    profile_id,
+                    profile.folded(),
+                    metadata,
+                    self.keep,
+                )
+            except OSError:
+                logger.warning("Could not write profile %s", profile_id, exc_info=True)
+
+
+def main() -> int:
+    token = sign_profile_token(settings.secret_key)
+    print(f"{HEADER}: {token}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from propfair_api.database import get_db_session
-from propfair_api.schemas.analysis import FairPriceResponse, FeatureImpact
+from propfair_api.conditional import conditional_response, latest, make_etag
+from propfair_api.database import get_read_session
+from propfair_api.models import Listing, NeighborhoodStats
+from propfair_api.schemas.analysis import (
+    CityNeighborhoodStats,
+    FairPriceResponse,
+    FeatureImpact,
+    NeighborhoodStatsResponse,
+)
+
+# City-wide rows of neighborhood_stats have an empty neighborhood
+CITY_WIDE = ""
+
+# Version of the fair-price model; fair-price ETags change with it
+FAIR_PRICE_MODEL_VERSION = "mock-0"
 
 router = APIRouter(prefix="/api/v1/analysis", tags=["analysis"])
 
@@ -10,8 +26,19 @@ router = APIRouter(prefix="/api/v1/analysis", tags=["analysis"])
 @router.get("/listings/{listing_id}/fair-price", response_model=FairPriceResponse)
 async def get_fair_price(
     listing_id: str,
-    db: Session = Depends(get_db_session),
-) -> FairPriceResponse:
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_session),
+) -> Union[FairPriceResponse, Response]:
+    # The prediction changes with the listing as well as with the model
+    version = db.execute(
+        select(Listing.content_hash, Listing.updated_at).where(Listing.id == listing_id)
+    ).one_or_none()
+    etag = make_etag(listing_id, FAIR_PRICE_MODEL_VERSION, tuple(version) if version else None)
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+
     # TODO: Implement actual ML prediction
     # For now, return mock data
     return FairPriceResponse(
@@ -36,3 +63,67 @@ async def get_fair_price(
             ),
         ],
     )
+
+
+@router.get("/neighborhoods", response_model=CityNeighborhoodStats)
+async def list_neighborhood_stats(
+    request: Request,
+    response: Response,
+    city: str = Query("Bogotá"),
+    min_listings: int = Query(1, ge=0),
+    db: Session = Depends(get_read_session),
+) -> Union[CityNeighborhoodStats, Response]:
+    """City-wide market stats and every neighborhood's, busiest first."""
+    rows = (
+        db.query(NeighborhoodStats)
+        .filter(NeighborhoodStats.city == city)
+        .order_by(NeighborhoodStats.active_listings.desc(), NeighborhoodStats.neighborhood)
+        .all()
+    )
+    city_row = next((row for row in rows if row.neighborhood == CITY_WIDE), None)
+    if city_row is None:
+        raise HTTPException(status_code=404, detail="No stats for city")
+
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag(min_listings, [(row.neighborhood, row.updated_at) for row in rows]),
+        latest(row.updated_at for row in rows),
+    )
+    if not_modified:
+        return not_modified
+
+    return CityNeighborhoodStats(
+        city=NeighborhoodStatsResponse.model_validate(city_row),
+        neighborhoods=[
+            NeighborhoodStatsResponse.model_validate(row)
+            for row in rows
+            if row.neighborhood != CITY_WIDE and row.active_listings >= min_listings
+        ],
+    )
+
+
+@router.get("/neighborhoods/{name}/stats", response_model=NeighborhoodStatsResponse)
+async def get_neighborhood_stats(
+    name: str,
+    request: Request,
+    response: Response,
+    city: Optional[str] = Query(None),
+    db: Session = Depends(get_read_session),
+) -> Union[NeighborhoodStatsResponse, Response]:
+    """Market stats of one neighborhood, read from the precomputed aggregates."""
+    query = db.query(NeighborhoodStats).filter(NeighborhoodStats.neighborhood == name)
+    if city:
+        query = query.filter(NeighborhoodStats.city == city)
+    row = query.order_by(NeighborhoodStats.active_listings.desc()).first()
+
+    if not row or name == CITY_WIDE:
+        raise HTTPException(status_code=404, detail="Neighborhood not found")
+
+    not_modified = conditional_response(
+        request, response, make_etag(row.city, row.neighborhood, row.updated_at), row.updated_at
+    )
+    if not_modified:
+        return not_modified
+
+    return NeighborhoodStatsResponse.model_validate(row)
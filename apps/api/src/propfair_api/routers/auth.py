@@ -9,8 +9,6 @@ from propfair_api.schemas.auth import (
     UserResponse,
 )
 from propfair_api.auth import (
-    hash_password,
-    verify_password,
     create_access_token,
     create_refresh_token,
     get_current_user,
@@ -24,7 +22,7 @@ async def register(
     user_data: UserRegister,
     db: Session = Depends(get_db_session),
 ) -> UserResponse:
-    # TODO: Implement actual user creation
+    # TODO: Implement actual user creation (hash_password_async keeps bcrypt off the event loop)
     return UserResponse(
         id="mock-user-id",
         email=user_data.email,
@@ -37,7 +35,7 @@ async def login(
     user_data: UserLogin,
     db: Session = Depends(get_db_session),
 ) -> Token:
-    # TODO: Implement actual login
+    # TODO: Implement actual login (check the stored hash with verify_password_async)
     access_token = create_access_token({"sub": "mock-user-id", "email": user_data.email})
     refresh_token = create_refresh_token({"sub": "mock-user-id"})
     return Token(access_token=access_token, refresh_token=refresh_token)
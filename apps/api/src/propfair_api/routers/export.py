@@ -0,0 +1,62 @@
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any, Literal, Optional, Union
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from propfair_api.auth import get_current_user
+from propfair_api.database import get_read_session
+from propfair_api.export import export_lines, export_query, iter_records
+from propfair_api.map_points import gzip_chunks
+
+router = APIRouter(prefix="/api/v1/export", tags=["export"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+@router.get("/listings")
+async def export_listings(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    history: bool = Query(False),
+    city: Optional[str] = Query(None),
+    barrio: Optional[str] = Query(None),
+    localidad: Optional[str] = Query(None),
+    min_price: Optional[int] = Query(None),
+    max_price: Optional[int] = Query(None),
+    bedrooms: Optional[int] = Query(None),
+    include_inactive: bool = Query(False),
+    updated_since: Optional[datetime] = Query(None),
+    after_id: Optional[str] = Query(None),
+    db: Session = Depends(get_read_session),
+    current_user: dict[str, Any] = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    All matching listings, one per line, in id order and streamed as they are
+    read (gzipped on the fly when accepted). An interrupted download resumes
+    with ``after_id`` set to the last id received; a resumed CSV has no header.
+    Bulk exports are for signed-in users only.
+    """
+    query = export_query(
+        city=city,
+        barrio=barrio,
+        localidad=localidad,
+        min_price=min_price,
+        max_price=max_price,
+        bedrooms=bedrooms,
+        include_inactive=include_inactive,
+        updated_since=updated_since,
+        after_id=after_id,
+    )
+    lines = export_lines(iter_records(db, query, history), format, history, header=not after_id)
+    headers = {
+        "Content-Disposition": f'attachment; filename="listings.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    body: Iterator[Union[str, bytes]] = lines
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = gzip_chunks(lines)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
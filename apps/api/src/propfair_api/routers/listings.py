@@ -1,8 +1,10 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from propfair_api.database import get_db_session
+from propfair_api.conditional import conditional_response, latest, listing_version, make_etag
+from propfair_api.database import get_read_session
 from propfair_api.models import Listing
 from propfair_api.schemas.listing import (
     ListingResponse,
@@ -15,8 +17,12 @@ router = APIRouter(prefix="/api/v1/listings", tags=["listings"])
 
 @router.get("", response_model=PaginatedListings)
 async def search_listings(
+    request: Request,
+    response: Response,
     city: Optional[str] = Query(None),
     neighborhood: Optional[str] = Query(None),
+    barrio: Optional[str] = Query(None),
+    localidad: Optional[str] = Query(None),
     min_price: Optional[int] = Query(None),
     max_price: Optional[int] = Query(None),
     bedrooms: Optional[int] = Query(None),
@@ -26,8 +32,8 @@ async def search_listings(
     estrato: Optional[int] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db_session),
-) -> PaginatedListings:
+    db: Session = Depends(get_read_session),
+) -> Union[PaginatedListings, Response]:
     """Search listings with optional filters and pagination."""
 
     # Build dynamic query
@@ -38,6 +44,11 @@ async def search_listings(
         query = query.filter(Listing.city.ilike(f"%{city}%"))
     if neighborhood:
         query = query.filter(Listing.neighborhood.ilike(f"%{neighborhood}%"))
+    # Official neighborhoods are exact matches so they can use the indexes
+    if barrio:
+        query = query.filter(Listing.barrio == barrio)
+    if localidad:
+        query = query.filter(Listing.localidad == localidad)
     if min_price:
         query = query.filter(Listing.price >= min_price)
     if max_price:
@@ -64,6 +75,17 @@ async def search_listings(
         .all()
     )
 
+    # Revalidations of an unchanged page skip serialization. ETag only: the
+    # newest change among this page's listings says nothing about the listings
+    # that entered or left the filtered set, so a Last-Modified would go stale
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag(total, page, page_size, [listing_version(listing) for listing in listings]),
+    )
+    if not_modified:
+        return not_modified
+
     # Calculate total pages
     total_pages = (total + page_size - 1) // page_size if total > 0 else 0
 
@@ -79,8 +101,10 @@ async def search_listings(
 @router.get("/{listing_id}", response_model=ListingResponse)
 async def get_listing(
     listing_id: str,
-    db: Session = Depends(get_db_session),
-) -> ListingResponse:
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_session),
+) -> Union[ListingResponse, Response]:
     """Get a single listing by ID."""
     listing = db.query(Listing).filter(
         Listing.id == listing_id,
@@ -90,4 +114,13 @@ async def get_listing(
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
 
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag(listing_version(listing)),
+        latest([listing.updated_at, listing.last_seen_at]),
+    )
+    if not_modified:
+        return not_modified
+
     return ListingResponse.model_validate(listing)
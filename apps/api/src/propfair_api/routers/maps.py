@@ -0,0 +1,158 @@
+import gzip
+import os
+from collections.abc import Generator, Iterator
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from propfair_api.conditional import conditional_response
+from propfair_api.config import settings
+from propfair_api.database import get_read_session
+from propfair_api.map_points import PointsCache, encode_points, gzip_chunks, snap_viewport
+from propfair_api.models import Listing
+from propfair_api.tiles import TileStore
+
+router = APIRouter(prefix="/api/v1/maps", tags=["maps"])
+
+Layer = Literal["prices", "deals"]
+
+# Tile URLs carry the generation as ?v=..., so a matching tile never changes
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+UNVERSIONED_CACHE = "public, max-age=300"
+POINTS_CACHE = "public, max-age=60"
+
+points_cache = PointsCache(ttl=settings.map_points_cache_ttl)
+
+
+def get_tile_store() -> Generator[TileStore, None, None]:
+    if not os.path.exists(settings.heatmap_tiles_path):
+        raise HTTPException(status_code=404, detail="Heatmap tiles not generated")
+    store = TileStore(settings.heatmap_tiles_path, readonly=True)
+    try:
+        yield store
+    finally:
+        store.close()
+
+
+@router.get("/heatmap/{layer}")
+async def get_heatmap(
+    layer: Layer,
+    request: Request,
+    store: TileStore = Depends(get_tile_store),
+) -> dict[str, Any]:
+    """TileJSON-style description of a heatmap layer, with a versioned tile URL template."""
+    metadata = store.metadata()
+    version = metadata.get("generated_at", "")
+    template = str(request.url_for("get_heatmap_tile", layer=layer, z=0, x=0, y=0))
+    template = template.replace("/0/0/0", "/{z}/{x}/{y}") + f"?v={version}"
+    return {
+        "name": f"{metadata.get('name', 'heatmap')}-{layer}",
+        "tiles": [template],
+        "minzoom": int(metadata.get("minzoom", 0)),
+        "maxzoom": int(metadata.get("maxzoom", 0)),
+        "cells": int(metadata.get("cells", 0)),
+        "version": version,
+    }
+
+
+@router.get("/heatmap/{layer}/{z}/{x}/{y}", name="get_heatmap_tile")
+async def get_heatmap_tile(
+    layer: Layer,
+    # Past zoom 22 the tile range check below would build huge integers
+    z: int = Path(ge=0, le=22),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    v: Optional[str] = Query(None),
+    store: TileStore = Depends(get_tile_store),
+) -> Response:
+    """One precomputed tile (gzipped JSON cells); 204 when no listing falls in it."""
+    if not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    cache = UNVERSIONED_CACHE
+    if v is not None and v == store.metadata().get("generated_at"):
+        cache = IMMUTABLE_CACHE
+
+    data = store.get(layer, z, x, y)
+    if data is None:
+        return Response(status_code=204, headers={"Cache-Control": cache})
+    return Response(
+        content=data,
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip", "Cache-Control": cache},
+    )
+
+
+@router.get("/points")
+async def get_map_points(
+    request: Request,
+    response: Response,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    city: Optional[str] = Query(None),
+    min_price: Optional[int] = Query(None),
+    max_price: Optional[int] = Query(None),
+    bedrooms: Optional[int] = Query(None),
+    precision: Optional[int] = Query(5, ge=0, le=7),
+    delta: bool = Query(True),
+    ids: bool = Query(True),
+    db: Session = Depends(get_read_session),
+) -> Response:
+    """
+    Active listings in a viewport as columnar arrays (see ``propfair_api.map_points``),
+    gzipped. The viewport is grown to a 0.01° grid so nearby viewports share a
+    cached payload; clients drop the pins outside their view.
+    """
+    viewport = snap_viewport(south, west, north, east)
+    key = (viewport, city, min_price, max_price, bedrooms, precision, delta, ids)
+    headers = {"Content-Encoding": "gzip", "Cache-Control": POINTS_CACHE, "Vary": "Accept-Encoding"}
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "")
+
+    cached = points_cache.get(key)
+    if cached is not None:
+        body, etag = cached
+        not_modified = conditional_response(request, response, etag)
+        if not_modified:
+            return not_modified
+        headers["ETag"] = etag
+        if not accepts_gzip:
+            del headers["Content-Encoding"]
+            body = gzip.decompress(body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    south, west, north, east = viewport
+    query = select(Listing.id, Listing.latitude, Listing.longitude, Listing.price).where(
+        Listing.is_active,
+        Listing.latitude.between(south, north),
+        Listing.longitude.between(west, east),
+    )
+    if city:
+        query = query.where(Listing.city == city)
+    if min_price:
+        query = query.where(Listing.price >= min_price)
+    if max_price:
+        query = query.where(Listing.price <= max_price)
+    if bedrooms:
+        query = query.where(Listing.bedrooms >= bedrooms)
+    points = db.execute(query.limit(settings.map_points_limit + 1)).all()
+    truncated = len(points) > settings.map_points_limit
+    pieces = encode_points(points[: settings.map_points_limit], precision, delta, truncated, ids)
+
+    if not accepts_gzip:
+        del headers["Content-Encoding"]
+        return StreamingResponse(pieces, media_type="application/json", headers=headers)
+
+    def stream() -> Iterator[bytes]:
+        # Cache the payload once it has been sent in full
+        chunks = []
+        for chunk in gzip_chunks(pieces):
+            chunks.append(chunk)
+            yield chunk
+        points_cache.put(key, b"".join(chunks))
+
+    return StreamingResponse(stream(), media_type="application/json", headers=headers)
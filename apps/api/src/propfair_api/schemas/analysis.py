@@ -1,4 +1,5 @@
 from typing import Optional, List
+from datetime import datetime
 from pydantic import BaseModel
 
 
@@ -17,3 +18,27 @@ class FairPriceResponse(BaseModel):
     price_difference_percent: float
     verdict: str  # "fair", "overpriced", "underpriced"
     feature_impacts: List[FeatureImpact]
+
+
+class NeighborhoodStatsResponse(BaseModel):
+    city: str
+    neighborhood: str
+    active_listings: int
+    price_p25: Optional[float] = None
+    price_median: Optional[float] = None
+    price_p75: Optional[float] = None
+    price_per_m2_p25: Optional[float] = None
+    price_per_m2_median: Optional[float] = None
+    price_per_m2_p75: Optional[float] = None
+    area_median: Optional[float] = None
+    new_listings_30d: int
+    price_changes_30d: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CityNeighborhoodStats(BaseModel):
+    city: NeighborhoodStatsResponse
+    neighborhoods: list[NeighborhoodStatsResponse]
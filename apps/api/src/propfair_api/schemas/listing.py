@@ -18,6 +18,9 @@ class ListingBase(BaseModel):
     city: str
     latitude: float
     longitude: float
+    coordinates_approximate: bool = False
+    barrio: Optional[str] = None
+    localidad: Optional[str] = None
 
 
 class ListingResponse(ListingBase):
@@ -36,6 +39,8 @@ class ListingResponse(ListingBase):
 class ListingSearchParams(BaseModel):
     city: Optional[str] = None
     neighborhood: Optional[str] = None
+    barrio: Optional[str] = None
+    localidad: Optional[str] = None
     min_price: Optional[int] = None
     max_price: Optional[int] = None
     bedrooms: Optional[int] = None
@@ -0,0 +1,277 @@
+"""
+Request throttling: token-bucket rate limits and database load shedding.
+
+``RateLimitMiddleware`` gives every client (the user id of a valid bearer
+token, otherwise the client IP) one token bucket per route class and answers
+429 with ``Retry-After`` once the bucket is empty. Buckets live in process
+memory (``MemoryBackend``) or, to share them across workers, in Redis
+(``RedisBackend``).
+
+``LoadShedder`` guards the database pool: ``get_db_session`` refuses new
+database work with a fast 503 while too many requests hold a connection or
+recent connection checkouts waited too long, instead of queueing them until
+they time out.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Optional, Protocol
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from propfair_api.auth import decode_token
+from propfair_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+# Longest prefix wins; anything else is "default"
+ROUTE_CLASSES: list[tuple[str, str]] = [
+    ("/api/v1/auth", "auth"),
+    ("/api/v1/listings", "search"),
+    ("/api/v1/analysis", "search"),
+    ("/api/v1/maps", "tiles"),
+    ("/api/v1/export", "export"),
+]
+EXEMPT_PATHS = ("/health", "/ready", "/metrics")
+
+
+class Limit:
+    """``capacity`` requests in a burst, refilled at ``rate`` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit":
+        """Parse "60/minute" (also second/hour)."""
+        count, _, period = value.partition("/")
+        if period not in PERIODS:
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        capacity = float(count)
+        # A bucket that never refills would divide by zero when computing waits
+        if not capacity > 0:
+            raise ValueError(f"Rate limit must be positive: {value!r}")
+        return cls(capacity, capacity / PERIODS[period])
+
+    def scaled(self, factor: float) -> "Limit":
+        return Limit(self.capacity * factor, self.rate * factor)
+
+
+def route_class(path: str) -> Optional[str]:
+    """Route class of a request path; None for paths never limited."""
+    if path in EXEMPT_PATHS:
+        return None
+    matches = [(prefix, name) for prefix, name in ROUTE_CLASSES if path.startswith(prefix)]
+    return max(matches, key=lambda match: len(match[0]))[1] if matches else "default"
+
+
+class Backend(Protocol):
+    async def take(self, key: str, limit: Limit, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 if allowed, else seconds until one is available."""
+        ...
+
+
+class MemoryBackend:
+    """Token buckets in this process, least recently used dropped beyond ``max_keys``."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, limit: Limit, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.get(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# KEYS[1] bucket; ARGV: capacity, rate, now. Returns the wait in ms (0 = allowed).
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return wait
+"""
+
+
+class RedisBackend:
+    """Token buckets shared by every worker, updated atomically by a Lua script."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, limit: Limit, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        wait_ms = await self._script(
+            keys=[self.prefix + key], args=[limit.capacity, limit.rate, now]
+        )
+        return int(wait_ms) / 1000
+
+
+class RateLimiter:
+    def __init__(self, backend: Backend, limits: dict[str, str], authenticated_factor: float = 1.0):
+        if not authenticated_factor > 0:
+            raise ValueError(f"Invalid authenticated rate limit factor: {authenticated_factor!r}")
+        self.backend = backend
+        self.limits = {name: Limit.parse(value) for name, value in limits.items()}
+        self.authenticated_factor = authenticated_factor
+
+    @staticmethod
+    def client_key(headers: dict[str, str], client_host: str) -> tuple[str, bool]:
+        """("user:<id>", True) for a valid bearer token, else ("ip:<host>", False)."""
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            claims = decode_token(token)
+            if claims is not None:
+                return f"user:{claims['id']}", True
+        return f"ip:{client_host}", False
+
+    async def check(
+        self, path: str, headers: dict[str, str], client_host: str
+    ) -> tuple[float, Optional[Limit]]:
+        """Seconds to wait before this request is allowed (0 if allowed now), and its limit."""
+        name = route_class(path)
+        if name is None:
+            return 0.0, None
+        limit = self.limits.get(name) or self.limits.get("default")
+        if limit is None:
+            return 0.0, None
+        key, authenticated = self.client_key(headers, client_host)
+        if authenticated:
+            limit = limit.scaled(self.authenticated_factor)
+        try:
+            return await self.backend.take(f"{name}:{key}", limit), limit
+        except Exception:
+            # A broken limiter backend must not take the API down with it
+            logger.warning("Rate limiter backend failed; allowing request", exc_info=True)
+            return 0.0, limit
+
+
+def build_rate_limiter() -> RateLimiter:
+    backend: Backend
+    if settings.rate_limit_backend == "redis":
+        backend = RedisBackend(settings.redis_url)
+    elif settings.rate_limit_backend == "memory":
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown rate limit backend: {settings.rate_limit_backend!r}")
+    return RateLimiter(backend, settings.rate_limits, settings.rate_limit_authenticated_factor)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 + Retry-After to clients over their limit."""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]
+        }
+        client_host = scope["client"][0] if scope.get("client") else "unknown"
+        wait, limit = await self.limiter.check(scope["path"], headers, client_host)
+        # A wait only ever comes with the limit it was computed from
+        if wait > 0 and limit is not None:
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={
+                    "Retry-After": str(math.ceil(wait)),
+                    "X-RateLimit-Limit": f"{limit.capacity:g}",
+                },
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class LoadShedder:
+    """
+    Admission control for database work. Sheds while ``max_in_flight``
+    sessions are open, or while the moving average of connection checkout
+    waits is above ``max_pool_wait`` (seconds) and was sampled within the
+    last ``retry_after`` seconds, so shedding stops once the pool drains.
+    """
+
+    def __init__(self, max_in_flight: int, max_pool_wait: float, retry_after: int = 1):
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.pool_wait = 0.0
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+
+    def overloaded(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self.in_flight >= self.max_in_flight:
+            return True
+        return self.pool_wait > self.max_pool_wait and now - self._sampled_at < self.retry_after
+
+    def record_pool_wait(self, seconds: float, now: Optional[float] = None) -> None:
+        with self._lock:
+            self.pool_wait = 0.8 * self.pool_wait + 0.2 * seconds
+            self._sampled_at = time.monotonic() if now is None else now
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Hold a database slot for the block, or raise 503 when overloaded."""
+        with self._lock:
+            if self.overloaded():
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server busy, retry shortly",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+load_shedder = LoadShedder(
+    max_in_flight=settings.shed_max_db_in_flight,
+    max_pool_wait=settings.shed_max_pool_wait_ms / 1000,
+    retry_after=settings.shed_retry_after_seconds,
+)
@@ -0,0 +1,158 @@
+"""
+Heatmap tile store: an MBTiles-style SQLite file of precomputed map tiles.
+
+Tiles follow the XYZ (slippy map) scheme in the API and are stored with the
+TMS row, as MBTiles does. Each tile is a ``size`` x ``size`` grid of cells;
+``tile_data`` is gzipped JSON ``{"size": N, "cells": [[col, row, count, value], ...]}``
+listing the non-empty cells (row 0 at the top). The scrapers write tiles
+after a crawl; the API only reads them. ``listing_tiles`` records the
+deepest-zoom tile each listing was binned into, so an update also rebuilds
+the tile a listing moved out of.
+"""
+import gzip
+import json
+import math
+import sqlite3
+from collections.abc import Iterable
+from typing import Any, Optional, cast
+
+LAYERS = ("prices", "deals")
+MAX_LATITUDE = 85.05112878
+
+Cell = tuple[int, int, int, float]
+
+
+def tile_position(latitude: float, longitude: float, zoom: int) -> tuple[float, float]:
+    """Fractional (x, y) tile coordinates of a point (Web Mercator)."""
+    latitude = max(min(latitude, MAX_LATITUDE), -MAX_LATITUDE)
+    n = 2 ** zoom
+    x = (longitude + 180.0) / 360.0 * n
+    radians = math.radians(latitude)
+    y = (1.0 - math.asinh(math.tan(radians)) / math.pi) / 2.0 * n
+    return min(max(x, 0.0), n - 1e-9), min(max(y, 0.0), n - 1e-9)
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(south, west, north, east) of a tile in degrees."""
+    n = 2 ** zoom
+
+    def latitude(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return latitude(y + 1), x / n * 360.0 - 180.0, latitude(y), (x + 1) / n * 360.0 - 180.0
+
+
+def encode_tile(size: int, cells: Iterable[Cell]) -> bytes:
+    payload = {"size": size, "cells": [list(cell) for cell in sorted(cells)]}
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), mtime=0)
+
+
+def decode_tile(data: bytes) -> dict[str, Any]:
+    return cast(dict[str, Any], json.loads(gzip.decompress(data)))
+
+
+class TileStore:
+    """Read/write access to a tile file; one instance per thread."""
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self.connection = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.connection = sqlite3.connect(path)
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS tiles (
+                    layer TEXT,
+                    zoom_level INTEGER,
+                    tile_column INTEGER,
+                    tile_row INTEGER,
+                    tile_data BLOB,
+                    PRIMARY KEY (layer, zoom_level, tile_column, tile_row)
+                );
+                CREATE TABLE IF NOT EXISTS listing_tiles (
+                    listing_id TEXT PRIMARY KEY,
+                    x INTEGER,
+                    y INTEGER
+                );
+                """
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @staticmethod
+    def _tms_row(zoom: int, y: int) -> int:
+        return int(2 ** zoom) - 1 - y
+
+    _WHERE_TILE = "layer = ? AND zoom_level = ? AND tile_column = ? AND tile_row = ?"
+
+    def get(self, layer: str, zoom: int, x: int, y: int) -> Optional[bytes]:
+        row = self.connection.execute(
+            f"SELECT tile_data FROM tiles WHERE {self._WHERE_TILE}",
+            (layer, zoom, x, self._tms_row(zoom, y)),
+        ).fetchone()
+        return cast(bytes, row[0]) if row else None
+
+    def put_many(self, tiles: dict[tuple[str, int, int, int], Optional[bytes]]) -> None:
+        """Write tiles keyed by (layer, zoom, x, y); None deletes the tile."""
+        with self.connection:
+            for (layer, zoom, x, y), data in tiles.items():
+                key = (layer, zoom, x, self._tms_row(zoom, y))
+                if data is None:
+                    self.connection.execute(f"DELETE FROM tiles WHERE {self._WHERE_TILE}", key)
+                else:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?)", key + (data,)
+                    )
+
+    def listing_tiles(
+        self, listing_ids: Iterable[str], batch_size: int = 500
+    ) -> dict[str, tuple[int, int]]:
+        """The (x, y) tile each listing was last binned into, at the deepest zoom."""
+        ids = list(listing_ids)
+        tiles: dict[str, tuple[int, int]] = {}
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            rows = self.connection.execute(
+                "SELECT listing_id, x, y FROM listing_tiles WHERE listing_id IN "
+                f"({', '.join('?' * len(batch))})",
+                batch,
+            )
+            tiles.update((listing_id, (x, y)) for listing_id, x, y in rows)
+        return tiles
+
+    def set_listing_tiles(self, tiles: dict[str, tuple[int, int]]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO listing_tiles VALUES (?, ?, ?)",
+                [(listing_id, x, y) for listing_id, (x, y) in tiles.items()],
+            )
+
+    def clear(self) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM tiles")
+            self.connection.execute("DELETE FROM listing_tiles")
+
+    def metadata(self) -> dict[str, str]:
+        return dict(self.connection.execute("SELECT name, value FROM metadata"))
+
+    def set_metadata(self, **values: object) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                [(k, str(v)) for k, v in values.items()],
+            )
+
+    def count(self, layer: Optional[str] = None) -> int:
+        if layer:
+            row = self.connection.execute(
+                "SELECT COUNT(*) FROM tiles WHERE layer = ?", (layer,)
+            ).fetchone()
+        else:
+            row = self.connection.execute("SELECT COUNT(*) FROM tiles").fetchone()
+        return int(row[0])
+
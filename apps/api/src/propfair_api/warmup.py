@@ -0,0 +1,186 @@
+"""
+Startup warmup: open database connections, load what the first requests
+would otherwise pay for, and prime the hot caches before an instance
+reports ready.
+
+Steps run in order in the background once the app has started, so
+``/health`` answers meanwhile; ``/ready`` answers 503 until every required
+step has succeeded, with each step's status and timing. Failed required
+steps (say, the database is still starting) are retried every
+``retry_after`` seconds.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import configure_mappers
+
+from propfair_api import database
+from propfair_api.auth import get_password_executor, hash_password, verify_password
+from propfair_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class Step:
+    name: str
+    # Plain functions run in a worker thread, coroutine functions on the loop;
+    # a returned string is reported as the step's detail
+    run: Callable[[], Any]
+    required: bool = True
+    status: str = PENDING
+    seconds: Optional[float] = None
+    detail: Optional[str] = None
+
+
+class Warmup:
+    """
+    Ordered startup steps and their outcome. Fair price is still a mock
+    (no model file to load), so there is no model step yet.
+    """
+
+    def __init__(self) -> None:
+        self.steps: list[Step] = []
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+
+    def add(self, name: str, run: Callable[[], Any], required: bool = True) -> None:
+        self.steps.append(Step(name, run, required))
+
+    @property
+    def finished(self) -> bool:
+        return self.seconds is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished and all(
+            step.status in (OK, SKIPPED) for step in self.steps if step.required
+        )
+
+    async def _run_step(self, step: Step) -> None:
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(step.run):
+                result = await step.run()
+            else:
+                result = await asyncio.to_thread(step.run)
+        except Exception as exc:
+            step.status = FAILED
+            step.detail = f"{type(exc).__name__}: {exc}"
+            logger.warning("Warmup step %s failed", step.name, exc_info=True)
+        else:
+            step.status = OK
+            step.detail = result if isinstance(result, str) else None
+        step.seconds = round(time.perf_counter() - start, 4)
+
+    async def run(self) -> bool:
+        """Run every step once."""
+        self.started_at = time.perf_counter()
+        for step in self.steps:
+            await self._run_step(step)
+        self.seconds = round(time.perf_counter() - self.started_at, 4)
+        logger.info("Warmup finished in %.2fs, %s", self.seconds, self.status)
+        return self.ready
+
+    async def run_until_ready(self, retry_after: float = 5) -> None:
+        """``run``, then rerun failed required steps until they pass."""
+        await self.run()
+        while not self.ready:
+            await asyncio.sleep(retry_after)
+            for step in self.steps:
+                if step.required and step.status == FAILED:
+                    await self._run_step(step)
+            logger.info("Warmup retried, %s", self.status)
+
+    def skip(self) -> None:
+        """Report ready without running any step (warmup disabled)."""
+        for step in self.steps:
+            step.status = SKIPPED
+        self.seconds = 0.0
+
+    @property
+    def status(self) -> str:
+        if not self.finished:
+            return "warming"
+        return "ready" if self.ready else "unavailable"
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "seconds": self.seconds,
+            "components": {
+                step.name: {
+                    "status": step.status,
+                    "required": step.required,
+                    "seconds": step.seconds,
+                    "detail": step.detail,
+                }
+                for step in self.steps
+            },
+        }
+
+
+def _open_connections(engine: Engine, count: int) -> None:
+    # Hold them all at once so the pool really opens ``count`` connections
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_database() -> str:
+    """Open pooled connections to the primary (required) and each replica."""
+    configure_mappers()
+    count = settings.warmup_db_connections
+    _open_connections(database.engine, min(count, settings.db_pool_size))
+    opened = 1
+    for replica in database.replicas.replicas:
+        try:
+            _open_connections(replica, min(count, settings.db_replica_pool_size))
+            opened += 1
+        except (DBAPIError, PoolTimeoutError):
+            # Reads fail over to the primary, so a replica down isn't fatal
+            logger.warning("Read replica %s unavailable during warmup", replica.url, exc_info=True)
+            database.replicas.mark_down(replica)
+    return f"{opened}/{1 + len(database.replicas.replicas)} databases"
+
+
+def warm_password_hashing() -> None:
+    """Load the bcrypt backend and start every password-hash worker thread."""
+    digest = hash_password("warmup")
+    executor = get_password_executor()
+    futures = [
+        executor.submit(verify_password, "warmup", digest)
+        for _ in range(settings.password_hash_workers)
+    ]
+    for future in futures:
+        future.result()
+
+
+async def prime_urls(app: FastAPI, urls: list[str]) -> str:
+    """GET each URL through the app itself, filling its caches and the database's."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        for url in urls:
+            response = await client.get(url, headers={"Accept-Encoding": "gzip"})
+            if response.status_code >= 500:
+                raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return f"{len(urls)} URLs"
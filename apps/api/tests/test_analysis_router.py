@@ -0,0 +1,187 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from propfair_api.database import get_read_session
+from propfair_api.main import app
+from propfair_api.models import Base, Listing, NeighborhoodStats
+from propfair_api.routers import analysis
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+Base.metadata.create_all(bind=test_engine)
+
+client = TestClient(app)
+
+
+def override_get_db():
+    db = TestSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def analysis_db():
+    """Use this module's database, then clear it."""
+    previous = app.dependency_overrides.get(get_read_session)
+    app.dependency_overrides[get_read_session] = override_get_db
+    yield
+    if previous is None:
+        del app.dependency_overrides[get_read_session]
+    else:
+        app.dependency_overrides[get_read_session] = previous
+    db = TestSessionLocal()
+    db.query(NeighborhoodStats).delete()
+    db.query(Listing).delete()
+    db.commit()
+    db.close()
+
+
+def stats_row(city, neighborhood, active_listings, price_median):
+    return NeighborhoodStats(
+        city=city,
+        neighborhood=neighborhood,
+        active_listings=active_listings,
+        price_p25=price_median * 0.8,
+        price_median=price_median,
+        price_p75=price_median * 1.2,
+        price_per_m2_median=price_median / 70,
+        area_median=70.0,
+        new_listings_30d=2,
+        price_changes_30d=1,
+        sketches={},
+        updated_at=datetime(2026, 3, 1, tzinfo=timezone.utc),
+    )
+
+
+@pytest.fixture
+def sample_stats():
+    db = TestSessionLocal()
+    db.add_all(
+        [
+            stats_row("Bogotá", "", 30, 3000000),
+            stats_row("Bogotá", "Chapinero", 20, 3500000),
+            stats_row("Bogotá", "Suba", 10, 2200000),
+            stats_row("Bogotá", "Bosa", 0, 1000000),
+            stats_row("Medellín", "Laureles", 5, 2800000),
+        ]
+    )
+    db.commit()
+    db.close()
+
+
+def test_get_neighborhood_stats(sample_stats):
+    """Test stats of one neighborhood come from the aggregates table."""
+    response = client.get("/api/v1/analysis/neighborhoods/Chapinero/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["city"] == "Bogotá"
+    assert data["active_listings"] == 20
+    assert data["price_median"] == 3500000
+    assert data["price_per_m2_p25"] is None
+    assert data["price_changes_30d"] == 1
+
+    response = client.get("/api/v1/analysis/neighborhoods/Laureles/stats?city=Bogotá")
+    assert response.status_code == 404
+
+
+def test_list_neighborhood_stats_for_city(sample_stats):
+    """Test the city-wide list returns the city row and busiest neighborhoods first."""
+    response = client.get("/api/v1/analysis/neighborhoods?city=Bogotá")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["city"]["active_listings"] == 30
+    assert [row["neighborhood"] for row in data["neighborhoods"]] == ["Chapinero", "Suba"]
+
+    assert client.get("/api/v1/analysis/neighborhoods?city=Cali").status_code == 404
+
+
+def test_neighborhood_stats_conditional(sample_stats):
+    """Test stats revalidate against the row's updated_at."""
+    response = client.get("/api/v1/analysis/neighborhoods/Chapinero/stats")
+    assert response.headers["last-modified"] == "Sun, 01 Mar 2026 00:00:00 GMT"
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/api/v1/analysis/neighborhoods/Chapinero/stats",
+        headers={"If-None-Match": f'W/{etag}, "other"'},
+    )
+    assert response.status_code == 304
+
+    response = client.get("/api/v1/analysis/neighborhoods?city=Bogotá")
+    assert response.headers["etag"] != etag
+    response = client.get(
+        "/api/v1/analysis/neighborhoods?city=Bogotá",
+        headers={"If-Modified-Since": "Mon, 02 Mar 2026 00:00:00 GMT"},
+    )
+    assert response.status_code == 304
+    response = client.get(
+        "/api/v1/analysis/neighborhoods?city=Bogotá",
+        headers={"If-Modified-Since": "Sat, 28 Feb 2026 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+
+
+def test_fair_price_etag_follows_model_version(monkeypatch):
+    url = "/api/v1/analysis/listings/listing_1/fair-price"
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    monkeypatch.setattr(analysis, "FAIR_PRICE_MODEL_VERSION", "next")
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_fair_price_etag_follows_listing_version():
+    url = "/api/v1/analysis/listings/listing_1/fair-price"
+    missing = client.get(url).headers["etag"]
+
+    now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    db = TestSessionLocal()
+    listing = Listing(
+        id="listing_1",
+        external_id="1",
+        source="fincaraiz",
+        url="https://example.com/1",
+        title="Apartamento en Chapinero",
+        price=2500000,
+        bedrooms=2,
+        bathrooms=1,
+        parking_spaces=1,
+        area=60.0,
+        address="Calle 60 # 5-10",
+        neighborhood="Chapinero",
+        city="Bogotá",
+        latitude=4.65,
+        longitude=-74.06,
+        images=[],
+        amenities=[],
+        first_seen_at=now,
+        last_seen_at=now,
+        is_active=True,
+        content_hash="v1",
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(listing)
+    db.commit()
+
+    etag = client.get(url).headers["etag"]
+    assert etag != missing
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # A re-crawl that changed the listing invalidates its fair price
+    listing.content_hash = "v2"
+    listing.updated_at = datetime(2026, 3, 2, tzinfo=timezone.utc)
+    db.commit()
+    db.close()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from propfair_api import auth
+from propfair_api.auth import (
+    TokenCache,
+    create_access_token,
+    create_refresh_token,
+    get_current_user,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    auth.token_cache.clear()
+    yield
+    auth.token_cache.clear()
+
+
+def test_token_cache_expiry_and_eviction():
+    cache = TokenCache(maxsize=2)
+    cache.put("a", {"id": "1"}, expires_at=100.0)
+    cache.put("b", {"id": "2"}, expires_at=200.0)
+    assert cache.get("a", now=50.0) == {"id": "1"}
+
+    # "b" is now the least recently used
+    cache.put("c", {"id": "3"}, expires_at=300.0)
+    assert cache.get("b", now=50.0) is None
+    # Expired entries are never returned
+    assert cache.get("a", now=100.0) is None
+    assert len(cache) == 1
+
+
+async def test_get_current_user_caches_verified_claims(monkeypatch):
+    token = create_access_token({"sub": "user-1", "email": "ana@example.com"})
+    decoded = []
+    decode = auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decoded.append(1)
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+    first = await get_current_user(token)
+    first["email"] = "changed"
+    assert await get_current_user(token) == {"id": "user-1", "email": "ana@example.com"}
+    assert len(decoded) == 1
+
+
+async def test_get_current_user_rejects_invalid_tokens():
+    with pytest.raises(HTTPException):
+        await get_current_user("not-a-token")
+    with pytest.raises(HTTPException):
+        await get_current_user(create_refresh_token({"email": "ana@example.com"}))
+    assert len(auth.token_cache) == 0
+
+
+async def test_password_hashing_runs_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["pbkdf2_sha256"]))
+    threads = set()
+    hash_password = auth.hash_password
+
+    def recording_hash_password(password):
+        threads.add(threading.current_thread().name)
+        return hash_password(password)
+
+    monkeypatch.setattr(auth, "hash_password", recording_hash_password)
+
+    hashes = await asyncio.gather(*(auth.hash_password_async(f"secret-{n}") for n in range(4)))
+    assert await auth.verify_password_async("secret-2", hashes[2])
+    assert not await auth.verify_password_async("secret-2", hashes[3])
+    assert threads and all(name.startswith("password-hash") for name in threads)
@@ -1,7 +1,32 @@
 import pytest
-from propfair_api.database import get_db_session
+from sqlalchemy import text
+
+from propfair_api import database
+from propfair_api.database import ReplicaSet, get_db_session, get_read_session, make_engine
 
 
 def test_get_db_session_returns_generator():
     gen = get_db_session()
     assert hasattr(gen, "__next__")
+
+
+def test_read_session_fails_over_to_healthy_engine(tmp_path, monkeypatch):
+    broken = make_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    healthy = make_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    primary = make_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica_set = ReplicaSet([broken, healthy], primary, retry_after=60)
+    monkeypatch.setattr(database, "replicas", replica_set)
+
+    for _ in range(2):
+        sessions = get_read_session()
+        db = next(sessions)
+        assert db.get_bind() is healthy
+        assert db.execute(text("SELECT 1")).scalar() == 1
+        sessions.close()
+    assert replica_set.candidates() == [healthy, primary]
+
+    # Without a healthy replica reads go to the primary
+    replica_set.mark_down(healthy)
+    sessions = get_read_session()
+    assert next(sessions).get_bind() is primary
+    sessions.close()
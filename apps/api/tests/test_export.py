@@ -0,0 +1,190 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from propfair_api import export
+from propfair_api.auth import create_access_token
+from propfair_api.database import get_read_session
+from propfair_api.main import app
+from propfair_api.models import Base, Listing, PriceHistory
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+Base.metadata.create_all(bind=test_engine)
+
+token = create_access_token({"sub": "user-1", "email": "ana@example.com"})
+client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def override_get_db():
+    db = TestSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def make_listings(count):
+    now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    listings = []
+    for i in range(count):
+        listings.append(
+            Listing(
+                id=f"listing_{i:03d}",
+                external_id=f"ext_{i}",
+                source="fincaraiz",
+                url=f"https://example.com/{i}",
+                title=f"Apartamento, {i} \"vista\"",
+                price=2000000 + i * 1000,
+                bedrooms=2,
+                bathrooms=1,
+                parking_spaces=0,
+                area=60.0,
+                estrato=4,
+                address="Calle 100",
+                neighborhood="Chicó",
+                city="Bogotá" if i % 2 == 0 else "Medellín",
+                latitude=4.6 + i / 100,
+                longitude=-74.05,
+                images=[],
+                amenities=[],
+                first_seen_at=now,
+                last_seen_at=now,
+                is_active=i != 3,
+                content_hash=f"hash{i}",
+                created_at=now,
+                updated_at=now,
+            )
+        )
+    history = [
+        PriceHistory(id="ph_1", listing_id="listing_000", price=2100000, recorded_at=now),
+        PriceHistory(
+            id="ph_2", listing_id="listing_000", price=2000000, recorded_at=now.replace(day=2)
+        ),
+    ]
+    return listings + history
+
+
+@pytest.fixture(autouse=True)
+def export_db():
+    db = TestSessionLocal()
+    db.add_all(make_listings(6))
+    db.commit()
+    db.close()
+    previous = app.dependency_overrides.get(get_read_session)
+    app.dependency_overrides[get_read_session] = override_get_db
+    yield
+    if previous is None:
+        del app.dependency_overrides[get_read_session]
+    else:
+        app.dependency_overrides[get_read_session] = previous
+    db = TestSessionLocal()
+    db.query(PriceHistory).delete()
+    db.query(Listing).delete()
+    db.commit()
+    db.close()
+
+
+def test_export_requires_login():
+    response = TestClient(app).get("/api/v1/export/listings")
+    assert response.status_code == 401
+
+
+def test_export_ndjson_with_history():
+    response = client.get(
+        "/api/v1/export/listings?history=true", headers={"Accept-Encoding": "identity"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "listings.ndjson" in response.headers["content-disposition"]
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    # Inactive listing_003 left out, id order
+    assert [record["id"] for record in records] == [
+        "listing_000", "listing_001", "listing_002", "listing_004", "listing_005"
+    ]
+    assert [entry["price"] for entry in records[0]["price_history"]] == [2100000, 2000000]
+    assert records[1]["price_history"] == []
+    assert records[0]["city"] == "Bogotá"
+
+
+def test_export_csv_filters():
+    response = client.get(
+        "/api/v1/export/listings?format=csv&city=Bogotá&include_inactive=true",
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"] for row in rows] == ["listing_000", "listing_002", "listing_004"]
+    assert rows[0]["title"] == 'Apartamento, 0 "vista"'
+    assert rows[0]["first_seen_at"].startswith("2026-03-01")
+
+
+def test_export_resumes_after_id():
+    response = client.get(
+        "/api/v1/export/listings?format=csv&after_id=listing_002",
+        headers={"Accept-Encoding": "identity"},
+    )
+    rows = list(csv.reader(io.StringIO(response.text)))
+    # No header on a resumed CSV, so it can be appended to the first part
+    assert [row[0] for row in rows] == ["listing_004", "listing_005"]
+
+
+def test_export_gzipped():
+    response = client.get("/api/v1/export/listings", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    # TestClient decodes the body transparently
+    assert len(response.text.splitlines()) == 5
+
+
+def test_iter_records_batches_history():
+    with TestSessionLocal() as db:
+        query = export.export_query(include_inactive=True)
+        records = list(export.iter_records(db, query, with_history=True, batch_size=2))
+    assert len(records) == 6
+    assert len(records[0]["price_history"]) == 2
+    assert all(record["price_history"] == [] for record in records[1:])
+
+
+def test_cli_exports_and_resumes(tmp_path, monkeypatch):
+    database = tmp_path / "export.db"
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(make_listings(6))
+        db.commit()
+    engine.dispose()
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{database}")
+
+    output = tmp_path / "listings.csv.gz"
+    assert export.main(["--output", str(output), "--format", "csv"]) == 0
+    # Appends a second gzip member without a second header
+    assert export.main(
+        ["--output", str(output), "--format", "csv", "--after-id", "listing_002"]
+    ) == 0
+
+    with gzip.open(output, "rt", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == export.COLUMNS
+    assert [row[0] for row in rows[1:]] == [
+        "listing_000", "listing_001", "listing_002", "listing_004", "listing_005",
+        "listing_004", "listing_005",
+    ]
+
+
+def test_cli_requires_database_url(monkeypatch, tmp_path):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    assert export.main(["--output", str(tmp_path / "out.ndjson")]) == 1
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from propfair_api.config import settings
+from propfair_api.database import get_read_session
+from propfair_api.instrumentation import RequestTimings
+from propfair_api.main import app
+from propfair_api.models import Base, Listing
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+Base.metadata.create_all(bind=test_engine)
+
+client = TestClient(app)
+
+
+def override_get_db():
+    db = TestSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def instrumented_db():
+    previous = app.dependency_overrides.get(get_read_session)
+    app.dependency_overrides[get_read_session] = override_get_db
+    yield
+    if previous is None:
+        del app.dependency_overrides[get_read_session]
+    else:
+        app.dependency_overrides[get_read_session] = previous
+
+
+def test_server_timing_header_splits_statements():
+    response = client.get("/api/v1/listings")
+    assert response.status_code == 200
+    entries = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    # The count and the page query, then everything else (serialization)
+    assert entries[:2] == ["db", "pool"]
+    assert "sql-1" in entries and "sql-2" in entries
+    assert entries[-1] == "app"
+
+
+def test_server_timing_format():
+    timings = RequestTimings(statements=[(0.004, 1), (0.010, 20)], pool_wait=0.001)
+    assert timings.server_timing(0.020) == (
+        'db;dur=14.0;desc="2 queries/21 rows", pool;dur=1.0, '
+        "sql-1;dur=4.0, sql-2;dur=10.0, app;dur=5.0"
+    )
+
+
+def test_slow_query_logged_with_plan(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    monkeypatch.setattr(settings, "slow_query_explain", True)
+    caplog.set_level(logging.WARNING, logger="propfair_api.instrumentation")
+    with TestSessionLocal() as db:
+        db.execute(select(Listing).where(Listing.city == "Bogotá")).all()
+
+    [record] = [record for record in caplog.records if "Slow query" in record.getMessage()]
+    message = record.getMessage()
+    assert "FROM listings" in message
+    assert "'Bogotá'" in message
+    assert "plan:" in message and "listings" in message.split("plan:")[1]
+
+
+def test_metrics_endpoint_exposes_statement_latency():
+    client.get("/api/v1/listings")
+    body = client.get("/metrics").text
+    assert 'propfair_api_db_statement_seconds_count{operation="SELECT"}' in body
+    assert 'propfair_api_http_request_seconds_count{route="/api/v1/listings"}' in body
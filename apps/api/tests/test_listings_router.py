@@ -6,7 +6,7 @@ from sqlalchemy.pool import StaticPool
 from datetime import datetime, timezone
 
 from propfair_api.main import app
-from propfair_api.database import get_db_session
+from propfair_api.database import get_db_session, get_read_session
 from propfair_api.models import Base, Listing
 
 
@@ -32,6 +32,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db_session] = override_get_db
+app.dependency_overrides[get_read_session] = override_get_db
 client = TestClient(app)
 
 
@@ -121,6 +122,8 @@ def sample_listings():
             city="Bogotá",
             latitude=4.6533,
             longitude=-74.0602,
+            barrio="Los Rosales",
+            localidad="Chapinero",
             images=[],
             amenities=[],
             first_seen_at=datetime.now(timezone.utc),
@@ -159,6 +162,14 @@ def test_search_listings_with_city_filter(sample_listings):
     assert data["total"] == 3
 
 
+def test_search_listings_city_partial_match(sample_listings):
+    """Test the city filter is a case-insensitive substring match."""
+    response = client.get("/api/v1/listings?city=bogot")
+    assert response.status_code == 200
+    assert response.json()["total"] == 3
+    assert client.get("/api/v1/listings?city=Cali").json()["total"] == 0
+
+
 def test_search_listings_with_price_range(sample_listings):
     """Test search with price range filter."""
     response = client.get("/api/v1/listings?min_price=1800000&max_price=3000000")
@@ -176,6 +187,18 @@ def test_search_listings_with_bedrooms_filter(sample_listings):
     assert data["total"] == 2  # listing_1 (2 beds) and listing_3 (3 beds)
 
 
+def test_search_listings_with_official_neighborhood(sample_listings):
+    """Test barrio/localidad filters match the point-in-polygon columns exactly."""
+    response = client.get("/api/v1/listings?localidad=Chapinero")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert data["items"][0]["barrio"] == "Los Rosales"
+
+    response = client.get("/api/v1/listings?barrio=Rosales")
+    assert response.json()["total"] == 0
+
+
 def test_search_listings_pagination(sample_listings):
     """Test pagination works correctly."""
     response = client.get("/api/v1/listings?page=1&page_size=2")
@@ -200,3 +223,50 @@ def test_get_listing_not_found():
     response = client.get("/api/v1/listings/nonexistent")
     assert response.status_code == 404
     assert response.json()["detail"] == "Listing not found"
+
+
+def test_get_listing_conditional(sample_listings):
+    """Test a listing revalidation with a matching ETag is a bodiless 304."""
+    response = client.get("/api/v1/listings/listing_1")
+    etag = response.headers["etag"]
+    assert etag.startswith('"')
+    assert "last-modified" in response.headers
+
+    response = client.get("/api/v1/listings/listing_1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get(
+        "/api/v1/listings/listing_1",
+        headers={"If-Modified-Since": response.headers["last-modified"]},
+    )
+    assert response.status_code == 304
+
+    # A re-priced listing gets a new ETag
+    db = TestSessionLocal()
+    listing = db.get(Listing, "listing_1")
+    listing.content_hash = "hash1-repriced"
+    db.commit()
+    db.close()
+    response = client.get("/api/v1/listings/listing_1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_search_listings_conditional(sample_listings):
+    """Test a search page revalidates until one of its listings changes."""
+    url = "/api/v1/listings?city=Bogotá"
+    response = client.get(url)
+    etag = response.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    # No Last-Modified: a page can change without any of its listings changing
+    assert "last-modified" not in response.headers
+    since = "Sun, 01 Mar 2099 00:00:00 GMT"
+    assert client.get(url, headers={"If-Modified-Since": since}).status_code == 200
+
+    db = TestSessionLocal()
+    db.get(Listing, "listing_2").is_active = False
+    db.commit()
+    db.close()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,217 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from propfair_api.config import settings
+from propfair_api.database import get_read_session
+from propfair_api.main import app
+from propfair_api.map_points import decode_points, encode_points, gzip_chunks
+from propfair_api.models import Base, Listing
+from propfair_api.routers.maps import points_cache
+from propfair_api.tiles import TileStore, decode_tile, encode_tile, tile_bounds, tile_position
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+Base.metadata.create_all(bind=test_engine)
+
+client = TestClient(app)
+
+
+def override_get_db():
+    db = TestSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def tiles_path(tmp_path, monkeypatch):
+    path = tmp_path / "heatmap.mbtiles"
+    store = TileStore(str(path))
+    store.put_many(
+        {
+            ("prices", 12, 1203, 1987): encode_tile(32, [(3, 4, 2, 45000.0)]),
+            ("deals", 12, 1203, 1987): encode_tile(32, [(3, 4, 2, 0.125)]),
+        }
+    )
+    store.set_metadata(name="propfair-heatmap", minzoom=10, maxzoom=16, cells=32, generated_at="v1")
+    store.close()
+    monkeypatch.setattr(settings, "heatmap_tiles_path", str(path))
+    return path
+
+
+def test_tile_math_round_trips():
+    x, y = tile_position(4.65, -74.05, 12)
+    south, west, north, east = tile_bounds(12, int(x), int(y))
+    assert south <= 4.65 <= north
+    assert west <= -74.05 <= east
+
+
+def test_get_heatmap_tile_versioned(tiles_path):
+    """Test a tile is served precompressed, and cached for good when versioned."""
+    response = client.get("/api/v1/maps/heatmap/prices/12/1203/1987?v=v1")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.json() == {"size": 32, "cells": [[3, 4, 2, 45000.0]]}
+
+    response = client.get("/api/v1/maps/heatmap/deals/12/1203/1987")
+    assert response.headers["cache-control"] == "public, max-age=300"
+
+
+def test_get_heatmap_tile_empty_or_invalid(tiles_path):
+    """Test empty tiles are 204 and bad coordinates or layers are rejected."""
+    assert client.get("/api/v1/maps/heatmap/prices/12/0/0").status_code == 204
+    assert client.get("/api/v1/maps/heatmap/prices/2/4/0").status_code == 404
+    assert client.get("/api/v1/maps/heatmap/rents/12/0/0").status_code == 422
+    assert client.get("/api/v1/maps/heatmap/prices/1000000/0/0").status_code == 422
+    assert client.get("/api/v1/maps/heatmap/prices/12/-1/0").status_code == 422
+
+
+def test_get_heatmap_layer_description(tiles_path):
+    """Test the layer description points at versioned tile URLs."""
+    data = client.get("/api/v1/maps/heatmap/deals").json()
+    assert data["tiles"][0].endswith("/api/v1/maps/heatmap/deals/{z}/{x}/{y}?v=v1")
+    assert (data["minzoom"], data["maxzoom"], data["version"]) == (10, 16, "v1")
+
+
+def test_heatmap_not_generated(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "heatmap_tiles_path", str(tmp_path / "missing.mbtiles"))
+    assert client.get("/api/v1/maps/heatmap/prices/12/0/0").status_code == 404
+
+
+def test_encoded_tiles_are_compact_json():
+    data = encode_tile(32, [(1, 2, 3, 4.0)])
+    assert json.loads(gzip.decompress(data)) == decode_tile(data)
+
+
+def make_listing(listing_id, latitude, longitude, price, city="Bogotá", is_active=True):
+    now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    return Listing(
+        id=listing_id,
+        external_id=listing_id,
+        source="fincaraiz",
+        url=f"https://example.com/{listing_id}",
+        title="Apartment",
+        price=price,
+        bedrooms=2,
+        bathrooms=1,
+        parking_spaces=0,
+        area=60.0,
+        address="Calle 60",
+        neighborhood="Chapinero",
+        city=city,
+        latitude=latitude,
+        longitude=longitude,
+        images=[],
+        amenities=[],
+        first_seen_at=now,
+        last_seen_at=now,
+        is_active=is_active,
+        content_hash=listing_id,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.fixture
+def pins():
+    previous = app.dependency_overrides.get(get_read_session)
+    app.dependency_overrides[get_read_session] = override_get_db
+    points_cache.clear()
+    db = TestSessionLocal()
+    db.add_all(
+        [
+            make_listing("a", 4.64512, -74.06321, 2500000),
+            make_listing("b", 4.64601, -74.06002, 3100000),
+            make_listing("c", 4.70000, -74.05000, 1800000),
+            make_listing("inactive", 4.64500, -74.06300, 2000000, is_active=False),
+            make_listing("far", 6.24420, -75.58120, 2200000, city="Medellín"),
+        ]
+    )
+    db.commit()
+    db.close()
+    yield
+    db = TestSessionLocal()
+    db.query(Listing).delete()
+    db.commit()
+    db.close()
+    points_cache.clear()
+    if previous is None:
+        del app.dependency_overrides[get_read_session]
+    else:
+        app.dependency_overrides[get_read_session] = previous
+
+
+def test_points_round_trip_quantized_and_delta_encoded():
+    points = [("a", 4.645123, -74.063214, 2500000), ("b", 4.601, -74.1, 3100000)]
+    payload = decode_points(b"".join(gzip_chunks(encode_points(points))))
+    assert payload["count"] == 2
+    decoded = dict(zip(payload["id"], zip(payload["lat"], payload["lng"], payload["price"])))
+    assert decoded["a"] == pytest.approx((4.645123, -74.063214, 2500000), abs=0.5e-5)
+
+    payload = json.loads("".join(encode_points(points, precision=None, include_ids=False)))
+    assert "id" not in payload and payload["lat"][0] in (4.645123, 4.601)
+
+
+def test_get_map_points_viewport(pins):
+    """Test pins come back columnar for active listings in the viewport only."""
+    url = "/api/v1/maps/points?south=4.6&west=-74.1&north=4.68&east=-74.0"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    data = response.json()
+    assert sorted(data["id"]) == ["a", "b"]
+    assert data["delta"] is True and data["truncated"] is False
+    # Coordinates are deltas along the pin order
+    first = data["id"].index("a")
+    latitudes = [sum(data["lat"][: n + 1]) / 1e5 for n in range(data["count"])]
+    assert latitudes[first] == pytest.approx(4.64512)
+
+    response = client.get(url + "&max_price=3000000&precision=4&delta=false")
+    assert response.json()["id"] == ["a"]
+    assert response.json()["lat"] == [46451]
+
+
+def test_get_map_points_cached_per_filter_set(pins, monkeypatch):
+    """Test the payload is cached for nearby viewports and revalidates by ETag."""
+    client.get("/api/v1/maps/points?south=4.6&west=-74.1&north=4.68&east=-74.0")
+
+    db = TestSessionLocal()
+    db.add(make_listing("new", 4.65, -74.07, 2000000))
+    db.commit()
+    db.close()
+    # Same 0.01° grid cells: served from the cache
+    response = client.get("/api/v1/maps/points?south=4.601&west=-74.099&north=4.675&east=-74.001")
+    assert sorted(response.json()["id"]) == ["a", "b"]
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/api/v1/maps/points?south=4.6&west=-74.1&north=4.68&east=-74.0",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    # Another filter set is a different entry
+    response = client.get(
+        "/api/v1/maps/points?south=4.6&west=-74.1&north=4.68&east=-74.0&ids=false"
+    )
+    assert response.json()["count"] == 3
+    assert "id" not in response.json()
+
+
+def test_get_map_points_truncates(pins, monkeypatch):
+    monkeypatch.setattr(settings, "map_points_limit", 1)
+    data = client.get("/api/v1/maps/points?south=4.6&west=-74.1&north=4.8&east=-74.0").json()
+    assert data["count"] == 1 and data["truncated"] is True
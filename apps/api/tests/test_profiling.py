@@ -0,0 +1,115 @@
+import json
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from propfair_api.profiling import (
+    ProfilerMiddleware,
+    Sampler,
+    _stack_under,
+    sign_profile_token,
+    verify_profile_token,
+    write_profile,
+)
+
+SECRET = "test-secret"
+
+
+def make_client(directory, sample_rate=0.0):
+    app = FastAPI()
+
+    @app.get("/slow/{item}")
+    async def slow(item: str) -> dict:
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+        return {"item": item}
+
+    profiled = ProfilerMiddleware(
+        app,
+        sampler=Sampler(0.001),
+        sample_rate=sample_rate,
+        secret=SECRET,
+        directory=str(directory),
+    )
+    return TestClient(profiled)
+
+
+def test_profile_token():
+    token = sign_profile_token(SECRET, now=1_000_000)
+    assert verify_profile_token(token, SECRET, ttl=300, now=1_000_100)
+    assert not verify_profile_token(token, SECRET, ttl=300, now=1_000_400)
+    assert not verify_profile_token(token, "other-secret", ttl=300, now=1_000_100)
+    tampered = token[:-1] + ("1" if token.endswith("0") else "0")
+    assert not verify_profile_token(tampered, SECRET, ttl=300, now=1_000_100)
+    assert not verify_profile_token("garbage", SECRET, ttl=300)
+
+
+def test_stack_under_root():
+    def inner(root):
+        return _stack_under(sys._getframe(), root)
+
+    def outer():
+        return inner(sys._getframe())
+
+    stack = outer().split(";")
+    assert [label.split(" ")[0].rsplit(".", 1)[-1] for label in stack] == ["outer", "inner"]
+    assert stack[0].endswith(f"tests/test_profiling.py:{outer.__code__.co_firstlineno})")
+    assert _stack_under(sys._getframe(), root=object()) is None
+
+
+def test_signed_header_profiles_request(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get("/slow/abc", headers={"X-Profile": sign_profile_token(SECRET)})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    metadata = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert metadata["trigger"] == "header"
+    assert metadata["route"] == "/slow/{item}"
+    assert metadata["path"] == "/slow/abc"
+    assert metadata["status"] == 200
+    assert metadata["duration_ms"] >= 100
+    assert metadata["samples"] > 0
+
+    folded = (tmp_path / f"{profile_id}.folded").read_text().splitlines()
+    counts = {}
+    for line in folded:
+        stack, count = line.rsplit(" ", 1)
+        counts[stack] = int(count)
+    assert sum(counts.values()) == metadata["samples"]
+    # Most samples land in the busy loop, under the middleware frame
+    in_handler = sum(count for stack, count in counts.items() if "slow (" in stack)
+    assert in_handler > metadata["samples"] / 2
+    assert all(
+        stack == "[await]" or stack.startswith("ProfilerMiddleware.__call__") for stack in counts
+    )
+
+
+def test_unsigned_requests_not_profiled(tmp_path):
+    client = make_client(tmp_path)
+    response = client.get("/slow/abc", headers={"X-Profile": "123.forged"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampled_requests_profiled(tmp_path):
+    client = make_client(tmp_path, sample_rate=1.0)
+    response = client.get("/slow/abc")
+    assert "x-profile-id" not in response.headers
+    [metadata] = [json.loads(path.read_text()) for path in tmp_path.glob("*.json")]
+    assert metadata["trigger"] == "sampled"
+
+
+def test_write_profile_keeps_newest(tmp_path):
+    for i in range(4):
+        write_profile(str(tmp_path), f"2026010{i}T000000-abc", "a;b 1\n", {}, keep=2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "20260102T000000-abc.folded",
+        "20260102T000000-abc.json",
+        "20260103T000000-abc.folded",
+        "20260103T000000-abc.json",
+    ]
@@ -0,0 +1,139 @@
+"""
+Query plan regression tests: the SQL that the endpoints and the scrapers
+actually generate is run through the planner (SQLite's EXPLAIN QUERY PLAN)
+against a schema created from the models. Lookups must SEARCH an index;
+any SCAN of a table, including a walk over a whole index, fails here.
+
+Known exception: listing search filters by substring (city and
+neighborhood ILIKE) and by ranges, which no index can seek. It walks the
+partial index of active listings newest first instead, and the page query
+stops at the page size.
+"""
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from propfair_api.database import get_read_session
+from propfair_api.main import app
+from propfair_api.models import Base, Listing, PriceHistory
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+Base.metadata.create_all(bind=test_engine)
+
+client = TestClient(app)
+
+INDEX_SEARCH = re.compile(r"^SEARCH \w+ USING (COVERING )?INDEX \w+ \(")
+# Listing search, ordered by date: see the module docstring
+ACTIVE_BY_DATE = "SCAN listings USING INDEX listings_created_at_idx"
+
+
+def override_get_db():
+    db = TestSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def plans_db():
+    previous = app.dependency_overrides.get(get_read_session)
+    app.dependency_overrides[get_read_session] = override_get_db
+    yield
+    if previous is None:
+        del app.dependency_overrides[get_read_session]
+    else:
+        app.dependency_overrides[get_read_session] = previous
+
+
+@pytest.fixture
+def captured_statements():
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(test_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(test_engine, "before_cursor_execute", capture)
+
+
+def query_plan(statement, parameters):
+    with test_engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[3] for row in rows]
+
+
+def assert_index_search(statement, parameters, allowed_scans=()):
+    """Every table access in the plan seeks an index, bar ``allowed_scans``."""
+    plan = query_plan(statement, parameters)
+    accesses = [detail for detail in plan if detail.startswith(("SCAN ", "SEARCH "))]
+    assert accesses, f"No table access in plan {plan} of:\n{statement}"
+    scans = [
+        detail
+        for detail in accesses
+        if not INDEX_SEARCH.match(detail) and detail not in allowed_scans
+    ]
+    assert not scans, f"Not an index search {scans} in plan {plan} of:\n{statement}"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/v1/listings",
+        "/api/v1/listings?page=3",
+        "/api/v1/listings?city=Bogotá",
+        "/api/v1/listings?city=Bogotá&min_price=2000000&max_price=4000000",
+        "/api/v1/listings?city=Bogotá&max_price=3000000&bedrooms=2&neighborhood=chapi",
+        "/api/v1/listings?city=Bogotá&barrio=Chicó",
+        "/api/v1/listings?city=Bogotá&localidad=Chapinero",
+        "/api/v1/listings?min_area=60&estrato=4",
+    ],
+)
+def test_search_queries_walk_active_listings_by_date(url, captured_statements):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert captured_statements
+    for statement, parameters in captured_statements:
+        assert_index_search(statement, parameters, allowed_scans=[ACTIVE_BY_DATE])
+
+
+def test_listing_detail_searches_primary_key(captured_statements):
+    response = client.get("/api/v1/listings/listing_1")
+    assert response.status_code == 404
+    assert captured_statements
+    for statement, parameters in captured_statements:
+        assert_index_search(statement, parameters)
+
+
+def test_pipeline_and_history_lookups_use_indexes():
+    """The scrapers' per-item lookup and a listing's price history."""
+    queries = [
+        select(Listing.id).where(Listing.source == "fincaraiz", Listing.external_id == "123"),
+        select(PriceHistory)
+        .where(PriceHistory.listing_id == "listing_1")
+        .order_by(PriceHistory.recorded_at.desc()),
+    ]
+    for query in queries:
+        compiled = query.compile(test_engine)
+        assert_index_search(str(compiled), tuple(compiled.params.values()))
+
+
+def test_harness_detects_scans():
+    with pytest.raises(AssertionError, match="Not an index search"):
+        assert_index_search("SELECT id FROM listings WHERE title = ?", ("Apartamento",))
+    # Walking a whole index is a scan too, unless listed as a known exception
+    walk = "SELECT id FROM listings WHERE is_active = 1 ORDER BY created_at DESC"
+    with pytest.raises(AssertionError, match="Not an index search"):
+        assert_index_search(walk, ())
+    assert_index_search(walk, (), allowed_scans=[ACTIVE_BY_DATE])
@@ -0,0 +1,102 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from propfair_api.auth import create_access_token
+from propfair_api.database import get_db_session
+from propfair_api.throttling import (
+    Limit,
+    LoadShedder,
+    MemoryBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    load_shedder,
+    route_class,
+)
+
+
+def make_client(backend=None):
+    limiter = RateLimiter(
+        backend or MemoryBackend(),
+        {"auth": "2/minute", "default": "3/minute"},
+        authenticated_factor=2.0,
+    )
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.get("/api/v1/auth/me")
+    @app.get("/api/v1/listings")
+    @app.get("/health")
+    async def endpoint() -> dict:
+        return {}
+
+    return TestClient(app)
+
+
+def test_route_classes():
+    assert route_class("/api/v1/auth/login") == "auth"
+    assert route_class("/api/v1/maps/heatmap/prices/12/1/2") == "tiles"
+    assert route_class("/api/v1/user/favorites") == "default"
+    assert route_class("/health") is None
+    assert Limit.parse("60/minute").rate == 1.0
+    with pytest.raises(ValueError):
+        Limit.parse("60/fortnight")
+    for value in ("0/minute", "-5/hour"):
+        with pytest.raises(ValueError):
+            Limit.parse(value)
+
+
+async def test_memory_bucket_refills():
+    backend = MemoryBackend()
+    limit = Limit(capacity=2, rate=1.0)
+    assert await backend.take("k", limit, now=0.0) == 0
+    assert await backend.take("k", limit, now=0.0) == 0
+    assert await backend.take("k", limit, now=0.25) == pytest.approx(0.75)
+    assert await backend.take("k", limit, now=1.0) == 0
+
+
+def test_rate_limit_per_route_class_and_client():
+    client = make_client()
+    assert [client.get("/api/v1/auth/me").status_code for _ in range(3)] == [200, 200, 429]
+    response = client.get("/api/v1/auth/me")
+    assert int(response.headers["retry-after"]) >= 1
+
+    # Other route classes have their own buckets; health checks are never limited
+    assert client.get("/api/v1/listings").status_code == 200
+    assert all(client.get("/health").status_code == 200 for _ in range(10))
+
+    # A signed-in user is limited on their own, with the authenticated factor
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user-1'})}"}
+    codes = [client.get("/api/v1/auth/me", headers=headers).status_code for _ in range(5)]
+    assert codes == [200, 200, 200, 200, 429]
+
+
+def test_rate_limit_fails_open():
+    class BrokenBackend:
+        async def take(self, key, limit):
+            raise ConnectionError("redis down")
+
+    client = make_client(BrokenBackend())
+    assert all(client.get("/api/v1/auth/me").status_code == 200 for _ in range(5))
+
+
+def test_load_shedder_sheds_until_pool_recovers():
+    shedder = LoadShedder(max_in_flight=1, max_pool_wait=0.1, retry_after=2)
+    with shedder.admit(), pytest.raises(HTTPException) as excinfo, shedder.admit():
+        pass
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"] == "2"
+    assert shedder.in_flight == 0
+
+    for _ in range(5):
+        shedder.record_pool_wait(1.0, now=100.0)
+    assert shedder.overloaded(now=101.0)
+    # No fresh slow checkouts: admit again
+    assert not shedder.overloaded(now=102.5)
+
+
+def test_get_db_session_sheds_load(monkeypatch):
+    monkeypatch.setattr(load_shedder, "max_in_flight", 0)
+    with pytest.raises(HTTPException) as excinfo:
+        next(get_db_session())
+    assert excinfo.value.status_code == 503
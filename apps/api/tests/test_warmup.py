@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from propfair_api import auth, main
+from propfair_api.config import settings
+from propfair_api.database import get_read_session
+from propfair_api.models import Base
+from propfair_api.warmup import Step, Warmup
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+Base.metadata.create_all(bind=test_engine)
+
+
+def override_get_db():
+    db = TestSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def app_warmup(monkeypatch):
+    """A fresh copy of the app's warmup steps, and a database for the primed URLs."""
+    fresh = Warmup()
+    fresh.steps = [Step(step.name, step.run, step.required) for step in main.warmup.steps]
+    monkeypatch.setattr(main, "warmup", fresh)
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["pbkdf2_sha256"]))
+    monkeypatch.setattr(settings, "warmup_urls", ["/api/v1/listings"])
+    previous = main.app.dependency_overrides.get(get_read_session)
+    main.app.dependency_overrides[get_read_session] = override_get_db
+    yield fresh
+    if previous is None:
+        del main.app.dependency_overrides[get_read_session]
+    else:
+        main.app.dependency_overrides[get_read_session] = previous
+
+
+def wait_until_finished(warmup, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not warmup.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_optional_step_failure_keeps_ready():
+    warmup = Warmup()
+    warmup.add("database", lambda: "1/1 databases")
+
+    def broken():
+        raise RuntimeError("no model file")
+
+    warmup.add("model", broken, required=False)
+    assert asyncio.run(warmup.run())
+    report = warmup.report()
+    assert report["status"] == "ready"
+    assert report["components"]["database"]["detail"] == "1/1 databases"
+    assert report["components"]["model"]["status"] == "failed"
+    assert "no model file" in report["components"]["model"]["detail"]
+
+
+def test_required_step_retried_until_it_passes():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("database starting")
+
+    warmup = Warmup()
+    warmup.add("database", flaky)
+    assert not asyncio.run(warmup.run())
+    assert warmup.status == "unavailable"
+    asyncio.run(warmup.run_until_ready(retry_after=0))
+    assert warmup.ready
+    assert len(attempts) == 3
+
+
+def test_ready_is_503_until_warm(app_warmup):
+    client = TestClient(main.app)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming"
+    assert client.get("/health").status_code == 200
+
+
+def test_startup_warmup_reports_components(app_warmup):
+    with TestClient(main.app) as client:
+        wait_until_finished(app_warmup)
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    components = body["components"]
+    assert list(components) == ["database", "password_hashing", "caches"]
+    assert all(component["status"] == "ok" for component in components.values())
+    assert components["caches"]["detail"] == "1 URLs"
+    assert all(component["seconds"] >= 0 for component in components.values())
+
+
+def test_warmup_disabled(app_warmup, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_enabled", False)
+    with TestClient(main.app) as client:
+        response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["components"]["database"]["status"] == "skipped"
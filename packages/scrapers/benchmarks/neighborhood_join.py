@@ -0,0 +1,104 @@
+"""
+Point-in-polygon throughput: listings assigned to neighborhood polygons.
+
+Tiles a Bogotá-sized area with a grid of barrio polygons whose shared edges
+wiggle (``--vertices`` per side, like real cadastral boundaries), then
+locates random points with ``NeighborhoodIndex`` and checks a sample against
+a brute-force scan of every polygon.
+
+Usage:
+    python benchmarks/neighborhood_join.py [--points N] [--grid G] [--vertices V]
+"""
+import argparse
+import json
+import math
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from propfair_scrapers.neighborhoods import NeighborhoodIndex
+
+MIN_LON, MIN_LAT, SPAN = -74.22, 4.47, 0.30
+
+
+def wiggle(x: float, y: float, t: float, cell: float) -> float:
+    # Same offset for a shared edge point whichever cell draws it (t or 1 - t
+    # along the side); tapering to 0 at the corners keeps neighbours disjoint
+    return 0.15 * cell * math.sin(math.pi * t) * math.sin(round(x, 9) * 917.0 + round(y, 9) * 613.0)
+
+
+def cell_ring(column: int, row: int, size: float, vertices: int):
+    x0, y0 = MIN_LON + column * size, MIN_LAT + row * size
+    ring = []
+    steps = [i / vertices for i in range(vertices)]
+    for t in steps:  # bottom, left to right
+        x = x0 + t * size
+        ring.append([x, y0 + wiggle(x, y0, t, size)])
+    for t in steps:  # right, bottom to top
+        y = y0 + t * size
+        ring.append([x0 + size + wiggle(x0 + size, y, t, size), y])
+    for t in steps:  # top, right to left
+        x = x0 + size - t * size
+        ring.append([x, y0 + size + wiggle(x, y0 + size, t, size)])
+    for t in steps:  # left, top to bottom
+        y = y0 + size - t * size
+        ring.append([x0 + wiggle(x0, y, t, size), y])
+    ring.append(ring[0])
+    return ring
+
+
+def make_geojson(path: Path, grid: int, vertices: int) -> None:
+    size = SPAN / grid
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"name": f"barrio-{column}-{row}", "localidad": f"localidad-{column // 5}"},
+            "geometry": {"type": "Polygon", "coordinates": [cell_ring(column, row, size, vertices)]},
+        }
+        for column in range(grid)
+        for row in range(grid)
+    ]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--grid", type=int, default=40, help="Polygons per side")
+    parser.add_argument("--vertices", type=int, default=50, help="Vertices per polygon side")
+    parser.add_argument("--check", type=int, default=2000, help="Points verified by brute force")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "barrios.geojson"
+        make_geojson(path, args.grid, args.vertices)
+        start = time.perf_counter()
+        index = NeighborhoodIndex.from_geojson(path)
+        load = time.perf_counter() - start
+
+    points = [
+        (MIN_LAT + rng.uniform(0.01, SPAN - 0.01), MIN_LON + rng.uniform(0.01, SPAN - 0.01))
+        for _ in range(args.points)
+    ]
+    start = time.perf_counter()
+    located = index.locate_many(points)
+    elapsed = time.perf_counter() - start
+
+    mismatches = 0
+    for point, found in list(zip(points, located))[: args.check]:
+        expected = [r.neighborhood for r in index.regions if r.contains(point[1], point[0])]
+        mismatches += expected[:1] != ([found] if found else [])
+
+    edges = sum(len(ring) for region in index.regions for ring in region._edges)
+    print(f"polygons:   {len(index)} ({args.vertices * 4} vertices each, {edges} banded edges)")
+    print(f"load:       {load:.2f}s")
+    print(f"points:     {args.points} in {elapsed:.2f}s ({args.points / elapsed:,.0f}/s)")
+    print(f"unassigned: {sum(found is None for found in located)}")
+    print(f"brute-force mismatches in {args.check} checked: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
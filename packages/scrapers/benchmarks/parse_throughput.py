@@ -0,0 +1,195 @@
+"""
+Parse-throughput benchmark for FincaRaizSpider detail pages.
+
+Runs the indexed extractor (``FincaRaizSpider.extract_listing``) and the
+previous selector-per-field extractor over a corpus of saved detail pages,
+checks that both produce identical items, and reports pages per second.
+
+Usage:
+    python benchmarks/parse_throughput.py [CORPUS_DIR] [--rounds N]
+
+Each ``<external_id>.html`` file in CORPUS_DIR is treated as the detail page
+for that listing. Defaults to the test fixtures.
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from scrapy.http import HtmlResponse
+
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "fincaraiz"
+URL_TEMPLATE = "https://www.fincaraiz.com.co/apartamento-en-arriendo-en-bogota/{}"
+
+
+def legacy_extract(spider: FincaRaizSpider, response) -> dict | None:
+    """The selector-per-field extractor the spider used before PageIndex."""
+
+    def number_from_text(pattern):
+        matches = response.css('*::text').re(pattern)
+        if matches:
+            try:
+                return int(matches[0])
+            except ValueError:
+                pass
+        return None
+
+    def float_from_text(pattern):
+        matches = response.css('*::text').re(pattern)
+        if matches:
+            try:
+                return float(matches[0].replace(",", "."))
+            except ValueError:
+                pass
+        return None
+
+    def number_from_details(label):
+        detail_text = response.css(f'*:contains("{label}") ~ *::text, *:contains("{label}") + *::text').re(r'(\d+)')
+        if detail_text:
+            try:
+                return int(detail_text[0])
+            except ValueError:
+                pass
+        return None
+
+    def detail_value(label):
+        values = response.css(f'*:contains("{label}") ~ strong::text, *:contains("{label}") + strong::text').getall()
+        if values:
+            return values[0].strip()
+        return None
+
+    external_id = response.url.split("/")[-1]
+    codigo_text = response.css('*:contains("Código Fincaraíz:")::text').re(r'Código Fincaraíz:\s*(\d+)')
+    if codigo_text:
+        external_id = codigo_text[0]
+
+    price_text = response.css('p:contains("Precio de Arriendo")::text, p:contains("$")::text').re(r'\$\s*[\d.]+')[0] if response.css('p:contains("$")::text') else None
+    price = spider._parse_price(price_text) if price_text else None
+
+    admin_fee_text = response.css('*:contains("administración")::text').re(r'\$\s*[\d.]+')
+    admin_fee = spider._parse_price(admin_fee_text[0]) if admin_fee_text else None
+
+    title = response.css('h1::text').get()
+
+    description_parts = response.css('h4:contains("Descripción") ~ * ::text').getall()
+    description = " ".join([p.strip() for p in description_parts if p.strip()])[:1000]
+
+    bedrooms = number_from_text(r'(\d+)\s*Habs?\.?')
+    bathrooms = number_from_text(r'(\d+)\s*Baños?\.?')
+    parking = number_from_details("Parqueaderos")
+    area = float_from_text(r'(\d+(?:[.,]\d+)?)\s*m²')
+
+    location_texts = response.css('h4:contains("Ubicación") ~ p::text').getall()
+    neighborhood = location_texts[0].strip() if len(location_texts) > 0 else ""
+    if "," in neighborhood:
+        neighborhood = neighborhood.split(",")[0].strip()
+
+    lat = None
+    lng = None
+    map_elem = response.css('[data-lat], [data-lng]')
+    if map_elem:
+        lat = map_elem.css('::attr(data-lat)').get()
+        lng = map_elem.css('::attr(data-lng)').get()
+
+    estrato = number_from_details("Estrato")
+    floor = number_from_details("Piso N")
+    building_age = spider._parse_building_age(detail_value("Antigüedad"))
+
+    images = response.css('.emblaGalleryCarousel img::attr(src), .gallery-image img::attr(src)').getall()
+    images = list(dict.fromkeys([img for img in images if 'cdn' in img and 'logo' not in img.lower()]))[:20]
+
+    amenities = response.css('h4:contains("Comodidades") ~ * *:contains("•")::text').getall()
+    amenities = [a.replace("•", "").strip() for a in amenities if a.strip() and len(a.strip()) > 2]
+
+    if not all([external_id, price, bedrooms is not None, bathrooms is not None, area, neighborhood]):
+        return None
+
+    return {
+        "external_id": str(external_id),
+        "source": "fincaraiz",
+        "url": response.url,
+        "title": title.strip() if title else "",
+        "description": description.strip() if description else None,
+        "price": price,
+        "admin_fee": admin_fee,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "parking_spaces": parking or 0,
+        "area": area,
+        "estrato": estrato,
+        "floor": floor,
+        "building_age": building_age,
+        "address": neighborhood,
+        "neighborhood": neighborhood,
+        "city": (
+            spider._extract_city(location_texts[0] if location_texts else None, title)
+            or spider._partition_city(response)
+        ),
+        "latitude": float(lat) if lat else None,
+        "longitude": float(lng) if lng else None,
+        "images": images,
+        "amenities": amenities,
+    }
+
+
+def load_corpus(corpus_dir: Path) -> list:
+    return [
+        HtmlResponse(url=URL_TEMPLATE.format(path.stem), body=path.read_bytes(), encoding="utf-8")
+        for path in sorted(corpus_dir.glob("*.html"))
+    ]
+
+
+def fresh(response: HtmlResponse) -> HtmlResponse:
+    """Copy a response so the cached selector is rebuilt, as for a new download."""
+    return response.replace()
+
+
+def run(extract, responses: list, rounds: int) -> float:
+    """Return pages per second for ``extract`` over ``rounds`` passes of the corpus."""
+    batches = [[fresh(response) for response in responses] for _ in range(rounds)]
+    start = time.perf_counter()
+    for batch in batches:
+        for response in batch:
+            extract(response)
+    elapsed = time.perf_counter() - start
+    return len(responses) * rounds / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    spider = FincaRaizSpider()
+    logging.getLogger(spider.name).setLevel(logging.ERROR)
+    responses = load_corpus(args.corpus)
+    if not responses:
+        print(f"No .html pages found in {args.corpus}")
+        return 1
+
+    mismatches = 0
+    for response in responses:
+        item = spider.extract_listing(fresh(response))
+        indexed = dict(item) if item is not None else None
+        legacy = legacy_extract(spider, fresh(response))
+        if indexed != legacy:
+            mismatches += 1
+            print(f"MISMATCH {response.url}\n  indexed: {indexed}\n  legacy:  {legacy}")
+
+    legacy_rate = run(lambda r: legacy_extract(spider, r), responses, args.rounds)
+    indexed_rate = run(spider.extract_listing, responses, args.rounds)
+
+    print(f"pages:    {len(responses)} x {args.rounds} rounds")
+    print(f"legacy:   {legacy_rate:10.1f} pages/s")
+    print(f"indexed:  {indexed_rate:10.1f} pages/s")
+    print(f"speedup:  {indexed_rate / legacy_rate:10.2f}x")
+    print(f"output:   {'identical' if not mismatches else f'{mismatches} mismatches'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
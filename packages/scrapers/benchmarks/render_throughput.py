@@ -0,0 +1,184 @@
+"""
+Render-throughput benchmark for Playwright page fetching.
+
+Serves the saved detail pages from a local fixture site, padded with the
+kinds of resources the real site loads (gallery images, web fonts, an
+analytics script and map tiles on a third-party host), then renders every
+page twice:
+
+- baseline:  a new page per request and no request blocking (the old spider)
+- optimized: pages reused from a PagePool and ResourceBlocker route
+             interception configured from the project settings
+
+and reports pages per minute and bytes served per page for each.
+
+Usage:
+    python benchmarks/render_throughput.py [CORPUS_DIR] [--rounds N] [--concurrency N]
+
+Requires a Playwright Chromium install (``playwright install chromium``).
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from propfair_scrapers import settings
+from propfair_scrapers.browser import PagePool, ResourceBlocker
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "fincaraiz"
+
+FIRST_PARTY = "127.0.0.1"
+# Resolves to the same server but counts as a different site for the browser
+THIRD_PARTY = "localhost"
+
+ASSETS = {
+    "/static/gallery.jpg": ("image/jpeg", 180_000),
+    "/static/font.woff2": ("font/woff2", 40_000),
+    "/static/app.js": ("application/javascript", 60_000),
+    "/analytics.js": ("application/javascript", 90_000),
+    "/tiles/tile.png": ("image/png", 25_000),
+}
+
+
+def page_html(fixture: str, port: int) -> str:
+    """Inject the heavy resources of a real detail page into a fixture page."""
+    first = f"http://{FIRST_PARTY}:{port}"
+    third = f"http://{THIRD_PARTY}:{port}"
+    gallery = "".join(f'<img src="{first}/static/gallery.jpg?{i}">' for i in range(12))
+    tiles = "".join(f'<img src="{third}/tiles/tile.png?{i}">' for i in range(16))
+    extra = (
+        f'<style>@font-face {{ font-family: f; src: url("{first}/static/font.woff2"); }}'
+        f" body {{ font-family: f; }}</style>"
+        f'<script src="{first}/static/app.js"></script>'
+        f'<script src="{third}/analytics.js"></script>'
+        f'<div class="gallery">{gallery}</div><div class="map-tiles">{tiles}</div>'
+    )
+    # Gallery images point at the real CDN; serve them locally instead
+    fixture = fixture.replace("https://cdn.fincaraiz.com.co/", f"{first}/cdn/")
+    return fixture.replace("</body>", f"{extra}</body>")
+
+
+class FixtureSite:
+    """Threaded local HTTP server that counts the bytes it sends."""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path.startswith("/cdn/"):
+                    path = "/static/gallery.jpg"
+                if path in ASSETS:
+                    content_type, size = ASSETS[path]
+                    body = b"x" * size
+                elif path in site.pages:
+                    content_type = "text/html; charset=utf-8"
+                    body = page_html(site.pages[path], site.port).encode()
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with site._lock:
+                    site.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((FIRST_PARTY, 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def urls(self) -> list:
+        return [f"http://{FIRST_PARTY}:{self.port}{path}" for path in self.pages]
+
+
+async def render_baseline(context, url: str, pool: PagePool) -> None:
+    page = await context.new_page()
+    await page.goto(url)
+    await page.wait_for_selector("h1", timeout=5000)
+    await page.close()
+
+
+async def render_optimized(context, url: str, pool: PagePool) -> None:
+    page = pool.acquire() or await context.new_page()
+    await page.goto(url)
+    await page.wait_for_selector("h1", timeout=5000)
+    await pool.release(page)
+
+
+async def measure(render, site: FixtureSite, urls: list, concurrency: int, blocker=None) -> tuple:
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch()
+        context = await browser.new_context()
+        if blocker is not None:
+            async def route(route):
+                if blocker(route.request):
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route("**/*", route)
+        pool = PagePool(concurrency)
+        queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+
+        async def worker():
+            while not queue.empty():
+                await render(context, queue.get_nowait(), pool)
+
+        site.bytes_sent = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        await browser.close()
+    return len(urls) / elapsed * 60, site.bytes_sent / len(urls)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=settings.PLAYWRIGHT_PAGE_POOL_SIZE)
+    args = parser.parse_args()
+
+    pages = {
+        f"/apartamento-en-arriendo-en-bogota/{path.stem}": path.read_text()
+        for path in sorted(args.corpus.glob("*.html"))
+    }
+    if not pages:
+        print(f"No .html pages found in {args.corpus}")
+        return 1
+
+    site = FixtureSite(pages)
+    urls = site.urls() * args.rounds
+    blocker = ResourceBlocker(
+        resource_types=settings.PLAYWRIGHT_BLOCKED_RESOURCE_TYPES,
+        blocked_domains=list(settings.PLAYWRIGHT_BLOCKED_DOMAINS) + [THIRD_PARTY],
+    )
+
+    before = asyncio.run(measure(render_baseline, site, urls, args.concurrency))
+    after = asyncio.run(measure(render_optimized, site, urls, args.concurrency, blocker))
+
+    print(f"pages:      {len(urls)} at concurrency {args.concurrency}")
+    print(f"{'':10}  {'pages/min':>10}  {'bytes/page':>12}")
+    print(f"{'baseline':10}  {before[0]:10.1f}  {before[1]:12,.0f}")
+    print(f"{'optimized':10}  {after[0]:10.1f}  {after[1]:12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
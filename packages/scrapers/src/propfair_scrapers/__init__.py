@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The pipelines and the python -m propfair_scrapers.* tools share the API's
+# models; outside an install with propfair_api, import it from the monorepo
+API_SRC = os.path.normpath(os.path.join(os.path.dirname(__file__), "../../../../apps/api/src"))
+if os.path.isdir(API_SRC) and API_SRC not in sys.path:
+    sys.path.append(API_SRC)
@@ -0,0 +1,166 @@
+import gzip
+import json
+import os
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse, TextResponse
+
+
+class PageArchive:
+    """
+    Append-only archive of fetched pages.
+
+    The archive is a directory of gzip segments named
+    ``<spider>-<UTC timestamp>-<pid>-<n>.jsonl.gz``, so sorting the names
+    orders the segments by when they were started. Each record is one JSON
+    line holding the URL, fetch time, status, spider callback and page body,
+    compressed as its own gzip member: a crash can only lose the record being
+    written, and readers stop cleanly at a truncated tail.
+    """
+
+    def __init__(self, directory, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self._file = None
+        self._segment = 0
+        self._prefix = None
+
+    def segments(self) -> list:
+        return sorted(self.directory.glob("*.jsonl.gz"))
+
+    def append(
+        self,
+        url: str,
+        body: str,
+        callback: str,
+        status: int = 200,
+        fetched_at: datetime | None = None,
+        name: str = "pages",
+    ) -> None:
+        """Append one fetched page to the current segment."""
+        if self._file is None or self._file.tell() >= self.segment_bytes:
+            self._open_segment(name)
+        record = {
+            "url": url,
+            "fetched_at": (fetched_at or datetime.now(UTC)).isoformat(),
+            "status": status,
+            "callback": callback,
+            "body": body,
+        }
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        self._file.write(gzip.compress(line))
+        self._file.flush()
+
+    def _open_segment(self, name: str) -> None:
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self._prefix is None:
+            started = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+            self._prefix = f"{name}-{started}-{os.getpid()}"
+        path = self.directory / f"{self._prefix}-{self._segment:04d}.jsonl.gz"
+        self._segment += 1
+        # Stays open across appends until the segment fills or close()
+        self._file = open(path, "ab")  # noqa: SIM115
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def records(self, segments: Iterable[Path] | None = None) -> Iterator[dict]:
+        """Stream records from ``segments`` (default: all), oldest segment first."""
+        for path in self.segments() if segments is None else segments:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                try:
+                    for line in f:
+                        if line.endswith("\n"):
+                            yield json.loads(line)
+                except (EOFError, gzip.BadGzipFile):
+                    # Truncated final record from an interrupted crawl
+                    continue
+
+    def replay_requests(
+        self,
+        spider,
+        callbacks: Iterable[str] = ("parse_listing_detail",),
+        shard: int = 0,
+        shards: int = 1,
+    ) -> Iterator[scrapy.Request]:
+        """
+        Requests that re-run archived pages through ``spider`` callbacks.
+
+        Records are split between ``shards`` by URL, so every fetch of a URL
+        is replayed by the same worker in fetch order.
+        """
+        callbacks = set(callbacks)
+        for record in self.records():
+            if record["callback"] not in callbacks:
+                continue
+            if shards > 1 and zlib.crc32(record["url"].encode()) % shards != shard:
+                continue
+            yield scrapy.Request(
+                record["url"],
+                callback=getattr(spider, record["callback"]),
+                dont_filter=True,
+                meta={"archive_record": record},
+            )
+
+
+class ArchiveReplayMiddleware:
+    """Answer replayed requests from their archive record instead of the network."""
+
+    def process_request(self, request, spider):
+        record = request.meta.get("archive_record")
+        if record is None:
+            return None
+        return HtmlResponse(
+            url=record["url"],
+            status=record["status"],
+            body=record["body"].encode("utf-8"),
+            encoding="utf-8",
+            request=request,
+        )
+
+
+class PageArchiveMiddleware:
+    """Store every fetched page in the ``PAGE_ARCHIVE_DIR`` archive."""
+
+    def __init__(self, archive: PageArchive, stats):
+        self.archive = archive
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("PAGE_ARCHIVE_DIR")
+        if not directory:
+            raise NotConfigured("PAGE_ARCHIVE_DIR not set")
+        archive = PageArchive(
+            directory,
+            crawler.settings.getint("PAGE_ARCHIVE_SEGMENT_BYTES", 64 * 1024 * 1024),
+        )
+        middleware = cls(archive, crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_closed(self, spider):
+        self.archive.close()
+
+    def process_response(self, request, response, spider):
+        if "archive_record" in request.meta or not isinstance(response, TextResponse):
+            return response
+        callback = getattr(request.callback, "__name__", "parse")
+        self.archive.append(
+            url=response.url,
+            body=response.text,
+            callback=callback,
+            status=response.status,
+            name=spider.name,
+        )
+        self.stats.inc_value("archive/pages", spider=spider)
+        return response
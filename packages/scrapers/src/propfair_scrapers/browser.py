@@ -0,0 +1,117 @@
+from collections import deque
+from collections.abc import Iterable
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+
+class ResourceBlocker:
+    """
+    Predicate for ``PLAYWRIGHT_ABORT_REQUEST`` that aborts browser requests
+    the spiders never read.
+
+    Blocks by Playwright resource type (images, fonts, media), by domain
+    (analytics, ads, map tiles), and optionally everything outside a set of
+    first-party domains.
+    """
+
+    def __init__(
+        self,
+        resource_types: Iterable[str] = (),
+        blocked_domains: Iterable[str] = (),
+        first_party_domains: Iterable[str] | None = None,
+    ):
+        self.resource_types = frozenset(resource_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.first_party_domains = (
+            tuple(first_party_domains) if first_party_domains is not None else None
+        )
+
+    def __call__(self, request) -> bool:
+        return self.should_block(request.resource_type, request.url)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        host = urlparse(url).hostname or ""
+        if _host_matches(host, self.blocked_domains):
+            return True
+        if self.first_party_domains is not None:
+            return not _host_matches(host, self.first_party_domains)
+        return False
+
+
+class PagePool:
+    """Bounded pool of idle Playwright pages kept open between requests."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = deque()
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def acquire(self):
+        """Return an idle page, or None if the pool is empty."""
+        while self._idle:
+            page = self._idle.popleft()
+            if not page.is_closed():
+                return page
+        return None
+
+    async def release(self, page) -> None:
+        """Keep ``page`` for reuse, closing it if the pool is already full."""
+        if page.is_closed():
+            return
+        if len(self._idle) < self.size:
+            self._idle.append(page)
+        else:
+            await page.close()
+
+
+class PlaywrightPagePoolMiddleware:
+    """
+    Downloader middleware that hands pooled pages to Playwright requests.
+
+    Spiders return pages with ``release_page`` instead of closing them, and
+    the next ``playwright_include_page`` request reuses one through the
+    ``playwright_page`` meta key instead of opening a new tab.
+    """
+
+    def __init__(self, size: int, stats):
+        self.pool = PagePool(size)
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        size = crawler.settings.getint("PLAYWRIGHT_PAGE_POOL_SIZE")
+        if size <= 0:
+            raise NotConfigured("PLAYWRIGHT_PAGE_POOL_SIZE is 0")
+        # Idle pages hold one of the context's page slots. Keeping the pool
+        # smaller than the slot count guarantees a release eventually closes a
+        # page, so requests waiting for a slot cannot starve.
+        max_pages = crawler.settings.getint("PLAYWRIGHT_MAX_PAGES_PER_CONTEXT")
+        if max_pages:
+            size = min(size, max_pages - 1)
+        middleware = cls(size, crawler.stats)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        return middleware
+
+    def spider_opened(self, spider):
+        spider.page_pool = self.pool
+
+    def process_request(self, request, spider):
+        meta = request.meta
+        if not meta.get("playwright") or not meta.get("playwright_include_page"):
+            return
+        if meta.get("playwright_page") is not None:
+            return
+        page = self.pool.acquire()
+        if page is not None:
+            meta["playwright_page"] = page
+            self.stats.inc_value("playwright/page_pool/reused", spider=spider)
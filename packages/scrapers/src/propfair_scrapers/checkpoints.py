@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from itertools import product
+from pathlib import Path
+from urllib.parse import urlencode
+
+# Names listings carry for the CRAWL_CITIES slugs
+CITY_NAMES = {
+    "bogota": "Bogotá",
+    "medellin": "Medellín",
+    "cali": "Cali",
+    "barranquilla": "Barranquilla",
+}
+
+
+def city_name(slug: str) -> str:
+    """City name for a search slug: "bogota" -> "Bogotá", "santa-marta" -> "Santa Marta"."""
+    return CITY_NAMES.get(slug, slug.replace("-", " ").title())
+
+
+@dataclass(frozen=True)
+class CrawlPartition:
+    """One search to crawl: a city, a property type and an optional price band."""
+
+    city: str
+    property_type: str
+    min_price: int | None = None
+    max_price: int | None = None
+
+    @property
+    def key(self) -> str:
+        """Stable identifier, e.g. ``bogota/apartamentos/1500000-3000000``."""
+        key = f"{self.city}/{self.property_type}"
+        if self.min_price is not None or self.max_price is not None:
+            key += f"/{self.min_price or 0}-{self.max_price if self.max_price is not None else ''}"
+        return key
+
+    @property
+    def city_name(self) -> str:
+        return city_name(self.city)
+
+    def url(self, template: str, price_params: Sequence[str] = ("precio-desde", "precio-hasta")) -> str:
+        url = template.format(city=self.city, property_type=self.property_type)
+        params = {}
+        if self.min_price is not None:
+            params[price_params[0]] = self.min_price
+        if self.max_price is not None:
+            params[price_params[1]] = self.max_price
+        return f"{url}?{urlencode(params)}" if params else url
+
+
+def generate_partitions(
+    cities: Sequence[str],
+    property_types: Sequence[str],
+    price_bands: Sequence[Sequence[int | None]] = (),
+) -> list[CrawlPartition]:
+    """Every city x property type x price band combination."""
+    bands = [tuple(band) for band in price_bands] or [(None, None)]
+    return [
+        CrawlPartition(city, property_type, min_price, max_price)
+        for city, property_type, (min_price, max_price) in product(cities, property_types, bands)
+    ]
+
+
+@dataclass
+class Checkpoint:
+    """Progress of one partition: the next search page and detail pages still to fetch."""
+
+    key: str
+    cursor: str | None = None
+    pending: list[str] = field(default_factory=list)
+    pages: int = 0
+    done: bool = False
+
+
+class CheckpointStore:
+    """
+    Partition checkpoints persisted as one JSON file per partition.
+
+    Updates are buffered and written at most every ``flush_interval`` seconds
+    (and on ``flush()``); files are replaced atomically, so a crash leaves the
+    previous checkpoint intact and only repeats a few already-fetched pages.
+    """
+
+    def __init__(self, directory, flush_interval: float = 5.0):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self._checkpoints: dict[str, Checkpoint] = {}
+        self._dirty = set()
+        self._flushed_at = time.monotonic()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key.replace("/", "__") + ".json")
+
+    def load(self, key: str) -> Checkpoint | None:
+        if key not in self._checkpoints:
+            path = self._path(key)
+            if not path.exists():
+                return None
+            self._checkpoints[key] = Checkpoint(**json.loads(path.read_text()))
+        return self._checkpoints[key]
+
+    def get(self, key: str) -> Checkpoint:
+        checkpoint = self.load(key)
+        if checkpoint is None:
+            checkpoint = self._checkpoints[key] = Checkpoint(key)
+        return checkpoint
+
+    def page_crawled(self, key: str, detail_urls: list[str], next_page: str | None) -> None:
+        """Record a search page: its detail links are pending and ``next_page`` is the cursor."""
+        checkpoint = self.get(key)
+        pending = set(checkpoint.pending)
+        checkpoint.pending.extend(url for url in detail_urls if url not in pending)
+        checkpoint.cursor = next_page
+        checkpoint.pages += 1
+        self._update(checkpoint)
+
+    def detail_crawled(self, key: str, url: str) -> None:
+        checkpoint = self.get(key)
+        if url in checkpoint.pending:
+            checkpoint.pending.remove(url)
+            self._update(checkpoint)
+
+    def _update(self, checkpoint: Checkpoint) -> None:
+        checkpoint.done = checkpoint.pages > 0 and checkpoint.cursor is None and not checkpoint.pending
+        self._dirty.add(checkpoint.key)
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for key in self._dirty:
+            path = self._path(key)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._checkpoints[key].__dict__))
+            os.replace(tmp, path)
+        self._dirty.clear()
+        self._flushed_at = time.monotonic()
+
+    def clear(self, keys) -> None:
+        for key in keys:
+            self._checkpoints.pop(key, None)
+            self._dirty.discard(key)
+            self._path(key).unlink(missing_ok=True)
@@ -0,0 +1,195 @@
+import re
+from bisect import bisect_right
+from collections.abc import Iterable
+
+
+class PageIndex:
+    """
+    Index of a response's elements and text nodes, built in a single tree walk.
+
+    The lookups reproduce the semantics of the CSS selectors the spiders used
+    to run against the whole document (``*:contains("...")``, ``a ~ b``,
+    ``::text``, ``::attr(...)``), but every field is answered from the index
+    instead of re-evaluating an XPath over the full DOM.
+
+    Elements are numbered in document (pre-order) order, so the descendants of
+    element ``i`` are exactly ``i + 1 .. element_end[i] - 1`` and the text
+    nodes inside it are ``first_node[i] .. node_end[i] - 1``.
+    """
+
+    def __init__(self, response):
+        self.elements = []
+        self.tags: list[str] = []
+        self.parents: list[int] = []
+        self.children: list[list[int]] = []
+        self.sibling_pos: list[int] = []
+        self.element_end: list[int] = []
+        self.first_node: list[int] = []
+        self.node_end: list[int] = []
+        self.char_end: list[int] = []
+        self.own_nodes: list[list[int]] = []
+
+        self.node_texts: list[str] = []
+        self.node_parents: list[int] = []
+        self.node_offsets: list[int] = []
+        self._offset = 0
+
+        self._by_tag: dict[str, list[int]] = {}
+        self._containing: dict[str, set[int]] = {}
+
+        self._build(response.selector.root)
+        self.text = "".join(self.node_texts)
+
+    def _build(self, root) -> None:
+        """Walk the tree once, recording elements and text nodes in document order."""
+        stack = [(self._open(root, -1), iter(root))]
+        while stack:
+            idx, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                self._close(idx)
+            elif isinstance(child.tag, str):
+                stack.append((self._open(child, idx), iter(child)))
+            elif child.tail:
+                # Comments and processing instructions: only the tail is text
+                self._add_node(child.tail, idx)
+
+    def _open(self, element, parent: int) -> int:
+        idx = len(self.tags)
+        self.elements.append(element)
+        self.tags.append(element.tag)
+        self.parents.append(parent)
+        self.children.append([])
+        self.own_nodes.append([])
+        self.first_node.append(len(self.node_texts))
+        self.element_end.append(0)
+        self.node_end.append(0)
+        self.char_end.append(0)
+        self._by_tag.setdefault(element.tag, []).append(idx)
+        if parent == -1:
+            self.sibling_pos.append(0)
+        else:
+            self.sibling_pos.append(len(self.children[parent]))
+            self.children[parent].append(idx)
+        if element.text:
+            self._add_node(element.text, idx)
+        return idx
+
+    def _close(self, idx: int) -> None:
+        self.element_end[idx] = len(self.tags)
+        self.node_end[idx] = len(self.node_texts)
+        self.char_end[idx] = self._offset
+        parent = self.parents[idx]
+        tail = self.elements[idx].tail
+        if tail and parent != -1:
+            self._add_node(tail, parent)
+
+    def _add_node(self, text: str, parent: int) -> None:
+        self.own_nodes[parent].append(len(self.node_texts))
+        self.node_texts.append(text)
+        self.node_parents.append(parent)
+        self.node_offsets.append(self._offset)
+        self._offset += len(text)
+
+    def containing(self, label: str, tag: str | None = None) -> set[int]:
+        """Elements whose string value contains ``label`` (``tag:contains(label)``)."""
+        if label not in self._containing:
+            # An element's string value is a contiguous slice of the page text,
+            # so every match belongs to the deepest element spanning it and to
+            # all of that element's ancestors.
+            found: set[int] = set()
+            size = len(label)
+            pos = self.text.find(label)
+            while pos != -1:
+                node = bisect_right(self.node_offsets, pos) - 1
+                element = self.node_parents[node]
+                while element != -1 and self.char_end[element] < pos + size:
+                    element = self.parents[element]
+                while element != -1 and element not in found:
+                    found.add(element)
+                    element = self.parents[element]
+                pos = self.text.find(label, pos + 1)
+            self._containing[label] = found
+        found = self._containing[label]
+        if tag is None:
+            return found
+        return {idx for idx in found if self.tags[idx] == tag}
+
+    def with_tag(self, tag: str) -> list[int]:
+        """Elements with the given tag name, in document order."""
+        return self._by_tag.get(tag, [])
+
+    def following_siblings(
+        self, elements: Iterable[int], tag: str | None = None
+    ) -> list[int]:
+        """Siblings after any of ``elements`` (``a ~ tag``), in document order."""
+        found: set[int] = set()
+        for idx in elements:
+            parent = self.parents[idx]
+            if parent == -1:
+                continue
+            for sibling in self.children[parent][self.sibling_pos[idx] + 1:]:
+                if tag is None or self.tags[sibling] == tag:
+                    found.add(sibling)
+        return sorted(found)
+
+    def descendants(self, elements: Iterable[int]) -> list[int]:
+        """Descendant elements of any of ``elements`` (``a *``), in document order."""
+        found: set[int] = set()
+        for idx in elements:
+            found.update(range(idx + 1, self.element_end[idx]))
+        return sorted(found)
+
+    def own_texts(self, elements: Iterable[int]) -> list[str]:
+        """Direct text children of ``elements`` (``::text``), in document order."""
+        nodes = sorted(node for idx in set(elements) for node in self.own_nodes[idx])
+        return [self.node_texts[node] for node in nodes]
+
+    def all_texts(self, elements: Iterable[int]) -> list[str]:
+        """All text inside ``elements`` (`` ::text``), in document order."""
+        nodes: set[int] = set()
+        for idx in elements:
+            nodes.update(range(self.first_node[idx], self.node_end[idx]))
+        return [self.node_texts[node] for node in sorted(nodes)]
+
+    def within_class(self, tag: str, class_names: list[str]) -> list[int]:
+        """Elements of ``tag`` inside an element with one of ``class_names`` (``.cls tag``)."""
+        found = []
+        for idx in self.with_tag(tag):
+            ancestor = self.parents[idx]
+            while ancestor != -1:
+                classes = (self.elements[ancestor].get("class") or "").split()
+                if any(name in classes for name in class_names):
+                    found.append(idx)
+                    break
+                ancestor = self.parents[ancestor]
+        return found
+
+    def attrs(self, elements: Iterable[int], name: str) -> list[str]:
+        """Values of attribute ``name`` on ``elements`` (``::attr(name)``)."""
+        values = []
+        for idx in elements:
+            value = self.elements[idx].get(name)
+            if value is not None:
+                values.append(value)
+        return values
+
+    def first_attr(self, name: str) -> str | None:
+        """First value of attribute ``name`` in document order."""
+        for element in self.elements:
+            value = element.get(name)
+            if value is not None:
+                return value
+        return None
+
+    def re_first(self, pattern: str, texts: Iterable[str] | None = None) -> str | None:
+        """First regex match over ``texts`` (default: every text node)."""
+        regex = re.compile(pattern)
+        for text in self.node_texts if texts is None else texts:
+            match = regex.search(text)
+            if match:
+                if regex.groups:
+                    return match.group(1) or ""
+                return match.group(0)
+        return None
@@ -0,0 +1,609 @@
+"""
+Shared crawl frontier so one crawl can run across many worker processes.
+
+Usage:
+    FRONTIER_URL=redis://localhost:6379/1 scrapy crawl fincaraiz   # on each worker
+    python -m propfair_scrapers.frontier report FRONTIER_URL       # aggregated throughput
+
+``FrontierScheduler`` replaces Scrapy's in-memory scheduler with a backend
+that every worker shares: one queue per partition (the city/neighborhood
+search URL a request descends from), a set of seen request fingerprints, and
+a per-worker throughput record. The queue and seen set outlive the process:
+an interrupted crawl resumes where it stopped. Once a crawl has drained the
+queue the seen set is cleared, so the next crawl walks its search pages
+again.
+
+A popped request is leased to its worker, not deleted: it is acknowledged
+once the spider has handled its response (``FrontierPartitionMiddleware``)
+or its download has finally failed (``FrontierFailureMiddleware``). A
+lease not acknowledged within ``FRONTIER_LEASE_TIMEOUT`` seconds, because
+its worker crashed, goes back to the queue, so a crashed worker's in-flight
+requests are crawled by another worker (or the next run).
+
+Backends are chosen by URL scheme: ``redis://`` for a real deployment, and
+``sqlite:///path`` (or ``sqlite://`` in memory) for single-machine runs and
+tests.
+"""
+import argparse
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+import zlib
+from collections import deque
+from collections.abc import Iterable
+from urllib.parse import urlparse
+
+from scrapy import Request, signals
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import request_from_dict
+
+PARTITION_META_KEY = "frontier_partition"
+LEASE_META_KEY = "frontier_lease"
+
+# Sent by the frontier middlewares when a leased request has been handled
+request_handled = object()
+
+
+def partition_for(url: str) -> str:
+    """Partition key for a search URL: its path, e.g. ``/arriendo/apartamentos/bogota``."""
+    return urlparse(url).path.rstrip("/") or "/"
+
+
+class SQLiteFrontier:
+    """Frontier backend stored in SQLite; safe for several processes on one machine."""
+
+    def __init__(self, path: str = ":memory:", name: str = "frontier"):
+        self.name = name
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS frontier_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                partition TEXT NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS frontier_queue_partition
+                ON frontier_queue (name, partition, id);
+            CREATE TABLE IF NOT EXISTS frontier_leases (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                partition TEXT NOT NULL,
+                data BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS frontier_leases_expires_at
+                ON frontier_leases (name, expires_at);
+            CREATE TABLE IF NOT EXISTS frontier_seen (
+                name TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (name, fingerprint)
+            );
+            CREATE TABLE IF NOT EXISTS frontier_workers (
+                name TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                PRIMARY KEY (name, worker)
+            );
+            """
+        )
+
+    def push(self, partition: str, data: bytes) -> None:
+        self.conn.execute(
+            "INSERT INTO frontier_queue (name, partition, data) VALUES (?, ?, ?)",
+            (self.name, partition, data),
+        )
+
+    def pop(
+        self, partitions: Iterable[str], lease_timeout: float = 300
+    ) -> tuple[str, bytes] | None:
+        """
+        Lease the oldest request from the first non-empty partition in
+        ``partitions``; returns the lease id and the request.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for partition in partitions:
+                row = self.conn.execute(
+                    "SELECT id, data FROM frontier_queue WHERE name = ? AND partition = ? "
+                    "ORDER BY id LIMIT 1",
+                    (self.name, partition),
+                ).fetchone()
+                if row:
+                    self.conn.execute("DELETE FROM frontier_queue WHERE id = ?", (row[0],))
+                    self.conn.execute(
+                        "INSERT INTO frontier_leases (id, name, partition, data, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (row[0], self.name, partition, row[1], time.time() + lease_timeout),
+                    )
+                    return str(row[0]), row[1]
+            return None
+        finally:
+            self.conn.execute("COMMIT")
+
+    def ack(self, lease: str) -> None:
+        self.conn.execute(
+            "DELETE FROM frontier_leases WHERE name = ? AND id = ?", (self.name, int(lease))
+        )
+
+    def requeue_expired(self, now: float | None = None) -> int:
+        """Put requests whose lease expired back in the queue, in their old place."""
+        now = time.time() if now is None else now
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "INSERT INTO frontier_queue (id, name, partition, data) "
+                "SELECT id, name, partition, data FROM frontier_leases "
+                "WHERE name = ? AND expires_at <= ?",
+                (self.name, now),
+            )
+            return self.conn.execute(
+                "DELETE FROM frontier_leases WHERE name = ? AND expires_at <= ?",
+                (self.name, now),
+            ).rowcount
+        finally:
+            self.conn.execute("COMMIT")
+
+    def leased(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM frontier_leases WHERE name = ?", (self.name,)
+        ).fetchone()[0]
+
+    def partitions(self) -> list:
+        rows = self.conn.execute(
+            "SELECT DISTINCT partition FROM frontier_queue WHERE name = ? ORDER BY partition",
+            (self.name,),
+        )
+        return [row[0] for row in rows]
+
+    def mark_seen(self, fingerprint: str) -> bool:
+        """Record ``fingerprint``; return True if it had not been seen before."""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO frontier_seen (name, fingerprint) VALUES (?, ?)",
+            (self.name, fingerprint),
+        )
+        return cursor.rowcount == 1
+
+    def clear_seen(self) -> None:
+        self.conn.execute("DELETE FROM frontier_seen WHERE name = ?", (self.name,))
+
+    def __len__(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM frontier_queue WHERE name = ?", (self.name,)
+        ).fetchone()[0]
+
+    def report(self, worker: str, stats: dict) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO frontier_workers (name, worker, stats) VALUES (?, ?, ?)",
+            (self.name, worker, json.dumps(stats)),
+        )
+
+    def worker_stats(self) -> dict[str, dict]:
+        rows = self.conn.execute(
+            "SELECT worker, stats FROM frontier_workers WHERE name = ?", (self.name,)
+        )
+        return {worker: json.loads(stats) for worker, stats in rows}
+
+    def clear(self) -> None:
+        for table in ("frontier_queue", "frontier_leases", "frontier_seen", "frontier_workers"):
+            self.conn.execute(f"DELETE FROM {table} WHERE name = ?", (self.name,))
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class RedisFrontier:
+    """Frontier backend stored in Redis, shared by workers on any machine."""
+
+    # Pop from the first non-empty queue and record the lease in one step.
+    # KEYS: leases hash, lease deadlines zset; ARGV: lease id, deadline,
+    # queue key prefix, partitions...
+    POP_SCRIPT = """
+    for i = 4, #ARGV do
+        local data = redis.call('LPOP', ARGV[3] .. ARGV[i])
+        if data then
+            redis.call('HSET', KEYS[1], ARGV[1], ARGV[i] .. '\\n' .. data)
+            redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+            return data
+        end
+    end
+    return false
+    """
+
+    # Move expired leases back to the front of their queue.
+    # KEYS: leases hash, lease deadlines zset, partitions set; ARGV: now, queue key prefix
+    REQUEUE_SCRIPT = """
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+    for _, lease in ipairs(expired) do
+        local value = redis.call('HGET', KEYS[1], lease)
+        if value then
+            local split = string.find(value, '\\n', 1, true)
+            local partition = string.sub(value, 1, split - 1)
+            redis.call('LPUSH', ARGV[2] .. partition, string.sub(value, split + 1))
+            redis.call('SADD', KEYS[3], partition)
+            redis.call('HDEL', KEYS[1], lease)
+        end
+        redis.call('ZREM', KEYS[2], lease)
+    end
+    return #expired
+    """
+
+    def __init__(self, url: str, name: str = "frontier"):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.key = f"{name}:frontier"
+        self._pop = self.redis.register_script(self.POP_SCRIPT)
+        self._requeue = self.redis.register_script(self.REQUEUE_SCRIPT)
+
+    def push(self, partition: str, data: bytes) -> None:
+        pipe = self.redis.pipeline()
+        pipe.rpush(f"{self.key}:queue:{partition}", data)
+        pipe.sadd(f"{self.key}:partitions", partition)
+        pipe.execute()
+
+    def pop(
+        self, partitions: Iterable[str], lease_timeout: float = 300
+    ) -> tuple[str, bytes] | None:
+        lease = uuid.uuid4().hex
+        data = self._pop(
+            keys=[f"{self.key}:leases", f"{self.key}:lease_deadlines"],
+            args=[lease, time.time() + lease_timeout, f"{self.key}:queue:", *partitions],
+        )
+        return (lease, data) if data is not None else None
+
+    def ack(self, lease: str) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hdel(f"{self.key}:leases", lease)
+        pipe.zrem(f"{self.key}:lease_deadlines", lease)
+        pipe.execute()
+
+    def requeue_expired(self, now: float | None = None) -> int:
+        return self._requeue(
+            keys=[
+                f"{self.key}:leases",
+                f"{self.key}:lease_deadlines",
+                f"{self.key}:partitions",
+            ],
+            args=[time.time() if now is None else now, f"{self.key}:queue:"],
+        )
+
+    def leased(self) -> int:
+        return self.redis.zcard(f"{self.key}:lease_deadlines")
+
+    def partitions(self) -> list:
+        partitions = sorted(p.decode() for p in self.redis.smembers(f"{self.key}:partitions"))
+        if not partitions:
+            return []
+        pipe = self.redis.pipeline()
+        for partition in partitions:
+            pipe.llen(f"{self.key}:queue:{partition}")
+        return [p for p, size in zip(partitions, pipe.execute()) if size]
+
+    def mark_seen(self, fingerprint: str) -> bool:
+        return self.redis.sadd(f"{self.key}:seen", fingerprint) == 1
+
+    def clear_seen(self) -> None:
+        self.redis.delete(f"{self.key}:seen")
+
+    def __len__(self) -> int:
+        partitions = self.redis.smembers(f"{self.key}:partitions")
+        pipe = self.redis.pipeline()
+        for partition in partitions:
+            pipe.llen(f"{self.key}:queue:{partition.decode()}")
+        return sum(pipe.execute())
+
+    def report(self, worker: str, stats: dict) -> None:
+        self.redis.hset(f"{self.key}:workers", worker, json.dumps(stats))
+
+    def worker_stats(self) -> dict[str, dict]:
+        return {
+            worker.decode(): json.loads(stats)
+            for worker, stats in self.redis.hgetall(f"{self.key}:workers").items()
+        }
+
+    def clear(self) -> None:
+        keys = list(self.redis.scan_iter(f"{self.key}:*"))
+        if keys:
+            self.redis.delete(*keys)
+
+    def close(self) -> None:
+        self.redis.close()
+
+
+def frontier_from_url(url: str, name: str = "frontier"):
+    """Build a frontier backend from a ``redis://`` or ``sqlite://`` URL."""
+    scheme = urlparse(url).scheme
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisFrontier(url, name=name)
+    if scheme == "sqlite":
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ":memory:"
+        return SQLiteFrontier(path or ":memory:", name=name)
+    raise ValueError(f"Unsupported frontier URL: {url}")
+
+
+def aggregate_worker_stats(workers: dict[str, dict]) -> dict:
+    """Per-worker rates plus crawl-wide totals from reported worker stats."""
+    rows = {}
+    for worker, stats in sorted(workers.items()):
+        minutes = max(stats["updated_at"] - stats["started_at"], 1e-9) / 60
+        rows[worker] = {
+            **stats,
+            "requests_per_min": stats["requests"] / minutes,
+            "items_per_min": stats["items"] / minutes,
+        }
+    return {
+        "workers": rows,
+        "total": {
+            "workers": len(rows),
+            "requests": sum(row["requests"] for row in rows.values()),
+            "items": sum(row["items"] for row in rows.values()),
+            # Workers run concurrently, so crawl throughput is the sum of their rates
+            "requests_per_min": sum(row["requests_per_min"] for row in rows.values()),
+            "items_per_min": sum(row["items_per_min"] for row in rows.values()),
+        },
+    }
+
+
+class FrontierPartitionMiddleware:
+    """
+    Spider middleware: requests inherit the partition of the page they were
+    found on, and a leased request is acknowledged once the spider has handled
+    its response (all of the callback's output consumed, or an exception).
+    """
+
+    def __init__(self, crawler=None):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_spider_output(self, response, result, spider):
+        for obj in result:
+            yield self._inherit(response, obj)
+        self._handled(response)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for obj in result:
+            yield self._inherit(response, obj)
+        self._handled(response)
+
+    def process_spider_exception(self, response, exception, spider):
+        self._handled(response)
+
+    def _inherit(self, response, obj):
+        partition = response.meta.get(PARTITION_META_KEY)
+        if partition and isinstance(obj, Request):
+            obj.meta.setdefault(PARTITION_META_KEY, partition)
+        return obj
+
+    def _handled(self, response) -> None:
+        if self.crawler is not None and response.request is not None:
+            self.crawler.signals.send_catch_log(request_handled, request=response.request)
+
+
+class FrontierFailureMiddleware:
+    """
+    Downloader middleware acknowledging a leased request whose download
+    failed for good. It sits below RetryMiddleware, so it only sees the
+    exceptions retries gave up on; a retried copy takes the lease over.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_exception(self, request, exception, spider):
+        self.crawler.signals.send_catch_log(request_handled, request=request)
+
+
+class FrontierScheduler(BaseScheduler):
+    """
+    Scheduler that enqueues to and dequeues from a shared frontier.
+
+    Each worker prefers the partitions it owns (``crc32(partition) %
+    FRONTIER_WORKERS == FRONTIER_WORKER_INDEX``) and steals from the others
+    once its own are drained, so a dead worker's partitions still finish.
+    """
+
+    def __init__(self, crawler, frontier, worker: str, worker_index: int, workers: int,
+                 idle_timeout: float, report_interval: float, flush_on_start: bool,
+                 lease_timeout: float = 300):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.frontier = frontier
+        self.worker = worker
+        self.worker_index = worker_index
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self.report_interval = report_interval
+        self.flush_on_start = flush_on_start
+        self.lease_timeout = lease_timeout
+        self.spider = None
+        self.dequeued = 0
+        self.started_at = time.time()
+        self._last_request_at = self.started_at
+        self._last_report_at = self.started_at
+        self._local = deque()
+        self._partitions: list = []
+        self._partitions_at = 0.0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        url = settings.get("FRONTIER_URL")
+        if not url:
+            raise ValueError("FrontierScheduler requires FRONTIER_URL")
+        frontier = frontier_from_url(url, name=settings.get("FRONTIER_NAME") or crawler.spidercls.name)
+        scheduler = cls(
+            crawler,
+            frontier,
+            worker=settings.get("FRONTIER_WORKER") or f"{socket.gethostname()}-{os.getpid()}",
+            worker_index=settings.getint("FRONTIER_WORKER_INDEX"),
+            workers=max(settings.getint("FRONTIER_WORKERS", 1), 1),
+            idle_timeout=settings.getfloat("FRONTIER_IDLE_TIMEOUT", 30),
+            report_interval=settings.getfloat("FRONTIER_REPORT_INTERVAL", 30),
+            flush_on_start=settings.getbool("FRONTIER_FLUSH_ON_START"),
+            lease_timeout=settings.getfloat("FRONTIER_LEASE_TIMEOUT", 300),
+        )
+        crawler.signals.connect(scheduler.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(scheduler.request_handled, signal=request_handled)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        if self.flush_on_start:
+            self.frontier.clear()
+
+    def close(self, reason):
+        self._report()
+        if not self.has_pending_requests() and not self.frontier.leased():
+            # Nothing left for any worker: the crawl is complete
+            self.frontier.clear_seen()
+            self.spider.logger.info("Frontier drained, seen requests cleared")
+        totals = aggregate_worker_stats(self.frontier.worker_stats())["total"]
+        self.spider.logger.info(
+            f"Frontier: {totals['workers']} workers, {totals['requests']} requests, "
+            f"{totals['items']} items, {totals['requests_per_min']:.1f} requests/min"
+        )
+        self.frontier.close()
+
+    def has_pending_requests(self) -> bool:
+        return bool(self._local) or len(self.frontier) > 0
+
+    def enqueue_request(self, request) -> bool:
+        # Retries and redirects copy the meta of a leased request: the old
+        # lease is released once the new request is queued (or filtered)
+        lease = request.meta.pop(LEASE_META_KEY, None)
+        try:
+            return self._enqueue(request)
+        finally:
+            if lease is not None:
+                self.frontier.ack(lease)
+
+    def _enqueue(self, request) -> bool:
+        if not request.dont_filter:
+            fingerprint = self.crawler.request_fingerprinter.fingerprint(request).hex()
+            if not self.frontier.mark_seen(fingerprint):
+                self.stats.inc_value("frontier/filtered")
+                return False
+        partition = request.meta.setdefault(PARTITION_META_KEY, partition_for(request.url))
+        try:
+            data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        except (TypeError, ValueError, AttributeError, pickle.PicklingError):
+            # Requests carrying live objects (e.g. a Playwright page) stay local
+            self._local.append(request)
+            self.stats.inc_value("frontier/enqueued/local")
+            return True
+        self.frontier.push(partition, data)
+        self.stats.inc_value("frontier/enqueued")
+        return True
+
+    def request_handled(self, request) -> None:
+        lease = request.meta.pop(LEASE_META_KEY, None)
+        if lease is not None:
+            self.frontier.ack(lease)
+            self.stats.inc_value("frontier/acked")
+
+    def next_request(self):
+        if self._local:
+            request = self._local.popleft()
+        else:
+            leased = self._pop()
+            if leased is None:
+                return None
+            lease, data = leased
+            request = request_from_dict(pickle.loads(data), spider=self.spider)
+            request.meta[LEASE_META_KEY] = lease
+        self.dequeued += 1
+        self._last_request_at = time.time()
+        self.stats.inc_value("frontier/dequeued")
+        if self._last_request_at - self._last_report_at >= self.report_interval:
+            self._report()
+        return request
+
+    def _pop(self) -> tuple[str, bytes] | None:
+        # The partition list is cached briefly; refresh it when it looks drained
+        fresh = time.time() - self._partitions_at < 1.0
+        leased = self.frontier.pop(self._partitions, self.lease_timeout) if fresh else None
+        if leased is None:
+            requeued = self.frontier.requeue_expired()
+            if requeued:
+                self.stats.inc_value("frontier/requeued", requeued)
+            self._partitions = self._partition_order()
+            self._partitions_at = time.time()
+            leased = self.frontier.pop(self._partitions, self.lease_timeout)
+        return leased
+
+    def _partition_order(self) -> list:
+        """This worker's partitions first, then everyone else's."""
+        partitions = self.frontier.partitions()
+        owned = [p for p in partitions if self._owns(p)]
+        return owned + [p for p in partitions if not self._owns(p)]
+
+    def _owns(self, partition: str) -> bool:
+        return zlib.crc32(partition.encode()) % self.workers == self.worker_index
+
+    def _report(self) -> None:
+        self._last_report_at = time.time()
+        self.frontier.report(
+            self.worker,
+            {
+                "requests": self.dequeued,
+                "items": self.stats.get_value("item_scraped_count", 0),
+                "started_at": self.started_at,
+                # Rates are measured up to the last request, not the idle wait
+                "updated_at": self._last_request_at,
+            },
+        )
+
+    def spider_idle(self, spider):
+        # Other workers may still be adding requests; wait a while before
+        # closing, and for as long as any of their requests is leased (a lease
+        # of a crashed worker expires and its request is queued again)
+        if time.time() - self._last_request_at < self.idle_timeout or self.frontier.leased():
+            raise DontCloseSpider
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared crawl frontier tools")
+    parser.add_argument("command", choices=["report", "clear"])
+    parser.add_argument("url", help="Frontier URL (redis://... or sqlite:///path)")
+    parser.add_argument("--name", default="fincaraiz", help="Frontier name (spider name)")
+    args = parser.parse_args(argv)
+
+    frontier = frontier_from_url(args.url, name=args.name)
+    if args.command == "clear":
+        frontier.clear()
+        return 0
+
+    report = aggregate_worker_stats(frontier.worker_stats())
+    print(f"{'worker':30} {'requests':>10} {'items':>8} {'req/min':>9} {'items/min':>10}")
+    for worker, row in report["workers"].items():
+        print(
+            f"{worker:30} {row['requests']:10} {row['items']:8} "
+            f"{row['requests_per_min']:9.1f} {row['items_per_min']:10.1f}"
+        )
+    total = report["total"]
+    print(
+        f"{'total (' + str(total['workers']) + ' workers)':30} {total['requests']:10} "
+        f"{total['items']:8} {total['requests_per_min']:9.1f} {total['items_per_min']:10.1f}"
+    )
+    print(f"pending: {len(frontier)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
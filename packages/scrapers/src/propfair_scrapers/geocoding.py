@@ -0,0 +1,301 @@
+"""
+Offline geocoding of listings that have no map coordinates.
+
+Usage:
+    python -m propfair_scrapers.geocoding --backfill [--gazetteer FILE]
+
+Neighborhood and address text are resolved against a bundled gazetteer of
+Colombian barrios and localidades (``data/gazetteer_co.csv``) with their
+approximate centroids: exact match on the normalized name first, then a
+fuzzy match, then a place name contained in the text. Listings that match
+no place get their city's centroid and are flagged
+``coordinates_approximate``. Nothing is sent to an external geocoding
+service, and lookups are memoized so each distinct (city, neighborhood,
+address) is resolved once per crawl.
+
+``--backfill`` re-geocodes stored listings that still carry the old
+Bogotá-center placeholder coordinates, one lookup and one UPDATE per
+distinct location. Those it cannot place are flagged as approximate.
+"""
+import argparse
+import csv
+import difflib
+import os
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from propfair_scrapers.metrics import timed_stage
+from propfair_scrapers.resolution import normalize_text
+
+DEFAULT_GAZETTEER = Path(__file__).parent / "data" / "gazetteer_co.csv"
+
+# Coordinates the spider used to fill in when a page had no map
+PLACEHOLDER_COORDINATES = (4.6097, -74.0817)
+
+# Leading words that qualify a place name without being part of it
+_QUALIFIERS = {"barrio", "sector", "localidad", "urbanizacion", "urb", "conjunto", "el", "la", "los", "las"}
+
+
+def place_key(text: str | None) -> str:
+    """Normalized name used for lookups: "Barrio El Chicó" -> "chico"."""
+    tokens = normalize_text(text).split()
+    while len(tokens) > 1 and tokens[0] in _QUALIFIERS:
+        tokens.pop(0)
+    return " ".join(tokens)
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    kind: str
+    city: str
+    localidad: str
+    latitude: float
+    longitude: float
+
+
+@dataclass(frozen=True)
+class Geocode:
+    place: Place
+    # "exact", "fuzzy", "contains" or "city" (the city centroid)
+    method: str
+
+    @property
+    def latitude(self) -> float:
+        return self.place.latitude
+
+    @property
+    def longitude(self) -> float:
+        return self.place.longitude
+
+
+class Gazetteer:
+    """
+    Place-name index per city.
+
+    City rows name the city and its aliases. ``geocode`` never returns a city
+    centroid; ``city_center`` does, as the fallback for unmatched listings.
+    """
+
+    def __init__(self, places: Iterable[tuple[Place, list[str]]], fuzzy_cutoff: float = 0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._cities: dict[str, str] = {}
+        self._centers: dict[str, Place] = {}
+        self._places: dict[str, dict[str, Place]] = {}
+        self._longest: dict[str, int] = {}
+        self._cache: dict[tuple, Geocode | None] = {}
+        for place, aliases in places:
+            city = place_key(place.city)
+            names = [place.name] + aliases
+            if place.kind == "city":
+                self._centers[city] = place
+                for name in names:
+                    self._cities[place_key(name)] = city
+                continue
+            self._cities.setdefault(city, city)
+            index = self._places.setdefault(city, {})
+            for name in names:
+                key = place_key(name)
+                # Barrios win over a localidad of the same name
+                if key not in index or index[key].kind == "localidad":
+                    index[key] = place
+                self._longest[city] = max(self._longest.get(city, 0), len(key.split()))
+
+    @classmethod
+    def load(cls, path=DEFAULT_GAZETTEER, **options) -> "Gazetteer":
+        places = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = Place(
+                    name=row["name"],
+                    kind=row["kind"],
+                    city=row["city"],
+                    localidad=row["localidad"],
+                    latitude=float(row["latitude"]),
+                    longitude=float(row["longitude"]),
+                )
+                aliases = [alias for alias in (row["aliases"] or "").split("|") if alias]
+                places.append((place, aliases))
+        return cls(places, **options)
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._places.values())
+
+    def geocode(self, city: str | None, *texts: str | None) -> Geocode | None:
+        """
+        Best place for ``texts`` (e.g. neighborhood, then address) in ``city``,
+        or None. Comma-separated parts of each text are tried separately, so
+        "Chicó Navarra, Bogotá" matches "Chicó Navarra".
+        """
+        city_key = self._cities.get(place_key(city))
+        if city_key is None:
+            return None
+        keys = tuple(place_key(text) for text in texts)
+        cache_key = (city_key,) + keys
+        if cache_key not in self._cache:
+            self._cache[cache_key] = self._geocode(city_key, texts)
+        return self._cache[cache_key]
+
+    def city_center(self, city: str | None) -> Geocode | None:
+        """Centroid of ``city``, or None if the city is unknown."""
+        center = self._centers.get(self._cities.get(place_key(city), ""))
+        return Geocode(center, "city") if center is not None else None
+
+    def geocode_many(self, rows: Iterable[tuple]) -> dict[tuple, Geocode | None]:
+        """Geocode each distinct ``(city, *texts)`` row once."""
+        return {row: self.geocode(*row) for row in dict.fromkeys(rows)}
+
+    def _geocode(self, city: str, texts) -> Geocode | None:
+        index = self._places.get(city)
+        if index is None:
+            # Only the city itself is known (e.g. Cali); never its centroid
+            return None
+        parts = [
+            place_key(part)
+            for text in texts
+            if text
+            for part in text.split(",")
+        ]
+        parts = [part for part in parts if part and part != city and self._cities.get(part) != city]
+
+        for part in parts:
+            if part in index:
+                return Geocode(index[part], "exact")
+
+        # Misspellings of a whole name, before "Chapinero Altto" is read as "Chapinero"
+        names = list(index)
+        for part in parts:
+            close = difflib.get_close_matches(part, names, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                return Geocode(index[close[0]], "fuzzy")
+
+        # Longest place name appearing as a run of words, e.g. "Apartamento en Cedritos"
+        for part in parts:
+            tokens = part.split()
+            for size in range(min(len(tokens), self._longest[city]), 0, -1):
+                for start in range(len(tokens) - size + 1):
+                    place = index.get(" ".join(tokens[start:start + size]))
+                    if place is not None:
+                        return Geocode(place, "contains")
+        return None
+
+
+class GeocodingPipeline:
+    """
+    Fill in coordinates for listings whose page had no map, from the bundled
+    gazetteer. Listings that match no place are stored at their city's
+    centroid with ``coordinates_approximate`` set, rather than dropped; only
+    a city missing from the gazetteer leaves them without coordinates.
+    Outcomes are counted in the ``geocoding/...`` crawl stats.
+    """
+
+    def __init__(self, stats=None, gazetteer_path=None, fuzzy_cutoff: float = 0.85):
+        self.stats = stats
+        self.gazetteer = Gazetteer.load(gazetteer_path or DEFAULT_GAZETTEER, fuzzy_cutoff=fuzzy_cutoff)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            stats=crawler.stats,
+            gazetteer_path=settings.get("GEOCODING_GAZETTEER"),
+            fuzzy_cutoff=settings.getfloat("GEOCODING_FUZZY_CUTOFF", 0.85),
+        )
+
+    def _inc(self, key: str) -> None:
+        if self.stats:
+            self.stats.inc_value(f"geocoding/{key}")
+
+    @timed_stage("geocoding")
+    def process_item(self, item, spider):
+        if item.get("latitude") is not None and item.get("longitude") is not None:
+            self._inc("page")
+            return item
+
+        result = self.gazetteer.geocode(item.get("city"), item.get("neighborhood"), item.get("address"))
+        if result is None:
+            result = self.gazetteer.city_center(item.get("city"))
+        if result is None:
+            self._inc("unresolved")
+            spider.logger.debug(
+                f"Could not geocode {item.get('external_id')}: "
+                f"{item.get('neighborhood')!r}, {item.get('city')!r}"
+            )
+            return item
+
+        self._inc(result.method)
+        item["latitude"] = result.latitude
+        item["longitude"] = result.longitude
+        item["geocode_place"] = result.place.name
+        item["coordinates_approximate"] = result.method == "city"
+        return item
+
+
+def backfill(session, gazetteer: Gazetteer) -> tuple[int, int]:
+    """
+    Re-geocode listings stored with the placeholder coordinates.
+
+    Listings no place matches stay where they are, flagged as approximate.
+    Returns (listings updated, listings left unresolved).
+    """
+    from propfair_api.models import Listing
+
+    latitude, longitude = PLACEHOLDER_COORDINATES
+    at_placeholder = (Listing.latitude == latitude) & (Listing.longitude == longitude)
+    rows = session.execute(
+        select(Listing.city, Listing.neighborhood, Listing.address).where(at_placeholder).distinct()
+    ).all()
+
+    updated = unresolved = 0
+    for (city, neighborhood, address), result in gazetteer.geocode_many(map(tuple, rows)).items():
+        where = at_placeholder & (Listing.city == city) & (Listing.neighborhood == neighborhood)
+        where &= Listing.address == address
+        if result is None:
+            unresolved += session.execute(
+                update(Listing)
+                .where(where)
+                .values(coordinates_approximate=True)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            continue
+        updated += session.execute(
+            update(Listing)
+            .where(where)
+            .values(latitude=result.latitude, longitude=result.longitude)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    session.commit()
+    return updated, unresolved
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--backfill", action="store_true", help="Re-geocode placeholder coordinates")
+    parser.add_argument("--gazetteer", default=str(DEFAULT_GAZETTEER))
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        parser.print_help()
+        return 1
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL not set", file=sys.stderr)
+        return 1
+
+    gazetteer = Gazetteer.load(args.gazetteer)
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        updated, unresolved = backfill(session, gazetteer)
+    engine.dispose()
+    print(f"{updated} listings geocoded, {unresolved} left at the placeholder")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Precomputed heatmap tiles of asking price per m² and of deals.
+
+Usage:
+    python -m propfair_scrapers.heatmap --tiles heatmap.mbtiles [--rebuild]
+
+Active listings are binned into a grid of cells per map tile (Web Mercator
+XYZ tiles) and written to an MBTiles-style SQLite file that the API serves
+as is (``propfair_api.tiles``). Two layers:
+
+- ``prices``: mean asking price per m² of the listings in each cell
+- ``deals``: mean discount of price per m² against the listing's
+  neighborhood median (``neighborhood_stats``); positive is below market
+
+After a crawl only tiles holding a listing changed since the previous run
+(new, re-priced, moved, deactivated; ``updated_at``) are rebuilt, along
+with the tile a moved listing was binned into before: the deepest zoom
+from those listings' neighborhoods in the database, and each lower zoom by
+merging its four child tiles, so no tile ever re-reads the whole city.
+"""
+import argparse
+import os
+import sys
+from collections.abc import Iterable
+from datetime import UTC, datetime
+
+from propfair_api.tiles import (
+    LAYERS,
+    TileStore,
+    decode_tile,
+    encode_tile,
+    tile_bounds,
+    tile_position,
+)
+from sqlalchemy import and_, create_engine, func, select
+from sqlalchemy.orm import Session
+
+TileKey = tuple[int, int]
+# (col, row) -> [count, sum of values]
+CellSums = dict[tuple[int, int], list]
+
+# Above this many changed tiles one pass over all active listings beats a query per tile
+PER_TILE_QUERY_LIMIT = 256
+
+
+class HeatmapGenerator:
+    def __init__(self, store: TileStore, min_zoom: int = 10, max_zoom: int = 16, cells: int = 32):
+        self.store = store
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cells = cells
+
+    def _query(self, latitude_range=None, longitude_range=None):
+        from propfair_api.models import Listing, NeighborhoodStats
+
+        query = (
+            select(
+                Listing.latitude,
+                Listing.longitude,
+                Listing.price,
+                Listing.area,
+                NeighborhoodStats.price_per_m2_median,
+            )
+            .outerjoin(
+                NeighborhoodStats,
+                and_(
+                    NeighborhoodStats.city == Listing.city,
+                    NeighborhoodStats.neighborhood == func.coalesce(Listing.barrio, Listing.neighborhood),
+                ),
+            )
+            # City centroids would pile up as a false hot spot
+            .where(
+                Listing.is_active.is_(True),
+                Listing.area > 0,
+                Listing.coordinates_approximate.is_(False),
+            )
+        )
+        if latitude_range:
+            query = query.where(Listing.latitude.between(*latitude_range))
+        if longitude_range:
+            query = query.where(Listing.longitude.between(*longitude_range))
+        return query
+
+    def _bin(self, rows: Iterable, tiles: set[TileKey] | None = None) -> dict[TileKey, dict[str, CellSums]]:
+        """Sum listings into cells of max-zoom tiles (only ``tiles`` if given)."""
+        binned: dict[TileKey, dict[str, CellSums]] = {}
+        for latitude, longitude, price, area, median in rows:
+            x, y = tile_position(latitude, longitude, self.max_zoom)
+            tile = (int(x), int(y))
+            if tiles is not None and tile not in tiles:
+                continue
+            cell = (int((x - tile[0]) * self.cells), int((y - tile[1]) * self.cells))
+            layers = binned.setdefault(tile, {layer: {} for layer in LAYERS})
+            per_m2 = price / area
+            values = {"prices": per_m2, "deals": 1 - per_m2 / median if median else None}
+            for layer, value in values.items():
+                if value is not None:
+                    sums = layers[layer].setdefault(cell, [0, 0.0])
+                    sums[0] += 1
+                    sums[1] += value
+        return binned
+
+    def _encode(self, layer: str, sums: CellSums) -> bytes | None:
+        if not sums:
+            return None
+        digits = 0 if layer == "prices" else 3
+        return encode_tile(
+            self.cells,
+            ((col, row, count, round(total / count, digits)) for (col, row), (count, total) in sums.items()),
+        )
+
+    def _listing_tiles(self, session, since: datetime | None = None) -> dict[str, TileKey]:
+        """Deepest-zoom tile of each listing (changed since ``since``, if given)."""
+        from propfair_api.models import Listing
+
+        query = select(Listing.id, Listing.latitude, Listing.longitude)
+        if since is None:
+            query = query.where(Listing.is_active.is_(True))
+        else:
+            query = query.where(Listing.updated_at >= since)
+        tiles = {}
+        for listing_id, latitude, longitude in session.execute(query):
+            x, y = tile_position(latitude, longitude, self.max_zoom)
+            tiles[listing_id] = (int(x), int(y))
+        return tiles
+
+    def update(self, session, since: datetime | None = None, now: datetime | None = None) -> int:
+        """
+        Rebuild the tiles holding listings changed since ``since`` (all tiles
+        when None) and record the run time. Returns the number of tiles written.
+        """
+        now = now or datetime.now(UTC)
+        if since is None:
+            self.store.clear()
+            binned = self._bin(session.execute(self._query()))
+            changed = set(binned)
+            positions = self._listing_tiles(session)
+        else:
+            # Where the changed listings are now, and where they were last binned
+            positions = self._listing_tiles(session, since)
+            changed = set(positions.values()) | set(self.store.listing_tiles(positions).values())
+            binned = {}
+            if len(changed) > PER_TILE_QUERY_LIMIT:
+                binned = self._bin(session.execute(self._query()), changed)
+            else:
+                for x, y in changed:
+                    south, west, north, east = tile_bounds(self.max_zoom, x, y)
+                    rows = session.execute(self._query((south, north), (west, east)))
+                    binned.update(self._bin(rows, {(x, y)}))
+
+        pending: dict[tuple[str, int, int, int], bytes | None] = {}
+        for x, y in changed:
+            layers = binned.get((x, y), {})
+            for layer in LAYERS:
+                pending[(layer, self.max_zoom, x, y)] = self._encode(layer, layers.get(layer, {}))
+
+        for zoom in range(self.max_zoom - 1, self.min_zoom - 1, -1):
+            changed = {(x // 2, y // 2) for x, y in changed}
+            for x, y in changed:
+                for layer in LAYERS:
+                    pending[(layer, zoom, x, y)] = self._encode(layer, self._merge_children(pending, layer, zoom, x, y))
+
+        self.store.put_many(pending)
+        self.store.set_listing_tiles(positions)
+        self.store.set_metadata(
+            name="propfair-heatmap",
+            format="json",
+            minzoom=self.min_zoom,
+            maxzoom=self.max_zoom,
+            cells=self.cells,
+            generated_at=now.isoformat(),
+        )
+        return sum(data is not None for data in pending.values())
+
+    def _merge_children(self, pending, layer: str, zoom: int, x: int, y: int) -> CellSums:
+        """Parent cells from the four child tiles (each parent cell covers 2x2 child cells)."""
+        sums: CellSums = {}
+        for dx in (0, 1):
+            for dy in (0, 1):
+                key = (layer, zoom + 1, 2 * x + dx, 2 * y + dy)
+                data = pending[key] if key in pending else self.store.get(*key)
+                if data is None:
+                    continue
+                for col, row, count, value in decode_tile(data)["cells"]:
+                    cell = ((dx * self.cells + col) // 2, (dy * self.cells + row) // 2)
+                    total = sums.setdefault(cell, [0, 0.0])
+                    total[0] += count
+                    total[1] += value * count
+        return sums
+
+
+def update_tiles(session, path: str, rebuild: bool = False, **options) -> int:
+    """Incremental update of the tile file since its last run (or a full rebuild)."""
+    store = TileStore(path)
+    try:
+        generated_at = store.metadata().get("generated_at")
+        since = None if rebuild or not generated_at else datetime.fromisoformat(generated_at)
+        return HeatmapGenerator(store, **options).update(session, since=since)
+    finally:
+        store.close()
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--tiles", default=os.getenv("HEATMAP_TILES_PATH", "heatmap.mbtiles"))
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate every tile")
+    parser.add_argument("--min-zoom", type=int, default=10)
+    parser.add_argument("--max-zoom", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL not set", file=sys.stderr)
+        return 1
+
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        written = update_tiles(
+            session, args.tiles, rebuild=args.rebuild, min_zoom=args.min_zoom, max_zoom=args.max_zoom
+        )
+    engine.dispose()
+    print(f"Wrote {written} heatmap tiles to {args.tiles}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
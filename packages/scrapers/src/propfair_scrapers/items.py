@@ -28,3 +28,20 @@ class ListingItem(scrapy.Item):
     property_condition = scrapy.Field()
     images = scrapy.Field()
     amenities = scrapy.Field()
+
+    # Set by GeocodingPipeline when the page had no coordinates
+    geocode_place = scrapy.Field()
+    coordinates_approximate = scrapy.Field()
+
+    # Set by NeighborhoodPipeline from the official polygon containing the coordinates
+    barrio = scrapy.Field()
+    localidad = scrapy.Field()
+
+    # Set by DeduplicationPipeline
+    content_hash = scrapy.Field()
+
+    # Set by EntityResolutionPipeline
+    property_id = scrapy.Field()
+
+    # Set by ValidationPipeline when OUTLIER_ACTION is "flag"
+    outlier_reasons = scrapy.Field()
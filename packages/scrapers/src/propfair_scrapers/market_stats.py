@@ -0,0 +1,225 @@
+"""
+Neighborhood market statistics, maintained incrementally.
+
+Usage:
+    python -m propfair_scrapers.market_stats --rebuild
+
+The ``neighborhood_stats`` table holds, per (city, neighborhood) and per
+city (neighborhood ""), the count and percentiles of price, price per m² and
+area of active listings, read by the API without touching ``listings``.
+
+Percentiles come from quantile sketches stored alongside them. During a
+crawl ``DatabasePipeline`` records what changed (new, re-priced,
+reactivated and deactivated listings) in a ``MarketStatsDelta``; at close
+the delta is merged into the stored sketches, so an update costs the
+number of changes, not the number of listings. City rows are merged from
+their neighborhoods' deltas. ``--rebuild`` recomputes everything from
+``listings`` (after a bulk backfill or neighborhood reassignment).
+"""
+import argparse
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from propfair_scrapers.sketches import QuantileSketch
+
+CITY_WIDE = ""
+FIELDS = ("price", "price_per_m2", "area")
+RELATIVE_ACCURACY = 0.01
+TREND_WINDOW = timedelta(days=30)
+
+Key = tuple[str, str]
+
+
+def group_key(city: str, neighborhood: str | None, barrio: str | None = None) -> Key:
+    """Stats group of a listing: its official barrio when assigned, else the portal's neighborhood."""
+    return city, barrio or neighborhood or ""
+
+
+def _empty() -> dict[str, QuantileSketch]:
+    return {field: QuantileSketch(RELATIVE_ACCURACY) for field in FIELDS}
+
+
+class MarketStatsDelta:
+    """Per-neighborhood sketch deltas; negative counts take listings out."""
+
+    def __init__(self):
+        self.sketches: dict[Key, dict[str, QuantileSketch]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.sketches)
+
+    def add(self, key: Key, price: float, area: float, count: int = 1) -> None:
+        sketches = self.sketches.get(key)
+        if sketches is None:
+            sketches = self.sketches[key] = _empty()
+        sketches["price"].add(price, count)
+        sketches["area"].add(area, count)
+        if area > 0:
+            sketches["price_per_m2"].add(price / area, count)
+
+    def remove(self, key: Key, price: float, area: float) -> None:
+        self.add(key, price, area, count=-1)
+
+    def with_city_totals(self) -> dict[Key, dict[str, QuantileSketch]]:
+        """Neighborhood deltas plus each city's, merged from its neighborhoods."""
+        merged = {}
+        for (city, neighborhood), sketches in self.sketches.items():
+            total = merged.setdefault((city, CITY_WIDE), _empty())
+            for field in FIELDS:
+                total[field].merge(sketches[field])
+            # Listings without any neighborhood only count city-wide
+            if neighborhood != CITY_WIDE:
+                merged[(city, neighborhood)] = sketches
+        return merged
+
+
+def _load(data: dict | None) -> dict[str, QuantileSketch]:
+    sketches = _empty()
+    for field, sketch in (data or {}).items():
+        if field in sketches:
+            sketches[field] = QuantileSketch.from_dict(sketch)
+    return sketches
+
+
+def _percentiles(row, sketches: dict[str, QuantileSketch]) -> None:
+    price, per_m2 = sketches["price"], sketches["price_per_m2"]
+    row.active_listings = price.count
+    row.price_p25, row.price_median, row.price_p75 = (price.quantile(q) for q in (0.25, 0.5, 0.75))
+    row.price_per_m2_p25, row.price_per_m2_median, row.price_per_m2_p75 = (
+        per_m2.quantile(q) for q in (0.25, 0.5, 0.75)
+    )
+    row.area_median = sketches["area"].quantile(0.5)
+    row.sketches = {field: sketch.to_dict() for field, sketch in sketches.items()}
+
+
+def _trends(session, cities, now: datetime) -> dict[Key, dict[str, int]]:
+    """New listings and price changes in the trend window, per group and per city."""
+    from propfair_api.models import Listing, PriceHistory
+
+    since = now - TREND_WINDOW
+    group = func.coalesce(Listing.barrio, Listing.neighborhood)
+
+    def new_listings(columns):
+        return select(*columns, func.count()).where(
+            Listing.city.in_(cities), Listing.is_active.is_(True), Listing.first_seen_at >= since
+        )
+
+    def price_changes(columns):
+        return (
+            select(*columns, func.count())
+            .select_from(PriceHistory)
+            .join(Listing, Listing.id == PriceHistory.listing_id)
+            .where(Listing.city.in_(cities), Listing.is_active.is_(True), PriceHistory.recorded_at >= since)
+        )
+
+    trends: dict[Key, dict[str, int]] = {}
+    for name, query in (("new_listings_30d", new_listings), ("price_changes_30d", price_changes)):
+        for columns in ((Listing.city, group), (Listing.city,)):
+            for *names, value in session.execute(query(columns).group_by(*columns)):
+                key = (names[0], names[1] if len(names) > 1 else CITY_WIDE)
+                trends.setdefault(key, {})[name] = value
+    return trends
+
+
+def apply(
+    session, delta: MarketStatsDelta, now: datetime | None = None, attempts: int = 3
+) -> int:
+    """
+    Merge ``delta`` into the stored stats and refresh the trend counts of the
+    cities it touches. Returns the number of rows written.
+
+    The rows are read with ``FOR UPDATE``, so workers closing at the same
+    time merge one after the other instead of overwriting each other's
+    sketches. A row another worker created first (IntegrityError on
+    commit) is merged into on the next attempt.
+    """
+    if not delta:
+        return 0
+    now = now or datetime.now(UTC)
+    changes = delta.with_city_totals()
+    for attempt in range(attempts):
+        try:
+            return _apply(session, changes, now)
+        except IntegrityError:
+            session.rollback()
+            if attempt == attempts - 1:
+                raise
+    return 0
+
+
+def _apply(session, changes: dict[Key, dict[str, QuantileSketch]], now: datetime) -> int:
+    from propfair_api.models import NeighborhoodStats
+
+    cities = sorted({city for city, _ in changes})
+    # Locked in key order, so concurrent merges can't deadlock
+    locked = (
+        select(NeighborhoodStats)
+        .where(NeighborhoodStats.city.in_(cities))
+        .order_by(NeighborhoodStats.city, NeighborhoodStats.neighborhood)
+        .with_for_update()
+    )
+    rows = {(row.city, row.neighborhood): row for row in session.scalars(locked)}
+    for key, sketches in changes.items():
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = NeighborhoodStats(city=key[0], neighborhood=key[1])
+            session.add(row)
+        stored = _load(row.sketches)
+        for field in FIELDS:
+            stored[field].merge(sketches[field])
+        _percentiles(row, stored)
+        row.updated_at = now
+
+    trends = _trends(session, cities, now)
+    for key, row in rows.items():
+        row.new_listings_30d = trends.get(key, {}).get("new_listings_30d", 0)
+        row.price_changes_30d = trends.get(key, {}).get("price_changes_30d", 0)
+    session.commit()
+    return len(changes)
+
+
+def rebuild(session, now: datetime | None = None, batch_size: int = 10000) -> int:
+    """Recompute every row from the active listings. Returns the number of rows written."""
+    from propfair_api.models import Listing, NeighborhoodStats
+
+    delta = MarketStatsDelta()
+    query = select(Listing.city, Listing.neighborhood, Listing.barrio, Listing.price, Listing.area).where(
+        Listing.is_active.is_(True)
+    )
+    for city, neighborhood, barrio, price, area in session.execute(
+        query.execution_options(yield_per=batch_size)
+    ):
+        delta.add(group_key(city, neighborhood, barrio), price, area)
+    session.execute(delete(NeighborhoodStats))
+    return apply(session, delta, now=now)
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all stats from listings")
+    args = parser.parse_args(argv)
+
+    if not args.rebuild:
+        parser.print_help()
+        return 1
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL not set", file=sys.stderr)
+        return 1
+
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        rows = rebuild(session)
+    engine.dispose()
+    print(f"Rebuilt {rows} neighborhood stats rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
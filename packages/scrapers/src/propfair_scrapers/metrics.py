@@ -0,0 +1,328 @@
+"""
+Crawl metrics: per-stage pipeline timings, DB write latency, page render
+time and crawl stats, exported in Prometheus text format (textfile and/or
+HTTP endpoint) and as a JSON summary at spider close.
+
+Pipelines record into the process-wide ``metrics`` registry with
+``timed_stage``; ``MetricsExporter`` (a Scrapy extension) adds download and
+render timings and writes the exports.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+
+# Seconds; covers sub-millisecond pipeline stages up to slow page renders
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics (cumulative ``le`` buckets)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+        }
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class CrawlMetrics:
+    """Thread-safe registry of histograms and counters keyed by name and labels."""
+
+    def __init__(self, prefix: str = "propfair"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.counters: dict[str, dict[Labels, float]] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            key = _labels(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + value
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        return self.histograms.get(name, {}).get(_labels(labels))
+
+    def render_prometheus(self, gauges: dict[str, dict[Labels, float]] | None = None) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = _format_labels(labels, f'le="{bound}"')
+                        lines.append(f"{metric}_bucket{le} {cumulative}")
+                    le = _format_labels(labels, 'le="+Inf"')
+                    lines.append(f"{metric}_bucket{le} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+            for name, series in sorted(self.counters.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {value}")
+        for name, series in sorted((gauges or {}).items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, like the default registry of Prometheus clients
+metrics = CrawlMetrics()
+
+
+def timed_stage(stage: str):
+    """Record a pipeline ``process_item``'s duration and outcome under ``stage``."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, item, spider):
+            start = time.perf_counter()
+            outcome = "passed"
+            try:
+                return method(self, item, spider)
+            except DropItem:
+                outcome = "dropped"
+                raise
+            finally:
+                metrics.observe("pipeline_stage_seconds", time.perf_counter() - start, stage=stage)
+                metrics.inc("pipeline_items_total", stage=stage, outcome=outcome)
+
+        return wrapper
+
+    return decorator
+
+
+class LogSampler:
+    """Let through the first ``first`` calls, then one in every ``every``."""
+
+    def __init__(self, every: int = 100, first: int = 10):
+        self.every = max(every, 1)
+        self.first = first
+        self.calls = 0
+
+    def __call__(self) -> bool:
+        self.calls += 1
+        return self.calls <= self.first or self.calls % self.every == 0
+
+
+class MetricsExporter:
+    """
+    Scrapy extension that records download/render timings and exports metrics.
+
+    - METRICS_TEXTFILE: Prometheus textfile rewritten every
+      METRICS_EXPORT_INTERVAL seconds and at close (node_exporter collector)
+    - METRICS_PORT: serve ``/metrics`` over HTTP while the crawl runs
+    - METRICS_JSON_PATH: JSON summary written at spider close
+    """
+
+    def __init__(self, crawler, textfile=None, port=0, json_path=None, interval=30.0):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.textfile = textfile
+        self.port = port
+        self.json_path = json_path
+        self.interval = interval
+        self.started_at = None
+        self._last_export = 0.0
+        self._server = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("METRICS_ENABLED", True):
+            raise NotConfigured("METRICS_ENABLED is off")
+        extension = cls(
+            crawler,
+            textfile=settings.get("METRICS_TEXTFILE"),
+            port=settings.getint("METRICS_PORT", 0),
+            json_path=settings.get("METRICS_JSON_PATH"),
+            interval=settings.getfloat("METRICS_EXPORT_INTERVAL", 30.0),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        return extension
+
+    def spider_opened(self, spider):
+        metrics.reset()
+        self.started_at = time.monotonic()
+        self._last_export = self.started_at
+        if self.port:
+            self._serve(spider)
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is None:
+            return
+        if request.meta.get("playwright"):
+            metrics.observe("page_render_seconds", latency)
+        else:
+            metrics.observe("download_seconds", latency)
+        self._maybe_export()
+
+    def item_scraped(self, item, spider):
+        self._maybe_export()
+
+    def _maybe_export(self) -> None:
+        if self.textfile and time.monotonic() - self._last_export >= self.interval:
+            self._last_export = time.monotonic()
+            self.write_textfile()
+
+    def gauges(self) -> dict[str, dict[Labels, float]]:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        stats = {
+            _labels({"name": name}): value
+            for name, value in self.stats.get_stats().items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        items = self.stats.get_value("item_scraped_count", 0)
+        return {
+            "crawl_stat": stats,
+            "items_per_second": {(): items / elapsed if elapsed else 0.0},
+        }
+
+    def render(self) -> str:
+        return metrics.render_prometheus(self.gauges())
+
+    def write_textfile(self) -> None:
+        path = Path(self.textfile)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(self.render())
+        os.replace(tmp, path)
+
+    def summary(self) -> dict:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        stats = self.stats.get_stats()
+        items = stats.get("item_scraped_count", 0)
+
+        def histograms(name):
+            return {
+                ",".join(f"{k}={v}" for k, v in labels) or "all": histogram.summary()
+                for labels, histogram in metrics.histograms.get(name, {}).items()
+            }
+
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "items_scraped": items,
+            "items_per_second": items / elapsed if elapsed else 0.0,
+            "pipeline_stages": histograms("pipeline_stage_seconds"),
+            "db_write": histograms("db_write_seconds"),
+            "page_render": histograms("page_render_seconds"),
+            "download": histograms("download_seconds"),
+            "drops": {
+                key.replace("/dropped/", "/"): value
+                for key, value in stats.items()
+                if key.startswith(("validation/dropped/", "dedup/dropped/"))
+            },
+        }
+
+    def spider_closed(self, spider, reason):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.textfile:
+            self.write_textfile()
+        summary = self.summary()
+        if self.json_path:
+            path = Path(self.json_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(summary, indent=2, default=str))
+        spider.logger.info(
+            f"Crawl metrics: {summary['items_scraped']} items "
+            f"({summary['items_per_second']:.2f}/s) in {summary['elapsed_seconds']}s"
+        )
+
+    def _serve(self, spider) -> None:
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        spider.logger.info(f"Serving metrics on :{self._server.server_port}/metrics")
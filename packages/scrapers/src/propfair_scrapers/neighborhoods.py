@@ -0,0 +1,274 @@
+"""
+Assignment of listings to official neighborhoods by point-in-polygon.
+
+Usage:
+    python -m propfair_scrapers.neighborhoods --geojson barrios.geojson [--batch N] [--missing-only]
+
+Portal neighborhood text is free-form, so aggregations use the official
+barrio/localidad whose polygon contains a listing's coordinates instead.
+Polygons come from a local GeoJSON file (e.g. the city's open-data barrio
+layer), with the barrio and localidad names read from feature properties.
+
+Polygon bounding boxes are packed into an STR R-tree once at load, and each
+polygon's edges are bucketed into horizontal bands, so locating a point
+tests a handful of boxes and the few edges that cross its latitude instead
+of every vertex of every polygon.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from scrapy.exceptions import NotConfigured
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from propfair_scrapers.metrics import timed_stage
+
+BBox = tuple[float, float, float, float]  # min_x, min_y, max_x, max_y
+Ring = Sequence[Sequence[float]]
+
+
+@dataclass(frozen=True)
+class Neighborhood:
+    barrio: str | None
+    localidad: str | None
+
+
+class Region:
+    """A (multi)polygon with its edges bucketed into horizontal bands for even-odd tests."""
+
+    def __init__(self, neighborhood: Neighborhood, rings: list[Ring]):
+        self.neighborhood = neighborhood
+        edges = []
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, list(ring[1:]) + [ring[0]]):
+                if y1 != y2:
+                    edges.append((x1, y1, x2, y2))
+        xs = [x for ring in rings for x, _ in ring]
+        ys = [y for ring in rings for _, y in ring]
+        self.bbox: BBox = (min(xs), min(ys), max(xs), max(ys))
+
+        self._bands = max(1, int(math.sqrt(len(edges))))
+        self._band_height = (self.bbox[3] - self.bbox[1]) / self._bands or 1.0
+        self._edges: list[list[tuple]] = [[] for _ in range(self._bands)]
+        for edge in edges:
+            low, high = sorted((edge[1], edge[3]))
+            for band in range(self._band(low), self._band(high) + 1):
+                self._edges[band].append(edge)
+
+    def _band(self, y: float) -> int:
+        return min(max(int((y - self.bbox[1]) / self._band_height), 0), self._bands - 1)
+
+    def contains(self, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+        inside = False
+        for x1, y1, x2, y2 in self._edges[self._band(y)]:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+
+class STRTree:
+    """Static R-tree over bounding boxes, bulk-loaded by sort-tile-recursive packing."""
+
+    def __init__(self, boxes: Sequence[BBox], node_capacity: int = 16):
+        self.node_capacity = node_capacity
+        # Each node is (bbox, children, is_leaf); leaf children are item indices
+        level = [(box, [index], True) for index, box in enumerate(boxes)]
+        while len(level) > 1:
+            level = self._pack(level)
+        self.root = level[0] if level else None
+
+    def _pack(self, nodes: list) -> list:
+        capacity = self.node_capacity
+        slices = math.ceil(math.sqrt(math.ceil(len(nodes) / capacity)))
+        per_slice = slices * capacity
+        nodes = sorted(nodes, key=lambda node: node[0][0] + node[0][2])
+        parents = []
+        for start in range(0, len(nodes), per_slice):
+            column = sorted(nodes[start:start + per_slice], key=lambda node: node[0][1] + node[0][3])
+            for offset in range(0, len(column), capacity):
+                group = column[offset:offset + capacity]
+                box = (
+                    min(node[0][0] for node in group),
+                    min(node[0][1] for node in group),
+                    max(node[0][2] for node in group),
+                    max(node[0][3] for node in group),
+                )
+                parents.append((box, group, False))
+        return parents
+
+    def query(self, x: float, y: float) -> Iterable[int]:
+        """Indices of the boxes containing the point."""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            (min_x, min_y, max_x, max_y), children, leaf = stack.pop()
+            if not (min_x <= x <= max_x and min_y <= y <= max_y):
+                continue
+            if leaf:
+                yield from children
+            else:
+                stack.extend(children)
+
+
+class NeighborhoodIndex:
+    """Locates points in a set of official neighborhood polygons."""
+
+    def __init__(self, regions: list[Region]):
+        self.regions = regions
+        self.tree = STRTree([region.bbox for region in regions])
+        self._cache: dict[tuple[float, float], Neighborhood | None] = {}
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    @classmethod
+    def from_geojson(
+        cls, path, name_property: str = "name", localidad_property: str = "localidad"
+    ) -> "NeighborhoodIndex":
+        with open(path, encoding="utf-8") as f:
+            collection = json.load(f)
+        regions = []
+        for feature in collection["features"]:
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") == "Polygon":
+                rings = geometry["coordinates"]
+            elif geometry.get("type") == "MultiPolygon":
+                rings = [ring for polygon in geometry["coordinates"] for ring in polygon]
+            else:
+                continue
+            properties = feature.get("properties") or {}
+            neighborhood = Neighborhood(
+                barrio=properties.get(name_property),
+                localidad=properties.get(localidad_property),
+            )
+            regions.append(Region(neighborhood, rings))
+        return cls(regions)
+
+    def locate(self, latitude: float, longitude: float) -> Neighborhood | None:
+        point = (latitude, longitude)
+        if point not in self._cache:
+            self._cache[point] = next(
+                (
+                    self.regions[index].neighborhood
+                    for index in self.tree.query(longitude, latitude)
+                    if self.regions[index].contains(longitude, latitude)
+                ),
+                None,
+            )
+        return self._cache[point]
+
+    def locate_many(self, points: Iterable[tuple[float, float]]) -> list[Neighborhood | None]:
+        return [self.locate(latitude, longitude) for latitude, longitude in points]
+
+
+class NeighborhoodPipeline:
+    """
+    Set ``barrio``/``localidad`` from the polygon containing the listing's
+    coordinates. Enabled when NEIGHBORHOODS_GEOJSON points to a polygon file;
+    outcomes are counted in the ``neighborhoods/...`` crawl stats.
+    """
+
+    def __init__(self, index: NeighborhoodIndex, stats=None):
+        self.index = index
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get("NEIGHBORHOODS_GEOJSON")
+        if not path:
+            raise NotConfigured("NEIGHBORHOODS_GEOJSON is not set")
+        index = NeighborhoodIndex.from_geojson(
+            path,
+            name_property=settings.get("NEIGHBORHOODS_NAME_PROPERTY", "name"),
+            localidad_property=settings.get("NEIGHBORHOODS_LOCALIDAD_PROPERTY", "localidad"),
+        )
+        return cls(index, stats=crawler.stats)
+
+    def _inc(self, key: str) -> None:
+        if self.stats:
+            self.stats.inc_value(f"neighborhoods/{key}")
+
+    @timed_stage("neighborhoods")
+    def process_item(self, item, spider):
+        if item.get("latitude") is None or item.get("longitude") is None:
+            return item
+        if item.get("coordinates_approximate"):
+            # A city centroid says nothing about the barrio
+            return item
+        neighborhood = self.index.locate(item["latitude"], item["longitude"])
+        if neighborhood is None:
+            self._inc("outside")
+            return item
+        self._inc("assigned")
+        item["barrio"] = neighborhood.barrio
+        item["localidad"] = neighborhood.localidad
+        return item
+
+
+def assign(session, index: NeighborhoodIndex, batch_size: int = 5000, missing_only: bool = False) -> int:
+    """
+    (Re)assign stored listings in primary-key batches, with one bulk UPDATE
+    per batch. Returns the number of listings updated.
+    """
+    from propfair_api.models import Listing
+
+    updated = 0
+    last_id = ""
+    while True:
+        query = select(Listing.id, Listing.latitude, Listing.longitude).where(
+            Listing.id > last_id, Listing.coordinates_approximate.is_(False)
+        )
+        if missing_only:
+            query = query.where(Listing.barrio.is_(None))
+        rows = session.execute(query.order_by(Listing.id).limit(batch_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        neighborhoods = index.locate_many((row.latitude, row.longitude) for row in rows)
+        values = [
+            {"id": row.id, "barrio": found.barrio, "localidad": found.localidad}
+            for row, found in zip(rows, neighborhoods)
+            if found is not None
+        ]
+        if values:
+            session.execute(update(Listing), values)
+            session.commit()
+            updated += len(values)
+    return updated
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--geojson", default=os.getenv("NEIGHBORHOODS_GEOJSON"))
+    parser.add_argument("--name-property", default="name")
+    parser.add_argument("--localidad-property", default="localidad")
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--missing-only", action="store_true", help="Skip listings with a barrio")
+    args = parser.parse_args(argv)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url or not args.geojson:
+        print("DATABASE_URL and --geojson (or NEIGHBORHOODS_GEOJSON) are required", file=sys.stderr)
+        return 1
+
+    index = NeighborhoodIndex.from_geojson(args.geojson, args.name_property, args.localidad_property)
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        updated = assign(session, index, batch_size=args.batch, missing_only=args.missing_only)
+    engine.dispose()
+    print(f"{updated} listings assigned to {len(index)} neighborhood polygons")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
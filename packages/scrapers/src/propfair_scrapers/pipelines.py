@@ -1,14 +1,32 @@
 import hashlib
 import json
 import os
-import sys
-from datetime import datetime, timezone
+import sqlite3
+import time
+from datetime import UTC, datetime, timedelta
+
+from scrapy import signals
 from scrapy.exceptions import DropItem
-from sqlalchemy import create_engine
+from sqlalchemy import (
+    Column,
+    MetaData,
+    String,
+    Table,
+    and_,
+    create_engine,
+    insert,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
 
-# Add API models to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../api/src"))
+from propfair_scrapers import market_stats
+from propfair_scrapers.metrics import LogSampler, metrics, timed_stage
+from propfair_scrapers.resolution import EntityResolver
+from propfair_scrapers.sketches import OutlierSketches
 
 # Deferred import to avoid issues in test environments
 try:
@@ -20,6 +38,17 @@ except ImportError:
 
 
 class ValidationPipeline:
+    """
+    Drop incomplete or implausible listings.
+
+    Besides required fields and positive price/area, items are checked against
+    per-neighborhood (falling back to per-city) robust ranges of price, area
+    and price per m², kept as streaming quantile sketches and persisted to
+    OUTLIER_SKETCH_PATH between runs. OUTLIER_ACTION "drop" rejects outliers,
+    "flag" keeps them with ``outlier_reasons`` set. Drop and outlier reasons
+    are counted in the ``validation/...`` crawl stats.
+    """
+
     REQUIRED_FIELDS = [
         "external_id",
         "source",
@@ -37,24 +66,73 @@ class ValidationPipeline:
         "longitude",
     ]
 
+    def __init__(self, stats=None, sketch_path=None, outlier_action="drop", **sketch_options):
+        self.stats = stats
+        self.sketch_path = sketch_path
+        self.outlier_action = outlier_action
+        self.sketches = OutlierSketches(**sketch_options)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            stats=crawler.stats,
+            sketch_path=settings.get("OUTLIER_SKETCH_PATH"),
+            outlier_action=settings.get("OUTLIER_ACTION", "drop"),
+            fence=settings.getfloat("OUTLIER_FENCE", 3.0),
+            min_count=settings.getint("OUTLIER_MIN_COUNT", 30),
+        )
+
+    def open_spider(self, spider):
+        if self.sketch_path and self.sketches.load(self.sketch_path):
+            spider.logger.info(f"Loaded outlier sketches from {self.sketch_path}")
+
+    def close_spider(self, spider):
+        if self.sketch_path:
+            self.sketches.save(self.sketch_path)
+
+    def _drop(self, reason: str, message: str):
+        if self.stats:
+            self.stats.inc_value(f"validation/dropped/{reason}")
+        raise DropItem(message)
+
+    @timed_stage("validation")
     def process_item(self, item, spider):
         for field in self.REQUIRED_FIELDS:
             if field not in item or item[field] is None:
-                raise DropItem(f"Missing required field: {field}")
+                self._drop(f"missing_{field}", f"Missing required field: {field}")
 
         if item["price"] <= 0:
-            raise DropItem(f"Invalid price: {item['price']}")
+            self._drop("invalid_price", f"Invalid price: {item['price']}")
 
         if item["area"] <= 0:
-            raise DropItem(f"Invalid area: {item['area']}")
+            self._drop("invalid_area", f"Invalid area: {item['area']}")
+
+        reasons = self.sketches.check(item)
+        if reasons:
+            if self.stats:
+                for reason in reasons:
+                    self.stats.inc_value(f"validation/outliers/{reason}")
+            if self.outlier_action == "drop":
+                self._drop("outlier", f"Outlier ({', '.join(reasons)}): {item['external_id']}")
+            item["outlier_reasons"] = reasons
+        else:
+            # Only plausible values feed the sketches, so outliers cannot widen the range
+            self.sketches.add(item)
 
         return item
 
 
 class DeduplicationPipeline:
-    def __init__(self):
+    def __init__(self, stats=None):
+        self.stats = stats
         self.seen_hashes = set()
 
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(stats=crawler.stats)
+
+    @timed_stage("deduplication")
     def process_item(self, item, spider):
         content = {
             "external_id": item["external_id"],
@@ -67,6 +145,8 @@ class DeduplicationPipeline:
         ).hexdigest()
 
         if content_hash in self.seen_hashes:
+            if self.stats:
+                self.stats.inc_value("dedup/dropped/duplicate")
             raise DropItem(f"Duplicate item: {item['external_id']}")
 
         self.seen_hashes.add(content_hash)
@@ -74,25 +154,125 @@ class DeduplicationPipeline:
         return item
 
 
+def _load_models(spider) -> bool:
+    """Import the API models if the module-level import failed."""
+    global Listing, PriceHistory
+    if Listing is None or PriceHistory is None:
+        try:
+            from propfair_api.models import Listing as L, PriceHistory as PH
+            Listing = L
+            PriceHistory = PH
+        except ImportError as e:
+            spider.logger.error(f"Could not import models: {e}")
+            return False
+    return True
+
+
+class EntityResolutionPipeline:
+    """Pipeline to assign a canonical property ID shared by duplicates across portals."""
+
+    def __init__(self):
+        self.resolver = EntityResolver()
+
+    def open_spider(self, spider):
+        """Index the active listings already in the database."""
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url or not _load_models(spider):
+            return
+
+        engine = create_engine(database_url)
+        try:
+            query = select(
+                Listing.source,
+                Listing.external_id,
+                Listing.title,
+                Listing.address,
+                Listing.latitude,
+                Listing.longitude,
+                Listing.area,
+                Listing.bedrooms,
+                Listing.price,
+                Listing.property_id,
+            ).where(Listing.is_active.is_(True))
+            with engine.connect() as connection:
+                for row in connection.execution_options(yield_per=10000).execute(query):
+                    self.resolver.resolve(*row[:-1], canonical_id=row.property_id)
+            spider.logger.info(f"Entity resolution index loaded with {len(self.resolver)} listings")
+        except Exception as e:
+            spider.logger.error(f"Failed to load entity resolution index: {e}")
+        finally:
+            engine.dispose()
+
+    @timed_stage("resolution")
+    def process_item(self, item, spider):
+        item["property_id"] = self.resolver.resolve(
+            item["source"],
+            item["external_id"],
+            item["title"],
+            item["address"],
+            item["latitude"],
+            item["longitude"],
+            item["area"],
+            item["bedrooms"],
+            item["price"],
+        )
+        return item
+
+
+# Keys seen during a run, loaded once at close for set-based updates
+seen_listings = Table(
+    "seen_listings",
+    MetaData(),
+    Column("source", String, nullable=False),
+    Column("external_id", String, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
 class DatabasePipeline:
     """Pipeline to save listings to PostgreSQL database."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        stale_after_days: float = 3.0,
+        log_every: int = 100,
+        market_stats_enabled: bool = True,
+        heatmap_tiles_path: str | None = None,
+    ):
         self.engine = None
         self.Session = None
+        # Per-item info logs are sampled; at crawl volume they cost real I/O
+        self.log_sampled = LogSampler(every=log_every)
+        # Listings not seen for this long in a walked partition are deactivated
+        self.stale_after = timedelta(days=stale_after_days)
+        self.seen_keys = set()
+        self.crawled_partitions = set()
+        # The spider's search partitions and those walked to the last page,
+        # read at close; None for runs without partitions (plain start_urls)
+        self.search_partitions = None
+        self.walked_partitions = None
+        # What this run changed in the neighborhood stats, merged in at close
+        self.market_stats = market_stats.MarketStatsDelta() if market_stats_enabled else None
+        self._stats_changes = []
+        self.heatmap_tiles_path = heatmap_tiles_path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            stale_after_days=crawler.settings.getfloat("LISTING_STALE_AFTER_DAYS", 3.0),
+            log_every=crawler.settings.getint("ITEM_LOG_EVERY", 100),
+            market_stats_enabled=crawler.settings.getbool("MARKET_STATS_ENABLED", True),
+            heatmap_tiles_path=crawler.settings.get("HEATMAP_TILES_PATH"),
+        )
+        # Only spider_closed says why the crawl ended
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
 
     def open_spider(self, spider):
         """Initialize database connection when spider opens."""
         # Try importing models if not already imported
-        global Listing, PriceHistory
-        if Listing is None or PriceHistory is None:
-            try:
-                from propfair_api.models import Listing as L, PriceHistory as PH
-                Listing = L
-                PriceHistory = PH
-            except ImportError as e:
-                spider.logger.error(f"Could not import models: {e}")
-                return
+        if not _load_models(spider):
+            return
 
         database_url = os.getenv("DATABASE_URL")
         if not database_url:
@@ -107,18 +287,48 @@ class DatabasePipeline:
             spider.logger.error(f"Failed to connect to database: {e}")
 
     def close_spider(self, spider):
-        """Close database connection when spider closes."""
+        """Note the walked partitions before the spider clears their checkpoints."""
+        if hasattr(spider, "finished_partitions"):
+            self.search_partitions = spider.crawl_partitions() or None
+            self.walked_partitions = spider.finished_partitions() if self.search_partitions else None
+
+    def spider_closed(self, spider, reason):
+        """Record the run and close the database connection once the crawl is over."""
         if self.engine:
+            try:
+                # An interrupted crawl says nothing about the listings it didn't reach
+                self.touch_and_deactivate(spider, deactivate=reason == "finished")
+            except SQLAlchemyError as e:
+                # Its deactivations are in the stats delta but were rolled back
+                spider.logger.error(
+                    f"Failed to update last-seen/active listings: {e}; neighborhood stats not "
+                    "updated (python -m propfair_scrapers.market_stats --rebuild)"
+                )
+            else:
+                try:
+                    self.update_market_stats(spider)
+                except SQLAlchemyError as e:
+                    spider.logger.error(f"Failed to update neighborhood stats: {e}")
+            if self.heatmap_tiles_path:
+                try:
+                    self.update_heatmap(spider)
+                except (SQLAlchemyError, sqlite3.Error, OSError) as e:
+                    spider.logger.error(f"Failed to update heatmap tiles: {e}")
             self.engine.dispose()
             spider.logger.info("Database connection closed")
 
+    @timed_stage("database")
     def process_item(self, item, spider):
         """Save or update listing in database."""
         if not self.Session:
             spider.logger.warning("Database not connected, skipping item")
             return item
 
+        self.seen_keys.add((item["source"], item["external_id"]))
+        self.crawled_partitions.add((item["source"], item["city"]))
+
         session = self.Session()
+        self._stats_changes = []
         try:
             # Check if listing exists
             existing = session.query(Listing).filter_by(
@@ -131,7 +341,12 @@ class DatabasePipeline:
             else:
                 self._create_listing(session, item, spider)
 
+            start = time.perf_counter()
             session.commit()
+            metrics.observe("db_write_seconds", time.perf_counter() - start)
+            if self.market_stats is not None:
+                for count, key, price, area in self._stats_changes:
+                    self.market_stats.add(key, price, area, count=count)
             spider.logger.debug(f"Saved listing: {item['external_id']}")
 
         except Exception as e:
@@ -142,10 +357,121 @@ class DatabasePipeline:
 
         return item
 
+    def touch_and_deactivate(self, spider, now=None, deactivate=True):
+        """
+        Mark every listing seen this run as active and seen now, then deactivate
+        listings in the walked partitions (see ``_stale_scope``) that have not
+        been seen within the stale window. Two set-based UPDATEs joined against
+        a temporary table of seen keys, instead of one statement per listing.
+
+        Runs that only fetch some listings of a partition (recrawl lists,
+        archive replays) set ``spider.covers_partitions = False`` and only touch.
+        """
+        if not self.seen_keys:
+            return
+        now = now or datetime.now(UTC)
+        listings = Listing.__table__
+        key = tuple_(listings.c.source, listings.c.external_id)
+
+        with self.engine.begin() as connection:
+            seen_listings.create(connection)
+            try:
+                connection.execute(
+                    insert(seen_listings),
+                    [{"source": source, "external_id": external_id} for source, external_id in self.seen_keys],
+                )
+                touched = connection.execute(
+                    update(listings)
+                    .where(key.in_(select(seen_listings.c.source, seen_listings.c.external_id)))
+                    .values(last_seen_at=now, is_active=True)
+                ).rowcount
+                deactivated = 0
+                scope = self._stale_scope(listings)
+                if deactivate and getattr(spider, "covers_partitions", True) and scope is not None:
+                    stale = (
+                        listings.c.is_active.is_(True),
+                        listings.c.last_seen_at < now - self.stale_after,
+                        scope,
+                    )
+                    if self.market_stats is not None:
+                        for row in connection.execute(
+                            select(
+                                listings.c.city,
+                                listings.c.neighborhood,
+                                listings.c.barrio,
+                                listings.c.price,
+                                listings.c.area,
+                            ).where(*stale)
+                        ):
+                            self.market_stats.remove(
+                                market_stats.group_key(row.city, row.neighborhood, row.barrio),
+                                row.price,
+                                row.area,
+                            )
+                    deactivated = connection.execute(
+                        update(listings).where(*stale).values(is_active=False, updated_at=now)
+                    ).rowcount
+            finally:
+                seen_listings.drop(connection)
+
+        spider.logger.info(f"Touched {touched} listings, deactivated {deactivated} stale listings")
+
+    def _stale_scope(self, listings):
+        """
+        Where a listing not seen this run is gone: in the crawled (source, city)
+        pairs, or for partitioned crawls, in each (city, price band) whose
+        searches were walked to the last page for every property type (listings
+        don't record theirs). None when no partition qualifies.
+        """
+        if self.search_partitions is None:
+            return tuple_(listings.c.source, listings.c.city).in_(list(self.crawled_partitions))
+        walked = set(self.walked_partitions or ())
+        bands = {}
+        for partition in self.search_partitions:
+            band = (partition.city_name, partition.min_price, partition.max_price)
+            bands[band] = bands.get(band, True) and partition in walked
+        conditions = []
+        for (city, min_price, max_price), done in bands.items():
+            if not done:
+                continue
+            condition = [listings.c.city == city]
+            if min_price is not None:
+                condition.append(listings.c.price >= min_price)
+            if max_price is not None:
+                condition.append(listings.c.price <= max_price)
+            conditions.append(and_(*condition))
+        if not conditions:
+            return None
+        sources = sorted({source for source, _ in self.crawled_partitions})
+        return and_(listings.c.source.in_(sources), or_(*conditions))
+
+    def update_market_stats(self, spider, now=None):
+        """Merge this run's changes into the neighborhood stats."""
+        if not self.market_stats:
+            return
+        session = self.Session()
+        try:
+            rows = market_stats.apply(session, self.market_stats, now=now)
+        finally:
+            session.close()
+        self.market_stats = market_stats.MarketStatsDelta()
+        spider.logger.info(f"Updated {rows} neighborhood stats rows")
+
+    def update_heatmap(self, spider):
+        """Rebuild the heatmap tiles holding listings changed since the last run."""
+        from propfair_scrapers.heatmap import update_tiles
+
+        session = self.Session()
+        try:
+            written = update_tiles(session, self.heatmap_tiles_path)
+        finally:
+            session.close()
+        spider.logger.info(f"Wrote {written} heatmap tiles to {self.heatmap_tiles_path}")
+
     def _generate_cuid(self) -> str:
         """Generate a CUID-like ID."""
         import secrets
-        timestamp = hex(int(datetime.now(timezone.utc).timestamp() * 1000))[2:]
+        timestamp = hex(int(datetime.now(UTC).timestamp() * 1000))[2:]
         random_part = secrets.token_hex(8)
         return f"c{timestamp}{random_part}"
 
@@ -174,23 +500,36 @@ class DatabasePipeline:
             city=item["city"],
             latitude=item["latitude"],
             longitude=item["longitude"],
+            coordinates_approximate=item.get("coordinates_approximate", False),
+            barrio=item.get("barrio"),
+            localidad=item.get("localidad"),
             images=item.get("images", []),
             amenities=item.get("amenities", []),
-            first_seen_at=datetime.now(timezone.utc),
-            last_seen_at=datetime.now(timezone.utc),
+            first_seen_at=datetime.now(UTC),
+            last_seen_at=datetime.now(UTC),
             is_active=True,
             content_hash=item["content_hash"],
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
+            property_id=item.get("property_id"),
+            created_at=datetime.now(UTC),
+            updated_at=datetime.now(UTC),
         )
         session.add(listing)
-        spider.logger.info(f"Created new listing: {item['external_id']}")
+        self._stats_changes.append((+1, self._stats_key(item), item["price"], item["area"]))
+        if self.log_sampled():
+            spider.logger.info(f"Created new listing: {item['external_id']}")
+
+    @staticmethod
+    def _stats_key(item):
+        return market_stats.group_key(item["city"], item["neighborhood"], item.get("barrio"))
 
     def _update_listing(self, session, existing, item, spider):
         """Update an existing listing in the database."""
-        # Update last_seen_at
-        existing.last_seen_at = datetime.now(timezone.utc)
-        existing.updated_at = datetime.now(timezone.utc)
+        # last_seen_at/is_active are set in bulk at close (touch_and_deactivate)
+        before = (
+            market_stats.group_key(existing.city, existing.neighborhood, existing.barrio),
+            existing.price,
+            existing.area,
+        )
 
         # Check if price changed
         if existing.price != item["price"]:
@@ -205,7 +544,7 @@ class DatabasePipeline:
                 listing_id=existing.id,
                 price=item["price"],
                 admin_fee=item.get("admin_fee"),
-                recorded_at=datetime.now(timezone.utc)
+                recorded_at=datetime.now(UTC)
             )
             session.add(price_history)
 
@@ -219,5 +558,24 @@ class DatabasePipeline:
         existing.images = item.get("images", [])
         existing.amenities = item.get("amenities", [])
         existing.content_hash = item["content_hash"]
-
-        spider.logger.info(f"Updated existing listing: {item['external_id']}")
+        existing.property_id = item.get("property_id") or existing.property_id
+        existing.barrio = item.get("barrio") or existing.barrio
+        existing.localidad = item.get("localidad") or existing.localidad
+        # Only real changes (and reactivations) bump updated_at, which drives
+        # incremental work after the crawl such as heatmap tiles
+        if session.is_modified(existing) or not existing.is_active:
+            existing.updated_at = datetime.now(UTC)
+
+        after = (
+            market_stats.group_key(existing.city, existing.neighborhood, existing.barrio),
+            existing.price,
+            existing.area,
+        )
+        # Inactive listings are not in the stats yet; the close-time touch reactivates them
+        if not existing.is_active:
+            self._stats_changes.append((+1,) + after)
+        elif after != before:
+            self._stats_changes.extend([(-1,) + before, (+1,) + after])
+
+        if self.log_sampled():
+            spider.logger.info(f"Updated existing listing: {item['external_id']}")
@@ -0,0 +1,142 @@
+"""
+Volatility-aware recrawl planning.
+
+Usage:
+    python -m propfair_scrapers.recrawl [--budget N] [--output recrawl.txt]
+    scrapy crawl fincaraiz -a recrawl=recrawl.txt
+
+Each active listing gets a next-visit time from how often its price has
+changed (``price_history`` rows), how old it is (``first_seen_at``) and when
+it was last seen. Listings that are due are ranked by how overdue they are
+and the top ``--budget`` URLs are written one per line, most urgent first,
+for the spider to fetch instead of walking every search page.
+"""
+import argparse
+import heapq
+import os
+import sys
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+@dataclass
+class RecrawlPolicy:
+    """
+    Revisit interval from an estimated price-change rate.
+
+    The rate is smoothed towards a prior (``prior_changes`` per ``prior_days``)
+    so a listing with little history is neither ignored nor hammered, and a
+    listing is revisited when ``target_changes`` changes are expected since
+    the last visit. Listings younger than ``young_age`` are revisited
+    proportionally sooner, since new listings are the ones that get re-priced.
+    """
+
+    min_interval: timedelta = timedelta(hours=12)
+    max_interval: timedelta = timedelta(days=7)
+    prior_changes: float = 1.0
+    prior_days: float = 30.0
+    target_changes: float = 0.05
+    young_age: timedelta = timedelta(days=14)
+
+    def change_rate(self, changes: int, observed: timedelta) -> float:
+        """Estimated price changes per day."""
+        days = max(observed.total_seconds(), 0) / 86400
+        return (changes + self.prior_changes) / (days + self.prior_days)
+
+    def interval(self, changes: int, first_seen_at: datetime, now: datetime) -> timedelta:
+        age = now - _utc(first_seen_at)
+        interval = timedelta(days=self.target_changes / self.change_rate(changes, age))
+        if age < self.young_age:
+            interval *= max(age / self.young_age, 0.0)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def priority(
+        self, changes: int, first_seen_at: datetime, last_seen_at: datetime, now: datetime
+    ) -> float:
+        """Staleness relative to the interval; 1.0 means due now."""
+        staleness = now - _utc(last_seen_at)
+        return staleness / self.interval(changes, first_seen_at, now)
+
+
+@dataclass
+class RecrawlCandidate:
+    listing_id: str
+    url: str
+    priority: float
+    next_visit: datetime
+
+
+def plan_recrawl(
+    session: Session,
+    budget: int,
+    now: datetime | None = None,
+    policy: RecrawlPolicy | None = None,
+    source: str | None = None,
+) -> list[RecrawlCandidate]:
+    """The ``budget`` most overdue active listings, most urgent first."""
+    from propfair_api.models import Listing, PriceHistory
+
+    now = now or datetime.now(UTC)
+    policy = policy or RecrawlPolicy()
+
+    changes = (
+        select(PriceHistory.listing_id, func.count().label("changes"))
+        .group_by(PriceHistory.listing_id)
+        .subquery()
+    )
+    query = (
+        select(
+            Listing.id,
+            Listing.url,
+            Listing.first_seen_at,
+            Listing.last_seen_at,
+            func.coalesce(changes.c.changes, 0),
+        )
+        .outerjoin(changes, changes.c.listing_id == Listing.id)
+        .where(Listing.is_active.is_(True))
+    )
+    if source:
+        query = query.where(Listing.source == source)
+
+    due = []
+    for listing_id, url, first_seen_at, last_seen_at, count in session.execute(query):
+        priority = policy.priority(count, first_seen_at, last_seen_at, now)
+        if priority >= 1.0:
+            interval = policy.interval(count, first_seen_at, now)
+            due.append(RecrawlCandidate(listing_id, url, priority, _utc(last_seen_at) + interval))
+    return heapq.nlargest(budget, due, key=lambda candidate: candidate.priority)
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--budget", type=int, default=int(os.getenv("RECRAWL_BUDGET", "2000")))
+    parser.add_argument("--output", default="recrawl.txt")
+    parser.add_argument("--source", default="fincaraiz")
+    args = parser.parse_args(argv)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL not set", file=sys.stderr)
+        return 1
+
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        candidates = plan_recrawl(session, args.budget, source=args.source)
+    engine.dispose()
+
+    with open(args.output, "w") as f:
+        f.writelines(candidate.url + "\n" for candidate in candidates)
+    print(f"{len(candidates)} listings due, written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Re-run archived pages through a spider's callbacks and item pipelines.
+
+Usage:
+    python -m propfair_scrapers.reparse ARCHIVE_DIR [--workers N] [--spider NAME]
+
+Each worker process runs a normal Scrapy crawl whose requests are answered
+from the page archive (see ``propfair_scrapers.archive``), so selector fixes
+and new fields can be backfilled without a browser or any network access.
+Records are sharded between workers by URL.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+# Applied with command-line priority so they win over spider custom_settings
+REPARSE_SETTINGS = {
+    # No download handlers: any request not served from the archive fails
+    "DOWNLOAD_HANDLERS": {"http": None, "https": None},
+    "ROBOTSTXT_OBEY": False,
+    "CLOSESPIDER_PAGECOUNT": 0,
+    "PAGE_ARCHIVE_DIR": None,
+    "DOWNLOAD_DELAY": 0,
+    "CONCURRENT_REQUESTS": 32,
+    # Replayed requests carry whole pages in their meta; keep them out of a
+    # shared frontier (FRONTIER_URL) and in this process
+    "SCHEDULER": "scrapy.core.scheduler.Scheduler",
+    "FRONTIER_URL": None,
+}
+
+
+def run_shard(archive: str, spider: str, shard: int, shards: int) -> None:
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "propfair_scrapers.settings")
+    settings = get_project_settings()
+    settings.setdict(REPARSE_SETTINGS, priority="cmdline")
+    process = CrawlerProcess(settings)
+    process.crawl(spider, archive=archive, shard=shard, shards=shards)
+    process.start()
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("archive", help="Page archive directory (PAGE_ARCHIVE_DIR)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--spider", default="fincaraiz")
+    args = parser.parse_args(argv)
+
+    if args.workers == 1:
+        run_shard(args.archive, args.spider, 0, 1)
+        return 0
+
+    # Each worker needs its own Twisted reactor, so start fresh interpreters
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run_shard, args=(args.archive, args.spider, shard, args.workers))
+        for shard in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return 1 if any(worker.exitcode for worker in workers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import hashlib
+import math
+import re
+import unicodedata
+
+# Spanish address abbreviations as written across portals
+_ADDRESS_ABBREVIATIONS = {
+    "cl": "calle",
+    "cll": "calle",
+    "clle": "calle",
+    "kr": "carrera",
+    "kra": "carrera",
+    "cra": "carrera",
+    "cr": "carrera",
+    "ak": "avenida carrera",
+    "ac": "avenida calle",
+    "av": "avenida",
+    "avda": "avenida",
+    "dg": "diagonal",
+    "diag": "diagonal",
+    "tv": "transversal",
+    "trans": "transversal",
+    "no": "",
+    "n": "",
+    "apto": "apartamento",
+    "apt": "apartamento",
+}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def geohash_cell_size(precision: int) -> tuple[float, float]:
+    """(latitude, longitude) span in degrees of a geohash cell."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def normalize_text(text: str | None) -> str:
+    """Lowercase, strip accents and punctuation, and expand address abbreviations."""
+    if not text:
+        return ""
+    # Decompose accents and drop the combining marks (and any other non-ASCII)
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    tokens = []
+    for token in _NON_ALNUM.sub(" ", text).split():
+        expanded = _ADDRESS_ABBREVIATIONS.get(token, token)
+        if expanded:
+            tokens.append(expanded)
+    return " ".join(tokens)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _numbers(text: str) -> set:
+    return {token for token in text.split() if token.isdigit()}
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of character trigrams of two normalized strings."""
+    if not a or not b:
+        return 0.0
+    return _jaccard(trigrams(a), trigrams(b))
+
+
+def _address_score(trigrams_a: set, numbers_a: set, b: str) -> float:
+    if not trigrams_a or not b:
+        return 0.0
+    score = _jaccard(trigrams_a, trigrams(b))
+    numbers_b = _numbers(b)
+    if numbers_a and numbers_b:
+        score *= len(numbers_a & numbers_b) / len(numbers_a | numbers_b)
+    return score
+
+
+def address_similarity(a: str, b: str) -> float:
+    """
+    Trigram similarity of two normalized addresses, scaled by the overlap of
+    their house numbers: "calle 93 # 11-40" and "calle 93 # 14-10" read
+    alike but are different buildings.
+    """
+    if not a:
+        return 0.0
+    return _address_score(trigrams(a), _numbers(a), b)
+
+
+def _cell(value: float, origin: float, span: float) -> tuple[int, int]:
+    """Grid cell index of ``value`` and the adjacent cell it is closest to."""
+    position = (value - origin) / span
+    cell = math.floor(position)
+    return cell, cell - 1 if position - cell < 0.5 else cell + 1
+
+
+def _band(value: float, width: float) -> tuple[int, int]:
+    """Log-scale band of ``value`` and the adjacent band it is closest to."""
+    return _cell(math.log(max(value, 1)), 0.0, math.log(1 + width))
+
+
+class EntityResolver:
+    """
+    Incremental cross-portal duplicate detection.
+
+    Listings are indexed into blocks by geohash cell, area band, bedrooms and
+    price band; a new listing is only scored against listings from *other*
+    sources in the blocks around it (its cell plus the three neighbours
+    towards its nearest corner, and the nearest neighbouring area/price
+    bands), so each lookup
+    touches a handful of candidates instead of every listing. The best
+    candidate above ``threshold`` on normalized address/title similarity
+    lends its canonical property ID; otherwise the listing starts a new one.
+    """
+
+    def __init__(
+        self,
+        precision: int = 6,
+        area_band: float = 0.1,
+        price_band: float = 0.1,
+        threshold: float = 0.6,
+        address_weight: float = 0.6,
+    ):
+        self.precision = precision
+        self.area_band = area_band
+        self.price_band = price_band
+        self.threshold = threshold
+        self.address_weight = address_weight
+        self._lat_span, self._lon_span = geohash_cell_size(precision)
+        # Parallel arrays keep per-listing overhead low at millions of listings
+        self._canonical: list[str] = []
+        self._address: list[str] = []
+        self._title: list[str] = []
+        self._blocks: dict[int, list[int]] = {}
+        self._by_key: dict[tuple[str, str], int] = {}
+        # Bitmask of the sources already in each property: a portal lists a
+        # property once, so a cluster that has our source is not a match
+        self._source_bits: dict[str, int] = {}
+        self._property_sources: dict[str, int] = {}
+        self.comparisons = 0
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def _keys(self, latitude, longitude, area, bedrooms, price):
+        """(own block key, all block keys to search)."""
+        # Row/column of the geohash cell at ``precision`` (same grid, no string encoding)
+        rows = _cell(latitude, -90.0, self._lat_span)
+        columns = _cell(longitude, -180.0, self._lon_span)
+        area_bands = _band(area, self.area_band)
+        price_bands = _band(price, self.price_band)
+        own = hash((rows[0], columns[0], area_bands[0], bedrooms, price_bands[0]))
+        search = [
+            hash((row, column, a, bedrooms, p))
+            for row in rows
+            for column in columns
+            for a in area_bands
+            for p in price_bands
+        ]
+        return own, search
+
+    def resolve(
+        self,
+        source: str,
+        external_id: str,
+        title: str,
+        address: str,
+        latitude: float,
+        longitude: float,
+        area: float,
+        bedrooms: int,
+        price: int,
+        canonical_id: str | None = None,
+    ) -> str:
+        """
+        Canonical property ID for a listing, indexing it for later lookups.
+
+        ``canonical_id`` registers a listing whose ID is already known (e.g.
+        loaded from the database) without matching it.
+        """
+        known = self._by_key.get((source, external_id))
+        if known is not None:
+            return self._canonical[known]
+
+        address = normalize_text(address)
+        title = normalize_text(title)
+        own, search = self._keys(latitude, longitude, area, bedrooms, price)
+
+        source_bit = self._source_bits.setdefault(source, 1 << len(self._source_bits))
+        if canonical_id is None:
+            best, best_score = None, self.threshold
+            address_trigrams = title_trigrams = address_numbers = None
+            title_weight = 1 - self.address_weight
+            seen = set()
+            for key in search:
+                for index in self._blocks.get(key, ()):
+                    if index in seen or self._property_sources[self._canonical[index]] & source_bit:
+                        continue
+                    seen.add(index)
+                    self.comparisons += 1
+                    if address_trigrams is None:
+                        # Most listings have no candidates; only pay for trigrams when needed
+                        address_trigrams = trigrams(address) if address else set()
+                        address_numbers = _numbers(address)
+                        title_trigrams = trigrams(title) if title else set()
+                    score = self.address_weight * _address_score(
+                        address_trigrams, address_numbers, self._address[index]
+                    )
+                    # Skip the title when even a perfect match cannot win
+                    if score + title_weight < best_score:
+                        continue
+                    if title_trigrams and self._title[index]:
+                        score += title_weight * _jaccard(title_trigrams, trigrams(self._title[index]))
+                    if score >= best_score:
+                        best, best_score = index, score
+            if best is not None:
+                canonical_id = self._canonical[best]
+            else:
+                digest = hashlib.sha1(f"{source}:{external_id}".encode()).hexdigest()
+                canonical_id = f"p{digest[:16]}"
+
+        index = len(self._canonical)
+        self._canonical.append(canonical_id)
+        self._property_sources[canonical_id] = self._property_sources.get(canonical_id, 0) | source_bit
+        self._address.append(address)
+        self._title.append(title)
+        self._blocks.setdefault(own, []).append(index)
+        self._by_key[(source, external_id)] = index
+        return canonical_id
@@ -1,3 +1,7 @@
+import os
+
+from propfair_scrapers.browser import ResourceBlocker
+
 BOT_NAME = "propfair_scrapers"
 
 SPIDER_MODULES = ["propfair_scrapers.spiders"]
@@ -5,9 +9,24 @@ NEWSPIDER_MODULE = "propfair_scrapers.spiders"
 
 ROBOTSTXT_OBEY = True
 CONCURRENT_REQUESTS = 8
+# Starting point only; AdaptiveThrottleMiddleware tunes both per domain
 DOWNLOAD_DELAY = 2
 RANDOMIZE_DOWNLOAD_DELAY = True
 
+# Adaptive per-domain throttling (politeness bounds and latency targets)
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.5
+ADAPTIVE_THROTTLE_MAX_DELAY = 60
+ADAPTIVE_THROTTLE_MIN_CONCURRENCY = 1
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = CONCURRENT_REQUESTS
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0
+ADAPTIVE_THROTTLE_TARGET_RENDER_TIME = 8.0
+ADAPTIVE_THROTTLE_SMOOTHING = 0.3
+ADAPTIVE_THROTTLE_BAN_STATUSES = [403, 429, 503]
+# Bot-challenge interstitials (Cloudflare, DataDome, PerimeterX); a plain
+# "captcha" would also match contact forms on normal listing pages
+ADAPTIVE_THROTTLE_BAN_MARKERS = ["cf-challenge", "captcha-delivery", "px-captcha"]
+
 COOKIES_ENABLED = False
 
 DEFAULT_REQUEST_HEADERS = {
@@ -23,9 +42,122 @@ DOWNLOAD_HANDLERS = {
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 
 ITEM_PIPELINES = {
+    "propfair_scrapers.geocoding.GeocodingPipeline": 50,
+    "propfair_scrapers.neighborhoods.NeighborhoodPipeline": 60,
     "propfair_scrapers.pipelines.ValidationPipeline": 100,
     "propfair_scrapers.pipelines.DeduplicationPipeline": 200,
+    "propfair_scrapers.pipelines.EntityResolutionPipeline": 250,
     "propfair_scrapers.pipelines.DatabasePipeline": 300,
 }
 
 LOG_LEVEL = "INFO"
+# Log one in every N per-item info lines (after the first 10)
+ITEM_LOG_EVERY = 100
+
+# Crawl metrics (propfair_scrapers.metrics): Prometheus textfile and/or HTTP
+# endpoint, plus a JSON summary at close
+EXTENSIONS = {
+    "propfair_scrapers.metrics.MetricsExporter": 500,
+}
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_JSON_PATH = os.getenv("METRICS_JSON_PATH")
+METRICS_EXPORT_INTERVAL = 30
+
+# ValidationPipeline: per-neighborhood robust ranges of price, area and price/m²,
+# persisted between runs when a path is set
+OUTLIER_SKETCH_PATH = os.getenv("OUTLIER_SKETCH_PATH")
+OUTLIER_ACTION = "drop"  # or "flag"
+OUTLIER_FENCE = 3.0
+OUTLIER_MIN_COUNT = 30
+
+# GeocodingPipeline: gazetteer of barrio/localidad centroids for pages without a map
+# (defaults to the bundled data/gazetteer_co.csv)
+GEOCODING_GAZETTEER = os.getenv("GEOCODING_GAZETTEER")
+GEOCODING_FUZZY_CUTOFF = 0.85
+
+# NeighborhoodPipeline: official barrio polygons (GeoJSON); the stage is off when unset
+NEIGHBORHOODS_GEOJSON = os.getenv("NEIGHBORHOODS_GEOJSON")
+NEIGHBORHOODS_NAME_PROPERTY = "name"
+NEIGHBORHOODS_LOCALIDAD_PROPERTY = "localidad"
+
+# DatabasePipeline deactivates listings of a crawled city not seen for this long
+LISTING_STALE_AFTER_DAYS = float(os.getenv("LISTING_STALE_AFTER_DAYS", "3"))
+# ...and merges what the run changed into neighborhood_stats at close
+# (python -m propfair_scrapers.market_stats --rebuild recomputes it from scratch)
+MARKET_STATS_ENABLED = True
+# ...and rebuilds the heatmap tiles (MBTiles-style SQLite) holding changed listings
+HEATMAP_TILES_PATH = os.getenv("HEATMAP_TILES_PATH")
+
+# Cap on pages per run (0 = no cap); checkpoints let the next run resume
+CLOSESPIDER_PAGECOUNT = int(os.getenv("CLOSESPIDER_PAGECOUNT", "0"))
+
+# Crawl partitions: one search per city x property type x price band.
+# Price bands are (min, max) pairs in COP; None leaves a side open.
+CRAWL_CITIES = ["bogota"]
+CRAWL_PROPERTY_TYPES = ["apartamentos"]
+CRAWL_PRICE_BANDS = []
+CRAWL_SEARCH_URL = "https://www.fincaraiz.com.co/arriendo/{property_type}/{city}"
+CRAWL_PRICE_PARAMS = ["precio-desde", "precio-hasta"]
+# Per-partition checkpoints (pagination cursor + pending listings)
+CRAWL_CHECKPOINT_DIR = os.getenv("CRAWL_CHECKPOINT_DIR")
+
+# Max listings fetched per recrawl run (scrapy crawl fincaraiz -a recrawl=FILE)
+RECRAWL_BUDGET = int(os.getenv("RECRAWL_BUDGET", "2000"))
+
+# Playwright: one shared browser context, with pages reused between requests
+PLAYWRIGHT_MAX_CONTEXTS = 1
+PLAYWRIGHT_MAX_PAGES_PER_CONTEXT = CONCURRENT_REQUESTS
+PLAYWRIGHT_PAGE_POOL_SIZE = CONCURRENT_REQUESTS // 2
+
+DOWNLOADER_MIDDLEWARES = {
+    "propfair_scrapers.archive.ArchiveReplayMiddleware": 50,
+    # Below HttpCompressionMiddleware (590) so ban markers match decoded bodies
+    "propfair_scrapers.throttle.AdaptiveThrottleMiddleware": 560,
+    "propfair_scrapers.archive.PageArchiveMiddleware": 900,
+    "propfair_scrapers.browser.PlaywrightPagePoolMiddleware": 950,
+}
+
+# Playwright: abort resources the spiders never read
+PLAYWRIGHT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+PLAYWRIGHT_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "tile.openstreetmap.org",
+    "maps.googleapis.com",
+    "maps.gstatic.com",
+    "api.mapbox.com",
+]
+# Set to a list of domains to also block every other host
+PLAYWRIGHT_FIRST_PARTY_DOMAINS = None
+PLAYWRIGHT_ABORT_REQUEST = ResourceBlocker(
+    resource_types=PLAYWRIGHT_BLOCKED_RESOURCE_TYPES,
+    blocked_domains=PLAYWRIGHT_BLOCKED_DOMAINS,
+    first_party_domains=PLAYWRIGHT_FIRST_PARTY_DOMAINS,
+)
+
+# Raw-page archive for offline re-extraction (python -m propfair_scrapers.reparse)
+PAGE_ARCHIVE_DIR = os.getenv("PAGE_ARCHIVE_DIR")
+PAGE_ARCHIVE_SEGMENT_BYTES = 64 * 1024 * 1024
+
+# Shared crawl frontier (redis://... or sqlite:///path) for multi-worker crawls
+FRONTIER_URL = os.getenv("FRONTIER_URL")
+FRONTIER_WORKER_INDEX = int(os.getenv("FRONTIER_WORKER_INDEX", "0"))
+FRONTIER_WORKERS = int(os.getenv("FRONTIER_WORKERS", "1"))
+FRONTIER_IDLE_TIMEOUT = 30
+FRONTIER_REPORT_INTERVAL = 30
+# Seconds a worker has to handle a request it took before it is queued again
+FRONTIER_LEASE_TIMEOUT = 300
+if FRONTIER_URL:
+    SCHEDULER = "propfair_scrapers.frontier.FrontierScheduler"
+
+SPIDER_MIDDLEWARES = {
+    "propfair_scrapers.frontier.FrontierPartitionMiddleware": 550,
+}
+# Below RetryMiddleware (550): acknowledges requests whose retries ran out
+DOWNLOADER_MIDDLEWARES["propfair_scrapers.frontier.FrontierFailureMiddleware"] = 540
@@ -0,0 +1,196 @@
+import json
+import math
+import os
+from pathlib import Path
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch-style) for positive values.
+
+    Values are counted in buckets whose bounds grow by a factor ``gamma``, so
+    any quantile is answered within ``relative_accuracy`` of the true value
+    using a few hundred counters at most, whatever the number of values.
+    Inserts are O(1).
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Count ``value``; a negative ``count`` takes back earlier adds."""
+        if value <= 0:
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        total = self.buckets.get(key, 0) + count
+        if total:
+            self.buckets[key] = total
+        else:
+            self.buckets.pop(key, None)
+        self.count += count
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Add the counts of a sketch with the same accuracy (e.g. another shard's)."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies")
+        for key, count in other.buckets.items():
+            total = self.buckets.get(key, 0) + count
+            if total:
+                self.buckets[key] = total
+            else:
+                self.buckets.pop(key, None)
+        self.count += other.count
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return None
+
+    def to_dict(self) -> dict:
+        return {"relative_accuracy": self.relative_accuracy, "buckets": self.buckets}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.buckets = {int(key): count for key, count in data["buckets"].items()}
+        sketch.count = sum(sketch.buckets.values())
+        return sketch
+
+
+class RobustRange:
+    """
+    Per-group (e.g. per neighborhood) sketches with a cached robust range.
+
+    The range is the interquartile fence on a log scale,
+    ``[Q1 / (Q3/Q1)^k, Q3 * (Q3/Q1)^k]``, which suits prices and areas that
+    are roughly log-normal. Ranges are recomputed every ``refresh_every``
+    inserts per group, so checking a value is a dict lookup and two
+    comparisons.
+    """
+
+    def __init__(
+        self,
+        fence: float = 3.0,
+        min_count: int = 30,
+        refresh_every: int = 50,
+        relative_accuracy: float = 0.02,
+    ):
+        self.fence = fence
+        self.min_count = min_count
+        self.refresh_every = refresh_every
+        self.relative_accuracy = relative_accuracy
+        self.sketches: dict[str, QuantileSketch] = {}
+        self._ranges: dict[str, tuple[float, float]] = {}
+        self._pending: dict[str, int] = {}
+
+    def add(self, group: str, value: float) -> None:
+        sketch = self.sketches.get(group)
+        if sketch is None:
+            sketch = self.sketches[group] = QuantileSketch(self.relative_accuracy)
+        sketch.add(value)
+        self._pending[group] = self._pending.get(group, 0) + 1
+        if self._pending[group] >= self.refresh_every or group not in self._ranges:
+            self._refresh(group)
+
+    def _refresh(self, group: str) -> None:
+        self._pending[group] = 0
+        sketch = self.sketches[group]
+        if sketch.count < self.min_count:
+            self._ranges.pop(group, None)
+            return
+        q1, q3 = sketch.quantile(0.25), sketch.quantile(0.75)
+        # Floor the IQR ratio so a group of identical values does not reject every change
+        spread = max(q3 / q1, 1.25) ** self.fence
+        self._ranges[group] = (q1 / spread, q3 * spread)
+
+    def range(self, group: str) -> tuple[float, float] | None:
+        """Robust (low, high) for ``group``, or None until it has ``min_count`` values."""
+        return self._ranges.get(group)
+
+    def check(self, groups: list[str], value: float) -> str | None:
+        """
+        "low"/"high" if ``value`` is outside the range of the first group in
+        ``groups`` that has one (most specific first), else None.
+        """
+        for group in groups:
+            bounds = self._ranges.get(group)
+            if bounds is not None:
+                if value < bounds[0]:
+                    return "low"
+                if value > bounds[1]:
+                    return "high"
+                return None
+        return None
+
+    def to_dict(self) -> dict:
+        return {group: sketch.to_dict() for group, sketch in self.sketches.items()}
+
+    def load_dict(self, data: dict) -> None:
+        for group, sketch in data.items():
+            self.sketches[group] = QuantileSketch.from_dict(sketch)
+            self._refresh(group)
+
+
+class OutlierSketches:
+    """Robust ranges for price, area and price per m², per neighborhood and per city."""
+
+    FIELDS = ("price", "area", "price_per_m2")
+
+    def __init__(self, **options):
+        self.ranges = {field: RobustRange(**options) for field in self.FIELDS}
+
+    @staticmethod
+    def groups(item) -> list[str]:
+        city = (item.get("city") or "").strip().lower()
+        neighborhood = (item.get("neighborhood") or "").strip().lower()
+        return [f"{city}/{neighborhood}", city]
+
+    @staticmethod
+    def values(item) -> dict[str, float]:
+        return {
+            "price": item["price"],
+            "area": item["area"],
+            "price_per_m2": item["price"] / item["area"],
+        }
+
+    def check(self, item) -> list[str]:
+        """Reasons like ``price_high`` for every field outside its robust range."""
+        groups = self.groups(item)
+        reasons = []
+        for field, value in self.values(item).items():
+            direction = self.ranges[field].check(groups, value)
+            if direction:
+                reasons.append(f"{field}_{direction}")
+        return reasons
+
+    def add(self, item) -> None:
+        for field, value in self.values(item).items():
+            for group in self.groups(item):
+                self.ranges[field].add(group, value)
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({field: r.to_dict() for field, r in self.ranges.items()}))
+        os.replace(tmp, path)
+
+    def load(self, path) -> bool:
+        path = Path(path)
+        if not path.exists():
+            return False
+        data = json.loads(path.read_text())
+        for field, groups in data.items():
+            if field in self.ranges:
+                self.ranges[field].load_dict(groups)
+        return True
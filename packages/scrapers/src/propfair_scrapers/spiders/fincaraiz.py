@@ -1,9 +1,18 @@
 import scrapy
 import re
 from typing import Optional
+from scrapy.spidermiddlewares.httperror import HttpError
+from propfair_scrapers.archive import PageArchive
+from propfair_scrapers.checkpoints import (
+    Checkpoint,
+    CheckpointStore,
+    CrawlPartition,
+    city_name,
+    generate_partitions,
+)
+from propfair_scrapers.extraction import PageIndex
 from propfair_scrapers.items import ListingItem
 
-
 class FincaRaizSpider(scrapy.Spider):
     """
     Spider for scraping rental apartment listings from FincaRaiz.
@@ -28,29 +37,157 @@ class FincaRaizSpider(scrapy.Spider):
             "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
             "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
         },
-        "CLOSESPIDER_PAGECOUNT": 3,  # Limit to 3 pages for testing
         "LOG_LEVEL": "INFO",
     }
 
+    @property
+    def covers_partitions(self) -> bool:
+        """Whether this run walks whole search partitions (so unseen listings are gone)."""
+        return not (getattr(self, "archive", None) or getattr(self, "recrawl", None))
+
+    async def start(self):
+        # Scrapy >= 2.13 entry point; older versions call start_requests directly
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
-        for url in self.start_urls:
-            yield scrapy.Request(
-                url,
-                meta={"playwright": True, "playwright_include_page": True},
-                callback=self.parse_listing_page,
+        archive = getattr(self, "archive", None)
+        if archive:
+            # Offline re-extraction: replay archived detail pages, no network
+            yield from PageArchive(archive).replay_requests(
+                self,
+                shard=int(getattr(self, "shard", 0)),
+                shards=int(getattr(self, "shards", 1)),
+            )
+            return
+
+        recrawl = getattr(self, "recrawl", None)
+        if recrawl:
+            # Volatility-aware revisit list (python -m propfair_scrapers.recrawl),
+            # most urgent first
+            with open(recrawl) as f:
+                urls = [line.strip() for line in f if line.strip()]
+            budget = self.settings.getint("RECRAWL_BUDGET") if hasattr(self, "settings") else 0
+            if budget:
+                urls = urls[:budget]
+            for rank, url in enumerate(urls):
+                request = self._detail_request(url)
+                request.priority = len(urls) - rank
+                yield request
+            return
+
+        partitions = self.crawl_partitions()
+        if not partitions:
+            for url in self.start_urls:
+                yield self._search_request(url)
+            return
+
+        # One search per city x property type x price band, resumed from its
+        # checkpoint when a previous run was interrupted
+        store = self.checkpoints
+        for partition in partitions:
+            checkpoint = store.load(partition.key) if store else None
+            if checkpoint is None:
+                yield self._search_request(self._partition_url(partition), partition.key)
+                continue
+            if checkpoint.done:
+                self.logger.info(f"Skipping finished partition {partition.key}")
+                continue
+            self.logger.info(
+                f"Resuming partition {partition.key}: {len(checkpoint.pending)} pending listings"
             )
+            if checkpoint.cursor:
+                yield self._search_request(checkpoint.cursor, partition.key)
+            elif checkpoint.pages == 0:
+                yield self._search_request(self._partition_url(partition), partition.key)
+            for url in checkpoint.pending:
+                yield self._detail_request(url, partition.key)
+
+    def crawl_partitions(self) -> list[CrawlPartition]:
+        """Partitions from CRAWL_* settings, filtered by the ``partitions`` spider argument."""
+        settings = getattr(self, "settings", None)
+        if settings is None or not settings.getlist("CRAWL_CITIES"):
+            return []
+        partitions = generate_partitions(
+            settings.getlist("CRAWL_CITIES"),
+            settings.getlist("CRAWL_PROPERTY_TYPES"),
+            settings.getlist("CRAWL_PRICE_BANDS"),
+        )
+        # e.g. -a partitions=bogota,medellin/apartamentos
+        prefixes = [p for p in getattr(self, "partitions", "").split(",") if p]
+        if prefixes:
+            partitions = [p for p in partitions if any(p.key.startswith(x) for x in prefixes)]
+        return partitions
+
+    def _partition_url(self, partition: CrawlPartition) -> str:
+        return partition.url(
+            self.settings.get("CRAWL_SEARCH_URL"), self.settings.getlist("CRAWL_PRICE_PARAMS")
+        )
+
+    @property
+    def checkpoints(self) -> CheckpointStore | None:
+        """Checkpoint store in CRAWL_CHECKPOINT_DIR, or None when checkpointing is off."""
+        if not hasattr(self, "_checkpoints"):
+            settings = getattr(self, "settings", None)
+            directory = settings.get("CRAWL_CHECKPOINT_DIR") if settings else None
+            self._checkpoints = CheckpointStore(directory) if directory else None
+        return self._checkpoints
+
+    def finished_partitions(self) -> list[CrawlPartition]:
+        """
+        Partitions whose search was walked to the last page, in this run or an
+        interrupted one it resumed. Without checkpoints that isn't tracked, and
+        every partition counts (ask only once the crawl has finished).
+        """
+        store = self.checkpoints
+        partitions = self.crawl_partitions()
+        if store is None:
+            return partitions
+        return [p for p in partitions if (store.load(p.key) or Checkpoint(p.key)).done]
+
+    def closed(self, reason):
+        store = self.checkpoints
+        if store is None:
+            return
+        store.flush()
+        if reason == "finished":
+            # A complete crawl starts over next time
+            store.clear([p.key for p in self.finished_partitions()])
+
+    def _search_request(self, url: str, partition: str | None = None) -> scrapy.Request:
+        return scrapy.Request(
+            url,
+            meta=self._request_meta(partition),
+            callback=self.parse_listing_page,
+        )
+
+    def _detail_request(self, url: str, partition: str | None = None) -> scrapy.Request:
+        return scrapy.Request(
+            url,
+            meta=self._request_meta(partition),
+            callback=self.parse_listing_detail,
+            errback=self.detail_failed,
+        )
+
+    def _request_meta(self, partition: str | None) -> dict:
+        meta = {"playwright": True, "playwright_include_page": True}
+        if partition:
+            meta["crawl_partition"] = partition
+            meta["frontier_partition"] = partition
+        return meta
 
     async def parse_listing_page(self, response):
         """Parse search results page to extract listing links."""
-        page = response.meta["playwright_page"]
+        page = response.meta.get("playwright_page")
 
-        # Wait for listings to load
-        try:
-            await page.wait_for_selector(".listingCard", timeout=5000)
-        except Exception as e:
-            self.logger.error(f"Timeout waiting for listings: {e}")
+        # Wait for listings to load (no page when replaying from the archive)
+        if page is not None:
+            try:
+                await page.wait_for_selector(".listingCard", timeout=5000)
+            except Exception as e:
+                self.logger.error(f"Timeout waiting for listings: {e}")
 
-        await page.close()
+            await self.release_page(page)
 
         # Extract listing links from cards
         # Links are within .listingCard elements, href contains "/apartamento-en-arriendo" or similar
@@ -61,35 +198,96 @@ class FincaRaizSpider(scrapy.Spider):
 
         self.logger.info(f"Found {len(listing_links)} listings on page")
 
-        for link in listing_links:
-            yield response.follow(
+        partition = response.meta.get("crawl_partition")
+        detail_requests = [
+            response.follow(
                 link,
-                meta={"playwright": True, "playwright_include_page": True},
+                meta=self._request_meta(partition),
                 callback=self.parse_listing_detail,
+                errback=self.detail_failed,
             )
+            for link in listing_links
+        ]
 
         # Pagination - look for next page link
         # Note: Pagination structure may need adjustment based on actual site
         next_page = response.css('a[rel="next"]::attr(href), button[aria-label="Next"]::attr(href)').get()
-        if next_page:
-            self.logger.info(f"Following pagination to: {next_page}")
-            yield response.follow(
-                next_page,
-                meta={"playwright": True, "playwright_include_page": True},
-                callback=self.parse_listing_page,
+        next_request = (
+            response.follow(next_page, meta=self._request_meta(partition), callback=self.parse_listing_page)
+            if next_page
+            else None
+        )
+
+        if partition and self.checkpoints:
+            self.checkpoints.page_crawled(
+                partition,
+                [request.url for request in detail_requests],
+                next_request.url if next_request else None,
             )
 
+        for request in detail_requests:
+            yield request
+
+        if next_request:
+            self.logger.info(f"Following pagination to: {next_page}")
+            yield next_request
+
     async def parse_listing_detail(self, response):
         """Parse individual listing detail page."""
-        page = response.meta["playwright_page"]
-
-        # Wait for key elements to load
-        try:
-            await page.wait_for_selector("h1", timeout=5000)
-        except Exception as e:
-            self.logger.error(f"Timeout waiting for listing details: {e}")
+        page = response.meta.get("playwright_page")
 
-        await page.close()
+        # Wait for key elements to load (no page when replaying from the archive)
+        if page is not None:
+            try:
+                await page.wait_for_selector("h1", timeout=5000)
+            except Exception as e:
+                self.logger.error(f"Timeout waiting for listing details: {e}")
+
+            await self.release_page(page)
+
+        item = self.extract_listing(response)
+
+        partition = response.meta.get("crawl_partition")
+        if partition and self.checkpoints:
+            url = response.request.url if response.request else response.url
+            self.checkpoints.detail_crawled(partition, url)
+
+        if item is not None:
+            yield item
+
+    async def detail_failed(self, failure):
+        """A detail page that failed for good, e.g. a 404 once the listing is delisted."""
+        if failure.check(HttpError):
+            request = failure.value.response.request
+            self.logger.info(f"Listing gone ({failure.value.response.status}): {request.url}")
+        else:
+            request = failure.request
+            self.logger.warning(f"Listing failed: {request.url}: {failure.getErrorMessage()}")
+
+        page = request.meta.get("playwright_page")
+        if page is not None:
+            await self.release_page(page)
+
+        # Not pending anymore, or its partition could never finish
+        partition = request.meta.get("crawl_partition")
+        if partition and self.checkpoints:
+            self.checkpoints.detail_crawled(partition, request.url)
+
+    async def release_page(self, page):
+        """Return a Playwright page to the page pool, or close it if pooling is off."""
+        pool = getattr(self, "page_pool", None)
+        if pool is None:
+            await page.close()
+        else:
+            await pool.release(page)
+
+    def extract_listing(self, response) -> ListingItem | None:
+        """Extract a listing from a rendered detail page.
+
+        The page is indexed once and every field is looked up in the index.
+        Returns None when required fields are missing.
+        """
+        index = PageIndex(response)
 
         # Extract external ID from URL
         # URL format: /apartamento-en-arriendo-en-chico-navarra-bogota/193248980
@@ -97,37 +295,44 @@ class FincaRaizSpider(scrapy.Spider):
 
         # Extract external ID from page content as backup
         # Text like "Código Fincaraíz: 193248980"
-        codigo_text = response.css('*:contains("Código Fincaraíz:")::text').re(r'Código Fincaraíz:\s*(\d+)')
-        if codigo_text:
-            external_id = codigo_text[0]
+        codigo = index.re_first(r'Código Fincaraíz:\s*(\d+)')
+        if codigo:
+            external_id = codigo
 
         # Price extraction
         # Format: "$ 6.500.000"
-        price_text = response.css('p:contains("Precio de Arriendo")::text, p:contains("$")::text').re(r'\$\s*[\d.]+')[0] if response.css('p:contains("$")::text') else None
+        price_text = index.re_first(r'\$\s*[\d.]+', index.own_texts(index.with_tag("p")))
         price = self._parse_price(price_text) if price_text else None
 
         # Admin fee extraction
         # Format: "+ $ 1.300.000 administración"
-        admin_fee_text = response.css('*:contains("administración")::text').re(r'\$\s*[\d.]+')
-        admin_fee = self._parse_price(admin_fee_text[0]) if admin_fee_text else None
+        admin_fee_text = index.re_first(
+            r'\$\s*[\d.]+', index.own_texts(index.containing("administración"))
+        )
+        admin_fee = self._parse_price(admin_fee_text) if admin_fee_text else None
 
         # Title
         # h1 element with format like "Apartamento en Arriendo en Chicó Navarra, Bogotá"
-        title = response.css('h1::text').get()
+        titles = index.own_texts(index.with_tag("h1"))
+        title = titles[0] if titles else None
 
         # Description
         # Multiple text nodes in description section
-        description_parts = response.css('h4:contains("Descripción") ~ * ::text').getall()
+        description_parts = index.all_texts(
+            index.following_siblings(index.containing("Descripción", tag="h4"))
+        )
         description = " ".join([p.strip() for p in description_parts if p.strip()])[:1000]  # Limit to 1000 chars
 
         # Property features - extract from text like "3 Habs.", "3 Baños", "169 m²"
-        bedrooms = self._extract_number_from_text(response, r'(\d+)\s*Habs?\.?')
-        bathrooms = self._extract_number_from_text(response, r'(\d+)\s*Baños?\.?')
-        parking = self._extract_number_from_details(response, "Parqueaderos")
-        area = self._extract_float_from_text(response, r'(\d+(?:[.,]\d+)?)\s*m²')
+        bedrooms = self._extract_number_from_text(index, r'(\d+)\s*Habs?\.?')
+        bathrooms = self._extract_number_from_text(index, r'(\d+)\s*Baños?\.?')
+        parking = self._extract_number_from_details(index, "Parqueaderos")
+        area = self._extract_float_from_text(index, r'(\d+(?:[.,]\d+)?)\s*m²')
 
         # Location - extract from paragraphs in location section
-        location_texts = response.css('h4:contains("Ubicación") ~ p::text').getall()
+        location_texts = index.own_texts(
+            index.following_siblings(index.containing("Ubicación", tag="h4"), tag="p")
+        )
         neighborhood = location_texts[0].strip() if len(location_texts) > 0 else ""
         # Extract just the neighborhood name (before comma)
         if "," in neighborhood:
@@ -135,46 +340,51 @@ class FincaRaizSpider(scrapy.Spider):
 
         address = neighborhood  # Use neighborhood as address for now
 
-        # Coordinates - look for map element or coordinates in script tags
-        # Try to find latitude/longitude in various formats
-        lat = None
-        lng = None
+        # City: after the neighborhood in the location ("Chicó Navarra, Bogotá,
+        # Bogotá D.C.") or the title, else the city of the search partition
+        city = self._extract_city(location_texts[0] if location_texts else None, title)
+        if city is None:
+            city = self._partition_city(response)
 
-        # Look in data attributes
-        map_elem = response.css('[data-lat], [data-lng]')
-        if map_elem:
-            lat = map_elem.css('::attr(data-lat)').get()
-            lng = map_elem.css('::attr(data-lng)').get()
+        # Coordinates - look for map element data attributes
+        lat = index.first_attr("data-lat")
+        lng = index.first_attr("data-lng")
 
-        # Convert to float or use Bogotá center as default
-        latitude = float(lat) if lat else 4.6097
-        longitude = float(lng) if lng else -74.0817
+        # Pages without a map are geocoded from the neighborhood by GeocodingPipeline
+        latitude = float(lat) if lat else None
+        longitude = float(lng) if lng else None
 
         # Additional property details from details section
-        estrato = self._extract_number_from_details(response, "Estrato")
-        floor = self._extract_number_from_details(response, "Piso N")
+        estrato = self._extract_number_from_details(index, "Estrato")
+        floor = self._extract_number_from_details(index, "Piso N")
 
         # Try to extract building age
-        antiguedad_text = self._extract_detail_value(response, "Antigüedad")
+        antiguedad_text = self._extract_detail_value(index, "Antigüedad")
         building_age = self._parse_building_age(antiguedad_text)
 
         # Images - extract from gallery
         # Images are in elements like img within .emblaGalleryCarousel or similar
-        images = response.css('.emblaGalleryCarousel img::attr(src), .gallery-image img::attr(src)').getall()
+        images = index.attrs(
+            index.within_class("img", ["emblaGalleryCarousel", "gallery-image"]), "src"
+        )
         # Filter out very small images (icons, etc.) and take unique URLs
         images = list(dict.fromkeys([img for img in images if 'cdn' in img and 'logo' not in img.lower()]))[:20]
 
         # Amenities - extract from comodidades section
-        amenities = response.css('h4:contains("Comodidades") ~ * *:contains("•")::text').getall()
+        sections = index.following_siblings(index.containing("Comodidades", tag="h4"))
+        bullets = index.containing("•")
+        amenities = index.own_texts(
+            element for element in index.descendants(sections) if element in bullets
+        )
         amenities = [a.replace("•", "").strip() for a in amenities if a.strip() and len(a.strip()) > 2]
 
         # Validate required fields
         if not all([external_id, price, bedrooms is not None, bathrooms is not None, area, neighborhood]):
             self.logger.warning(f"Skipping listing {response.url}: missing required fields")
             self.logger.warning(f"  external_id={external_id}, price={price}, bedrooms={bedrooms}, bathrooms={bathrooms}, area={area}, neighborhood={neighborhood}")
-            return
+            return None
 
-        yield ListingItem(
+        return ListingItem(
             external_id=str(external_id),
             source="fincaraiz",
             url=response.url,
@@ -191,13 +401,31 @@ class FincaRaizSpider(scrapy.Spider):
             building_age=building_age,
             address=address,
             neighborhood=neighborhood,
-            city="Bogotá",
+            city=city,
             latitude=latitude,
             longitude=longitude,
             images=images,
             amenities=amenities,
         )
 
+    def _extract_city(self, *texts: str | None) -> str | None:
+        for text in texts:
+            parts = [part.strip() for part in (text or "").split(",")]
+            if len(parts) > 1 and parts[1]:
+                return parts[1]
+        return None
+
+    def _partition_city(self, response) -> str:
+        try:
+            partition = response.meta.get("crawl_partition")
+        except AttributeError:
+            # Response not tied to a request (offline extraction)
+            partition = None
+        if not partition:
+            # The default search (start_urls) is Bogotá's
+            return "Bogotá"
+        return city_name(partition.split("/")[0])
+
     def _parse_price(self, text: str) -> Optional[int]:
         """Parse Colombian peso price format."""
         if not text:
@@ -210,44 +438,45 @@ class FincaRaizSpider(scrapy.Spider):
             self.logger.warning(f"Could not parse price: {text}")
             return None
 
-    def _extract_number_from_text(self, response, pattern: str) -> Optional[int]:
+    def _extract_number_from_text(self, index: PageIndex, pattern: str) -> int | None:
         """Extract number using regex pattern from page text."""
-        matches = response.css('*::text').re(pattern)
-        if matches:
+        match = index.re_first(pattern)
+        if match:
             try:
-                return int(matches[0])
+                return int(match)
             except ValueError:
                 pass
         return None
 
-    def _extract_float_from_text(self, response, pattern: str) -> Optional[float]:
+    def _extract_float_from_text(self, index: PageIndex, pattern: str) -> float | None:
         """Extract float using regex pattern from page text."""
-        matches = response.css('*::text').re(pattern)
-        if matches:
+        match = index.re_first(pattern)
+        if match:
             try:
                 # Handle both comma and period as decimal separator
-                value = matches[0].replace(",", ".")
+                value = match.replace(",", ".")
                 return float(value)
             except ValueError:
                 pass
         return None
 
-    def _extract_number_from_details(self, response, label: str) -> Optional[int]:
+    def _extract_number_from_details(self, index: PageIndex, label: str) -> int | None:
         """Extract number from property details section."""
         # Details are in format: bullet • Label / Value
-        # Look for the label, then get the next strong element
-        detail_text = response.css(f'*:contains("{label}") ~ *::text, *:contains("{label}") + *::text').re(r'(\d+)')
+        # Look for the label, then take the first number in the elements after it
+        siblings = index.following_siblings(index.containing(label))
+        detail_text = index.re_first(r'(\d+)', index.own_texts(siblings))
         if detail_text:
             try:
-                return int(detail_text[0])
+                return int(detail_text)
             except ValueError:
                 pass
         return None
 
-    def _extract_detail_value(self, response, label: str) -> Optional[str]:
+    def _extract_detail_value(self, index: PageIndex, label: str) -> str | None:
         """Extract text value from property details section."""
-        # Get text following the label
-        values = response.css(f'*:contains("{label}") ~ strong::text, *:contains("{label}") + strong::text').getall()
+        # Get text of the strong element following the label
+        values = index.own_texts(index.following_siblings(index.containing(label), tag="strong"))
         if values:
             return values[0].strip()
         return None
@@ -0,0 +1,206 @@
+from collections.abc import Iterable
+
+from scrapy.exceptions import NotConfigured
+
+
+class DomainThrottle:
+    """
+    Delay and concurrency for one download slot, adapted to how the site behaves.
+
+    Latency, Playwright render time and the ban/error rate are tracked as
+    exponential moving averages. A ban signal (429/403/503, bot-challenge page,
+    connection error) halves concurrency and doubles the delay at once; a
+    slot that keeps answering under the latency targets earns one extra
+    concurrent request and a shorter delay per healthy round. Both values
+    always stay within the configured politeness bounds.
+    """
+
+    def __init__(
+        self,
+        delay: float,
+        concurrency: int,
+        min_delay: float = 0.5,
+        max_delay: float = 30.0,
+        min_concurrency: int = 1,
+        max_concurrency: int = 8,
+        target_latency: float = 2.0,
+        target_render_time: float = 8.0,
+        smoothing: float = 0.3,
+    ):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.target_render_time = target_render_time
+        self.smoothing = smoothing
+        self.delay = min(max(delay, min_delay), max_delay)
+        self.concurrency = min(max(concurrency, min_concurrency), max_concurrency)
+        self.latency: float | None = None
+        self.render_time: float | None = None
+        self.error_rate = 0.0
+        self._healthy_streak = 0
+
+    def _average(self, current: float | None, value: float) -> float:
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+    @property
+    def pressure(self) -> float:
+        """Worst ratio of a moving average to its target (>1 means the site is slowing down)."""
+        ratios = [0.0]
+        if self.latency is not None:
+            ratios.append(self.latency / self.target_latency)
+        if self.render_time is not None:
+            ratios.append(self.render_time / self.target_render_time)
+        return max(ratios)
+
+    def observe(
+        self,
+        latency: float | None = None,
+        rendered: bool = False,
+        banned: bool = False,
+        retry_after: float | None = None,
+    ) -> str | None:
+        """
+        Feed one download outcome and adapt delay/concurrency.
+
+        Returns the decision taken: "backoff", "slowdown", "speedup" or None.
+        """
+        self.error_rate = self._average(self.error_rate, 1.0 if banned else 0.0)
+        if latency is not None:
+            if rendered:
+                self.render_time = self._average(self.render_time, latency)
+            else:
+                self.latency = self._average(self.latency, latency)
+
+        if banned:
+            self._healthy_streak = 0
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            delay = max(self.delay * 2, self.min_delay, retry_after or 0.0)
+            self.delay = min(delay, self.max_delay)
+            return "backoff"
+
+        pressure = self.pressure
+        if pressure > 1.2:
+            self._healthy_streak = 0
+            if self.concurrency > self.min_concurrency or self.delay < self.max_delay:
+                self.concurrency = max(self.min_concurrency, self.concurrency - 1)
+                self.delay = min(max(self.delay * 1.5, self.min_delay), self.max_delay)
+                return "slowdown"
+            return None
+
+        if pressure < 0.8 and self.error_rate < 0.05:
+            self._healthy_streak += 1
+            # One step per round of `concurrency` healthy responses
+            if self._healthy_streak >= self.concurrency:
+                self._healthy_streak = 0
+                if self.concurrency < self.max_concurrency or self.delay > self.min_delay:
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    self.delay = max(self.min_delay, self.delay * 0.75)
+                    return "speedup"
+        return None
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Downloader middleware that applies ``DomainThrottle`` decisions to
+    Scrapy's per-domain download slots.
+
+    Decisions and the current delay/concurrency of every slot are exposed as
+    ``throttle/<slot>/...`` crawl stats.
+    """
+
+    def __init__(
+        self,
+        crawler,
+        ban_statuses: Iterable[int] = (403, 429, 503),
+        ban_markers: Iterable[str] = (),
+    ):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.ban_statuses = frozenset(int(status) for status in ban_statuses)
+        self.ban_markers = tuple(marker.lower().encode() for marker in ban_markers)
+        self.throttles = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured("ADAPTIVE_THROTTLE_ENABLED is off")
+        return cls(
+            crawler,
+            ban_statuses=crawler.settings.getlist("ADAPTIVE_THROTTLE_BAN_STATUSES", [403, 429, 503]),
+            ban_markers=crawler.settings.getlist("ADAPTIVE_THROTTLE_BAN_MARKERS"),
+        )
+
+    def _throttle(self, key: str, slot) -> DomainThrottle:
+        throttle = self.throttles.get(key)
+        if throttle is None:
+            settings = self.crawler.settings
+            max_concurrency = settings.getint("ADAPTIVE_THROTTLE_MAX_CONCURRENCY") or slot.concurrency
+            throttle = self.throttles[key] = DomainThrottle(
+                delay=slot.delay,
+                concurrency=slot.concurrency,
+                min_delay=settings.getfloat("ADAPTIVE_THROTTLE_MIN_DELAY", 0.5),
+                max_delay=settings.getfloat("ADAPTIVE_THROTTLE_MAX_DELAY", 30.0),
+                min_concurrency=max(1, settings.getint("ADAPTIVE_THROTTLE_MIN_CONCURRENCY", 1)),
+                max_concurrency=max_concurrency,
+                target_latency=settings.getfloat("ADAPTIVE_THROTTLE_TARGET_LATENCY", 2.0),
+                target_render_time=settings.getfloat("ADAPTIVE_THROTTLE_TARGET_RENDER_TIME", 8.0),
+                smoothing=settings.getfloat("ADAPTIVE_THROTTLE_SMOOTHING", 0.3),
+            )
+        return throttle
+
+    def _slot(self, request):
+        key = request.meta.get("download_slot")
+        if key is None or self.crawler.engine is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def is_banned(self, response) -> bool:
+        if response.status in self.ban_statuses:
+            return True
+        body = response.body.lower()
+        return any(marker in body for marker in self.ban_markers)
+
+    def _observe(self, request, banned: bool, retry_after: float | None = None) -> None:
+        key, slot = self._slot(request)
+        if slot is None or request.meta.get("archive_record") is not None:
+            return
+        throttle = self._throttle(key, slot)
+        decision = throttle.observe(
+            latency=request.meta.get("download_latency"),
+            rendered=bool(request.meta.get("playwright")),
+            banned=banned,
+            retry_after=retry_after,
+        )
+        slot.delay = throttle.delay
+        slot.concurrency = throttle.concurrency
+
+        prefix = f"throttle/{key}"
+        if banned:
+            self.stats.inc_value("throttle/ban_signals")
+        if decision:
+            self.stats.inc_value(f"{prefix}/{decision}")
+        self.stats.set_value(f"{prefix}/delay", round(throttle.delay, 3))
+        self.stats.set_value(f"{prefix}/concurrency", throttle.concurrency)
+        self.stats.max_value(f"{prefix}/max_delay", round(throttle.delay, 3))
+        if throttle.latency is not None:
+            self.stats.set_value(f"{prefix}/latency_avg", round(throttle.latency, 3))
+        if throttle.render_time is not None:
+            self.stats.set_value(f"{prefix}/render_time_avg", round(throttle.render_time, 3))
+
+    def process_response(self, request, response, spider):
+        banned = self.is_banned(response)
+        retry_after = None
+        if banned:
+            header = response.headers.get("Retry-After")
+            if header and header.strip().isdigit():
+                retry_after = float(header)
+        self._observe(request, banned, retry_after)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        # Timeouts and dropped connections are treated as ban signals
+        self._observe(request, banned=True)
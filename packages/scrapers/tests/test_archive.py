@@ -0,0 +1,98 @@
+import asyncio
+from datetime import UTC, datetime
+from unittest.mock import Mock
+
+from scrapy import Request
+
+from propfair_scrapers.archive import ArchiveReplayMiddleware, PageArchive, PageArchiveMiddleware
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+
+DETAIL_HTML = """
+<html><body>
+  <h1>Apartamento en Arriendo en Usaquén, Bogotá</h1>
+  <p>$ 2.000.000</p>
+  <div><span>2 Habs.</span><span>1 Baño</span><span>60 m²</span></div>
+  <section><h4>Ubicación</h4><p>Usaquén, Bogotá</p></section>
+</body></html>
+"""
+
+
+def test_archive_round_trip(tmp_path):
+    archive = PageArchive(tmp_path)
+    fetched_at = datetime(2026, 1, 9, tzinfo=UTC)
+    archive.append("https://example.com/1", "<html>1</html>", "parse_listing_detail", fetched_at=fetched_at)
+    archive.append("https://example.com/2", "<html>ñ</html>", "parse_listing_page")
+    archive.close()
+
+    records = list(PageArchive(tmp_path).records())
+
+    assert [r["url"] for r in records] == ["https://example.com/1", "https://example.com/2"]
+    assert records[0]["fetched_at"] == fetched_at.isoformat()
+    assert records[1]["body"] == "<html>ñ</html>"
+
+
+def test_archive_rolls_segments(tmp_path):
+    archive = PageArchive(tmp_path, segment_bytes=1)
+    for i in range(3):
+        archive.append(f"https://example.com/{i}", "<html></html>", "parse_listing_detail")
+    archive.close()
+
+    assert len(archive.segments()) == 3
+    assert len(list(archive.records())) == 3
+
+
+def test_archive_tolerates_truncated_tail(tmp_path):
+    archive = PageArchive(tmp_path)
+    archive.append("https://example.com/1", "<html></html>", "parse_listing_detail")
+    archive.append("https://example.com/2", "<html></html>", "parse_listing_detail")
+    archive.close()
+    segment = archive.segments()[0]
+    segment.write_bytes(segment.read_bytes()[:-10])
+
+    assert [r["url"] for r in archive.records()] == ["https://example.com/1"]
+
+
+def test_replay_requests_filter_callbacks_and_shard_by_url(tmp_path):
+    archive = PageArchive(tmp_path)
+    for i in range(20):
+        archive.append(f"https://example.com/{i}", "<html></html>", "parse_listing_detail")
+    archive.append("https://example.com/search", "<html></html>", "parse_listing_page")
+    archive.close()
+    spider = FincaRaizSpider()
+
+    shards = [list(archive.replay_requests(spider, shard=i, shards=2)) for i in range(2)]
+
+    urls = [request.url for shard in shards for request in shard]
+    assert sorted(urls) == sorted(f"https://example.com/{i}" for i in range(20))
+    assert all(shard for shard in shards)
+    assert shards[0][0].callback == spider.parse_listing_detail
+
+
+def test_replayed_detail_page_is_parsed_without_browser(tmp_path):
+    archive = PageArchive(tmp_path)
+    archive.append("https://www.fincaraiz.com.co/apartamento-en-arriendo-en-usaquen-bogota/42", DETAIL_HTML, "parse_listing_detail")
+    archive.close()
+    spider = FincaRaizSpider()
+    request = next(archive.replay_requests(spider))
+
+    response = ArchiveReplayMiddleware().process_request(request, spider)
+
+    async def collect():
+        return [item async for item in request.callback(response)]
+
+    items = asyncio.run(collect())
+    assert len(items) == 1
+    assert items[0]["external_id"] == "42"
+    assert items[0]["price"] == 2000000
+
+
+def test_archive_middleware_skips_replayed_responses(tmp_path):
+    middleware = PageArchiveMiddleware(PageArchive(tmp_path), stats=Mock())
+    spider = FincaRaizSpider()
+    record = {"url": "https://example.com/1", "status": 200, "body": "<html></html>"}
+    request = Request(record["url"], meta={"archive_record": record})
+    response = ArchiveReplayMiddleware().process_request(request, spider)
+
+    middleware.process_response(request, response, spider)
+
+    assert middleware.archive.segments() == []
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import Mock
+
+from scrapy import Request
+
+from propfair_scrapers.browser import PagePool, PlaywrightPagePoolMiddleware, ResourceBlocker
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+def test_resource_blocker_blocks_types_and_domains():
+    blocker = ResourceBlocker(
+        resource_types=["image", "font"],
+        blocked_domains=["google-analytics.com"],
+    )
+    assert blocker.should_block("image", "https://cdn.fincaraiz.com.co/a.jpg")
+    assert blocker.should_block("script", "https://www.google-analytics.com/analytics.js")
+    assert not blocker.should_block("script", "https://www.fincaraiz.com.co/app.js")
+    assert not blocker.should_block("document", "https://www.fincaraiz.com.co/arriendo")
+
+
+def test_resource_blocker_first_party_only():
+    blocker = ResourceBlocker(first_party_domains=["fincaraiz.com.co"])
+    assert not blocker.should_block("xhr", "https://api.fincaraiz.com.co/listings")
+    assert blocker.should_block("script", "https://cdn.example.com/widget.js")
+
+
+def test_resource_blocker_is_abort_request_predicate():
+    blocker = ResourceBlocker(resource_types=["media"])
+    request = Mock(resource_type="media", url="https://www.fincaraiz.com.co/v.mp4")
+    assert blocker(request) is True
+
+
+def test_page_pool_reuses_and_bounds_pages():
+    pool = PagePool(size=1)
+    first, second = FakePage(), FakePage()
+
+    asyncio.run(pool.release(first))
+    asyncio.run(pool.release(second))
+
+    assert second.closed
+    assert pool.acquire() is first
+    assert pool.acquire() is None
+
+
+def test_page_pool_skips_closed_pages():
+    pool = PagePool(size=2)
+    page = FakePage()
+    asyncio.run(pool.release(page))
+    page.closed = True
+    assert pool.acquire() is None
+
+
+def test_middleware_hands_pooled_page_to_playwright_request():
+    middleware = PlaywrightPagePoolMiddleware(size=2, stats=Mock())
+    page = FakePage()
+    asyncio.run(middleware.pool.release(page))
+
+    plain = Request("https://www.fincaraiz.com.co/a")
+    rendered = Request(
+        "https://www.fincaraiz.com.co/b",
+        meta={"playwright": True, "playwright_include_page": True},
+    )
+    middleware.process_request(plain, None)
+    middleware.process_request(rendered, None)
+
+    assert "playwright_page" not in plain.meta
+    assert rendered.meta["playwright_page"] is page
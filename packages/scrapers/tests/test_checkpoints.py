@@ -0,0 +1,132 @@
+import asyncio
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+
+from propfair_scrapers.checkpoints import CheckpointStore, CrawlPartition, generate_partitions
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+
+TEMPLATE = "https://www.fincaraiz.com.co/arriendo/{property_type}/{city}"
+CRAWL_SETTINGS = {
+    "CRAWL_PROPERTY_TYPES": ["apartamentos"],
+    "CRAWL_SEARCH_URL": TEMPLATE,
+    "CRAWL_PRICE_PARAMS": ["precio-desde", "precio-hasta"],
+}
+
+
+def test_generate_partitions_is_cartesian_product():
+    partitions = generate_partitions(
+        ["bogota", "medellin"], ["apartamentos", "casas"], [(None, 1500000), (1500000, None)]
+    )
+
+    assert len(partitions) == 8
+    assert partitions[0] == CrawlPartition("bogota", "apartamentos", None, 1500000)
+
+
+def test_partition_key_and_url():
+    plain = CrawlPartition("bogota", "apartamentos")
+    banded = CrawlPartition("bogota", "apartamentos", 1500000, 3000000)
+
+    assert plain.key == "bogota/apartamentos"
+    assert plain.url(TEMPLATE) == "https://www.fincaraiz.com.co/arriendo/apartamentos/bogota"
+    assert banded.key == "bogota/apartamentos/1500000-3000000"
+    assert banded.url(TEMPLATE).endswith("?precio-desde=1500000&precio-hasta=3000000")
+    assert plain.city_name == "Bogotá"
+    assert CrawlPartition("santa-marta", "casas").city_name == "Santa Marta"
+
+
+def test_checkpoint_store_resumes_pending_work(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.page_crawled("bogota/apartamentos", ["https://x/1", "https://x/2"], "https://x/search?page=2")
+    store.detail_crawled("bogota/apartamentos", "https://x/1")
+    store.flush()
+
+    checkpoint = CheckpointStore(tmp_path).load("bogota/apartamentos")
+
+    assert checkpoint.cursor == "https://x/search?page=2"
+    assert checkpoint.pending == ["https://x/2"]
+    assert not checkpoint.done
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_checkpoint_done_when_last_page_and_details_crawled(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.page_crawled("bogota/apartamentos", ["https://x/1"], None)
+    store.detail_crawled("bogota/apartamentos", "https://x/1")
+
+    assert store.load("bogota/apartamentos").done
+
+
+def test_spider_start_requests_per_partition():
+    crawler = get_crawler(
+        FincaRaizSpider,
+        {**CRAWL_SETTINGS, "CRAWL_CITIES": ["bogota", "medellin"]},
+    )
+    spider = FincaRaizSpider.from_crawler(crawler, partitions="medellin")
+
+    requests = list(spider.start_requests())
+
+    assert [r.url for r in requests] == ["https://www.fincaraiz.com.co/arriendo/apartamentos/medellin"]
+    assert requests[0].meta["crawl_partition"] == "medellin/apartamentos"
+
+
+def test_spider_resumes_from_checkpoint(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.page_crawled("bogota/apartamentos", ["https://x/2"], "https://x/search?page=3")
+    store.flush()
+    crawler = get_crawler(
+        FincaRaizSpider,
+        {**CRAWL_SETTINGS, "CRAWL_CITIES": ["bogota"], "CRAWL_CHECKPOINT_DIR": str(tmp_path)},
+    )
+    spider = FincaRaizSpider.from_crawler(crawler)
+
+    requests = list(spider.start_requests())
+
+    assert [r.url for r in requests] == ["https://x/search?page=3", "https://x/2"]
+    assert requests[1].callback == spider.parse_listing_detail
+    assert requests[1].errback == spider.detail_failed
+
+
+def test_failed_detail_pages_finish_partition(tmp_path):
+    crawler = get_crawler(
+        FincaRaizSpider,
+        {**CRAWL_SETTINGS, "CRAWL_CITIES": ["bogota"], "CRAWL_CHECKPOINT_DIR": str(tmp_path)},
+    )
+    spider = FincaRaizSpider.from_crawler(crawler)
+    spider.checkpoints.page_crawled("bogota/apartamentos", ["https://x/1", "https://x/2"], None)
+    meta = {"crawl_partition": "bogota/apartamentos"}
+
+    # A delisted listing answers 404; another one times out after its retries
+    gone = Request("https://x/1", meta=meta)
+    asyncio.run(
+        spider.detail_failed(Failure(HttpError(HtmlResponse(gone.url, status=404, request=gone))))
+    )
+    failure = Failure(TimeoutError("timed out"))
+    failure.request = Request("https://x/2", meta=meta)
+    asyncio.run(spider.detail_failed(failure))
+
+    assert [p.key for p in spider.finished_partitions()] == ["bogota/apartamentos"]
+
+
+def test_spider_finished_partitions(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.page_crawled("medellin/apartamentos", [], None)
+    store.page_crawled("bogota/apartamentos", [], "https://x/search?page=2")
+    store.flush()
+    crawler = get_crawler(
+        FincaRaizSpider,
+        {
+            **CRAWL_SETTINGS,
+            "CRAWL_CITIES": ["bogota", "medellin"],
+            "CRAWL_CHECKPOINT_DIR": str(tmp_path),
+        },
+    )
+    spider = FincaRaizSpider.from_crawler(crawler)
+
+    assert [p.key for p in spider.finished_partitions()] == ["medellin/apartamentos"]
+    spider.closed("finished")
+    assert CheckpointStore(tmp_path).load("medellin/apartamentos") is None
+    assert CheckpointStore(tmp_path).load("bogota/apartamentos") is not None
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+# Add API models to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
+
+from propfair_api.models import Base
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'propfair.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+def run_cli(module, *args, database_url, cwd):
+    # Only the scrapers on the path, as with python -m from packages/scrapers
+    env = {**os.environ, "PYTHONPATH": str(SRC), "DATABASE_URL": database_url}
+    return subprocess.run(
+        [sys.executable, "-m", f"propfair_scrapers.{module}", *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+
+
+@pytest.mark.parametrize(
+    "module, args",
+    [
+        ("recrawl", ["--output", "recrawl.txt"]),
+        ("geocoding", ["--backfill"]),
+        ("neighborhoods", ["--geojson", "barrios.geojson"]),
+        ("market_stats", ["--rebuild"]),
+        ("heatmap", ["--tiles", "heatmap.mbtiles"]),
+    ],
+)
+def test_cli_runs_against_empty_database(module, args, database_url, tmp_path):
+    square = [[-74.1, 4.6], [-74.0, 4.6], [-74.0, 4.7], [-74.1, 4.7], [-74.1, 4.6]]
+    feature = {
+        "type": "Feature",
+        "properties": {"name": "Rosales", "localidad": "Chapinero"},
+        "geometry": {"type": "Polygon", "coordinates": [square]},
+    }
+    (tmp_path / "barrios.geojson").write_text(
+        json.dumps({"type": "FeatureCollection", "features": [feature]})
+    )
+    result = run_cli(module, *args, database_url=database_url, cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
@@ -1,14 +1,19 @@
-import pytest
 import os
 import sys
-from datetime import datetime, timezone
-from unittest.mock import Mock, MagicMock
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, Mock
+
+import pytest
 
 # Add API models to path before importing pipelines
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../api/src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
 
-from propfair_scrapers.pipelines import DatabasePipeline
+from propfair_api.models import Base, Listing
+from sqlalchemy import create_engine, select
+
+from propfair_scrapers.checkpoints import CrawlPartition
 from propfair_scrapers.items import ListingItem
+from propfair_scrapers.pipelines import DatabasePipeline
 
 
 @pytest.fixture
@@ -65,3 +70,130 @@ def test_generate_cuid():
     assert cuid2.startswith("c")
     assert cuid1 != cuid2
     assert len(cuid1) > 10
+
+
+def make_listing(external_id, city, last_seen_at, is_active=True, price=2000000):
+    return Listing(
+        id=f"id_{external_id}",
+        external_id=external_id,
+        source="fincaraiz",
+        url=f"https://example.com/{external_id}",
+        title="Test Apartment",
+        price=price,
+        bedrooms=2,
+        bathrooms=1,
+        parking_spaces=1,
+        area=60.0,
+        address="Calle 100",
+        neighborhood="Usaquén",
+        city=city,
+        latitude=4.6871,
+        longitude=-74.0466,
+        images=[],
+        amenities=[],
+        first_seen_at=last_seen_at,
+        last_seen_at=last_seen_at,
+        is_active=is_active,
+        content_hash="hash",
+        created_at=last_seen_at,
+        updated_at=last_seen_at,
+    )
+
+
+@pytest.fixture
+def sqlite_pipeline(tmp_path, monkeypatch, mock_spider):
+    database_url = f"sqlite:///{tmp_path / 'listings.db'}"
+    Base.metadata.create_all(create_engine(database_url))
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    pipeline = DatabasePipeline(stale_after_days=3)
+    pipeline.open_spider(mock_spider)
+    return pipeline
+
+
+def listing_states(pipeline):
+    with pipeline.Session() as session:
+        return {
+            listing.external_id: (listing.is_active, listing.last_seen_at.replace(tzinfo=UTC))
+            for listing in session.scalars(select(Listing))
+        }
+
+
+def test_close_touches_seen_and_deactivates_stale(sqlite_pipeline, mock_spider, sample_item):
+    """Seen listings are touched and unseen stale ones in crawled cities deactivated in bulk."""
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+    old = now - timedelta(days=10)
+    with sqlite_pipeline.Session() as session:
+        session.add_all(
+            [
+                make_listing("test_123", "Bogotá", old, is_active=False),
+                make_listing("gone", "Bogotá", old),
+                make_listing("recent", "Bogotá", now - timedelta(days=1)),
+                make_listing("other_city", "Medellín", old),
+            ]
+        )
+        session.commit()
+
+    sqlite_pipeline.process_item(sample_item, mock_spider)
+    sqlite_pipeline.touch_and_deactivate(mock_spider, now=now)
+
+    states = listing_states(sqlite_pipeline)
+    assert states["test_123"] == (True, now)
+    assert states["gone"][0] is False
+    assert states["recent"][0] is True
+    assert states["other_city"][0] is True
+
+
+def test_close_only_touches_for_partial_runs(sqlite_pipeline, mock_spider, sample_item):
+    """Recrawl/replay runs do not see whole partitions, so nothing is deactivated."""
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+    with sqlite_pipeline.Session() as session:
+        session.add(make_listing("gone", "Bogotá", now - timedelta(days=10)))
+        session.commit()
+    mock_spider.covers_partitions = False
+
+    sqlite_pipeline.process_item(sample_item, mock_spider)
+    sqlite_pipeline.touch_and_deactivate(mock_spider, now=now)
+
+    assert listing_states(sqlite_pipeline)["gone"][0] is True
+
+
+def test_interrupted_crawl_only_touches(sqlite_pipeline, mock_spider, sample_item):
+    """A crawl that did not finish may have missed live listings."""
+    with sqlite_pipeline.Session() as session:
+        session.add(make_listing("gone", "Bogotá", datetime(2026, 1, 1, tzinfo=UTC)))
+        session.commit()
+
+    sqlite_pipeline.process_item(sample_item, mock_spider)
+    sqlite_pipeline.spider_closed(mock_spider, "shutdown")
+
+    states = listing_states(sqlite_pipeline)
+    assert states["gone"][0] is True
+    assert states["test_123"][0] is True
+
+
+def test_close_deactivates_only_walked_partitions(sqlite_pipeline, mock_spider, sample_item):
+    """Stale listings are deactivated only in the price bands searched to the last page."""
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+    old = now - timedelta(days=10)
+    with sqlite_pipeline.Session() as session:
+        session.add_all(
+            [
+                make_listing("cheap", "Bogotá", old, price=2500000),
+                make_listing("expensive", "Bogotá", old, price=5000000),
+                make_listing("other_city", "Medellín", old, price=2500000),
+            ]
+        )
+        session.commit()
+    cheap = CrawlPartition("bogota", "apartamentos", 0, 3000000)
+    expensive = CrawlPartition("bogota", "apartamentos", 3000000, None)
+    mock_spider.crawl_partitions.return_value = [cheap, expensive]
+    mock_spider.finished_partitions.return_value = [cheap]
+
+    sqlite_pipeline.process_item(sample_item, mock_spider)
+    sqlite_pipeline.close_spider(mock_spider)
+    sqlite_pipeline.touch_and_deactivate(mock_spider, now=now)
+
+    states = listing_states(sqlite_pipeline)
+    assert states["cheap"][0] is False
+    assert states["expensive"][0] is True
+    assert states["other_city"][0] is True
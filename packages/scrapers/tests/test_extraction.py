@@ -0,0 +1,87 @@
+from pathlib import Path
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+
+from propfair_scrapers.extraction import PageIndex
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+
+FIXTURES = Path(__file__).parent / "fixtures" / "fincaraiz"
+
+
+def make_response(body, url="https://www.fincaraiz.com.co/apartamento-en-arriendo-en-bogota/1"):
+    return HtmlResponse(url=url, body=body.encode(), encoding="utf-8")
+
+
+def load_fixture(external_id):
+    return make_response(
+        (FIXTURES / f"{external_id}.html").read_text(),
+        url=f"https://www.fincaraiz.com.co/apartamento-en-arriendo-en-bogota/{external_id}",
+    )
+
+
+def test_page_index_matches_selector_semantics():
+    response = make_response(
+        "<html><body><div>A<!-- c -->T<span>B</span>C</div>"
+        "<h4>Ubica<b>ción</b></h4><p>first</p><div>skip</div><p>second</p>"
+        "</body></html>"
+    )
+    index = PageIndex(response)
+
+    assert index.node_texts == response.css("*::text").getall()
+    # Labels split across text nodes still count as contained
+    anchors = index.containing("Ubicación", tag="h4")
+    assert len(anchors) == 1
+    assert index.own_texts(index.following_siblings(anchors, tag="p")) == (
+        response.css('h4:contains("Ubicación") ~ p::text').getall()
+    )
+
+
+def test_page_index_re_first():
+    index = PageIndex(make_response("<html><body><p>2 Habs.</p><p>3 Habs.</p></body></html>"))
+    assert index.re_first(r"(\d+)\s*Habs?") == "2"
+    assert index.re_first(r"(\d+)\s*Baños?") is None
+
+
+def test_extract_listing_from_detail_page():
+    item = FincaRaizSpider().extract_listing(load_fixture("193248980"))
+
+    assert item["external_id"] == "193248980"
+    assert item["price"] == 6500000
+    assert item["admin_fee"] == 1300000
+    assert item["bedrooms"] == 3
+    assert item["bathrooms"] == 3
+    assert item["area"] == 169.0
+    assert item["parking_spaces"] == 2
+    assert item["estrato"] == 6
+    assert item["floor"] == 8
+    assert item["building_age"] == 30
+    assert item["neighborhood"] == "Chicó Navarra"
+    assert item["city"] == "Bogotá"
+    assert (item["latitude"], item["longitude"]) == (4.6863, -74.0465)
+    assert item["images"] == [
+        "https://cdn.fincaraiz.com.co/images/193248980/1.jpg",
+        "https://cdn.fincaraiz.com.co/images/193248980/2.jpg",
+    ]
+    assert item["amenities"] == ["Gimnasio", "Piscina", "BBQ", "Ok"]
+
+
+def test_extract_listing_skips_incomplete_page():
+    assert FincaRaizSpider().extract_listing(load_fixture("190000001")) is None
+
+
+def test_extract_listing_city():
+    spider = FincaRaizSpider()
+    body = (FIXTURES / "193248980.html").read_text().replace("Bogotá", "Medellín")
+    assert spider.extract_listing(make_response(body))["city"] == "Medellín"
+
+    # No city on the page: the city of the search partition the listing came from
+    body = (FIXTURES / "191002345.html").read_text().replace(", Bogotá", "")
+    url = "https://www.fincaraiz.com.co/apartamento-en-arriendo/191002345"
+    response = HtmlResponse(
+        url=url,
+        body=body.encode(),
+        encoding="utf-8",
+        request=Request(url, meta={"crawl_partition": "medellin/apartamentos"}),
+    )
+    assert spider.extract_listing(response)["city"] == "Medellín"
@@ -0,0 +1,181 @@
+import time
+
+import pytest
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from propfair_scrapers.frontier import (
+    LEASE_META_KEY,
+    FrontierPartitionMiddleware,
+    FrontierScheduler,
+    SQLiteFrontier,
+    aggregate_worker_stats,
+    frontier_from_url,
+    partition_for,
+)
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+
+BOGOTA = "https://www.fincaraiz.com.co/arriendo/apartamentos/bogota"
+MEDELLIN = "https://www.fincaraiz.com.co/arriendo/apartamentos/medellin"
+
+
+def make_scheduler(url, worker_index=0, workers=1):
+    crawler = get_crawler(
+        FincaRaizSpider,
+        {
+            "FRONTIER_URL": url,
+            "FRONTIER_WORKER": f"worker-{worker_index}",
+            "FRONTIER_WORKER_INDEX": worker_index,
+            "FRONTIER_WORKERS": workers,
+        },
+    )
+    scheduler = FrontierScheduler.from_crawler(crawler)
+    scheduler.open(FincaRaizSpider())
+    return scheduler
+
+
+def test_sqlite_frontier_pops_in_partition_order():
+    frontier = SQLiteFrontier()
+    frontier.push("/b", b"b1")
+    frontier.push("/a", b"a1")
+    frontier.push("/b", b"b2")
+
+    assert frontier.partitions() == ["/a", "/b"]
+    assert frontier.pop(["/b", "/a"])[1] == b"b1"
+    assert frontier.pop(["/b", "/a"])[1] == b"b2"
+    assert frontier.pop(["/b", "/a"])[1] == b"a1"
+    assert frontier.pop(["/b", "/a"]) is None
+
+
+def test_sqlite_frontier_leases_popped_requests():
+    frontier = SQLiteFrontier()
+    frontier.push("/a", b"a1")
+    frontier.push("/a", b"a2")
+
+    first, _ = frontier.pop(["/a"], lease_timeout=60)
+    frontier.pop(["/a"], lease_timeout=60)
+    assert frontier.leased() == 2
+    frontier.ack(first)
+    assert frontier.leased() == 1
+
+    # A worker that never acknowledges its request loses the lease
+    assert frontier.requeue_expired(now=time.time() + 30) == 0
+    assert frontier.requeue_expired(now=time.time() + 120) == 1
+    assert frontier.leased() == 0
+    assert frontier.pop(["/a"])[1] == b"a2"
+
+
+def test_sqlite_frontier_mark_seen():
+    frontier = SQLiteFrontier()
+    assert frontier.mark_seen("abc") is True
+    assert frontier.mark_seen("abc") is False
+
+
+def test_frontier_from_url():
+    assert isinstance(frontier_from_url("sqlite://"), SQLiteFrontier)
+    with pytest.raises(ValueError):
+        frontier_from_url("ftp://example.com")
+
+
+def test_scheduler_round_trips_and_deduplicates_requests():
+    scheduler = make_scheduler("sqlite://")
+    spider = scheduler.spider
+    request = Request(BOGOTA, callback=spider.parse_listing_page, meta={"playwright": True})
+
+    assert scheduler.enqueue_request(request) is True
+    assert scheduler.enqueue_request(request.replace()) is False
+    assert scheduler.has_pending_requests()
+
+    restored = scheduler.next_request()
+    assert restored.url == BOGOTA
+    assert restored.callback == spider.parse_listing_page
+    assert restored.meta["frontier_partition"] == partition_for(BOGOTA)
+    assert scheduler.next_request() is None
+    assert scheduler.frontier.leased() == 1
+
+    scheduler.request_handled(restored)
+    assert scheduler.frontier.leased() == 0
+
+
+def test_retried_request_takes_over_lease():
+    scheduler = make_scheduler("sqlite://")
+    scheduler.enqueue_request(Request(BOGOTA))
+    request = scheduler.next_request()
+    assert LEASE_META_KEY in request.meta
+
+    # RetryMiddleware re-enqueues a copy carrying the same meta
+    assert scheduler.enqueue_request(request.replace(dont_filter=True)) is True
+    assert scheduler.frontier.leased() == 0
+    retried = scheduler.next_request()
+    assert retried.url == BOGOTA
+    assert scheduler.frontier.leased() == 1
+
+
+def test_workers_share_queue_and_prefer_own_partitions(tmp_path):
+    url = f"sqlite:///{tmp_path / 'frontier.db'}"
+    first = make_scheduler(url, worker_index=0, workers=2)
+    second = make_scheduler(url, worker_index=1, workers=2)
+    first.enqueue_request(Request(BOGOTA))
+    first.enqueue_request(Request(MEDELLIN))
+
+    owner_of_bogota = first if first._owns(partition_for(BOGOTA)) else second
+    other = second if owner_of_bogota is first else first
+    if other._owns(partition_for(MEDELLIN)):
+        assert other.next_request().url == MEDELLIN
+    assert owner_of_bogota.next_request().url == BOGOTA
+
+    # Seen fingerprints are shared too
+    assert second.enqueue_request(Request(BOGOTA)) is False
+
+
+def test_drained_crawl_clears_seen_requests(tmp_path):
+    url = f"sqlite:///{tmp_path / 'frontier.db'}"
+    first = make_scheduler(url)
+    first.enqueue_request(Request(BOGOTA))
+    first.request_handled(first.next_request())
+    first.close("finished")
+
+    # The next crawl walks the same search page again
+    second = make_scheduler(url)
+    assert second.enqueue_request(Request(BOGOTA)) is True
+    second.close("shutdown")
+
+    # An interrupted crawl keeps its queue and seen set, and resumes
+    third = make_scheduler(url)
+    assert third.enqueue_request(Request(BOGOTA)) is False
+    assert third.next_request().url == BOGOTA
+
+
+def test_aggregate_worker_stats():
+    report = aggregate_worker_stats({
+        "a": {"requests": 60, "items": 30, "started_at": 0, "updated_at": 60},
+        "b": {"requests": 120, "items": 60, "started_at": 0, "updated_at": 120},
+    })
+    assert report["workers"]["a"]["requests_per_min"] == 60
+    assert report["total"]["requests"] == 180
+    assert report["total"]["requests_per_min"] == 120
+
+
+def test_partition_middleware_propagates_partition():
+    response = HtmlResponse(
+        BOGOTA, body=b"", request=Request(BOGOTA, meta={"frontier_partition": "/bogota"})
+    )
+    result = list(FrontierPartitionMiddleware().process_spider_output(
+        response, [Request("https://www.fincaraiz.com.co/apartamento/1"), {"item": 1}], None
+    ))
+    assert result[0].meta["frontier_partition"] == "/bogota"
+    assert result[1] == {"item": 1}
+
+
+def test_partition_middleware_acknowledges_handled_request():
+    scheduler = make_scheduler("sqlite://")
+    scheduler.enqueue_request(Request(BOGOTA))
+    request = scheduler.next_request()
+    response = HtmlResponse(BOGOTA, body=b"", request=request)
+    middleware = FrontierPartitionMiddleware.from_crawler(scheduler.crawler)
+
+    output = middleware.process_spider_output(response, [{"item": 1}], None)
+    assert scheduler.frontier.leased() == 1
+    list(output)
+    assert scheduler.frontier.leased() == 0
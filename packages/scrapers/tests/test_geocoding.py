@@ -0,0 +1,168 @@
+import os
+import sys
+from datetime import UTC, datetime
+from unittest.mock import Mock
+
+# Add API models to path before importing them
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
+
+from propfair_api.models import Base, Listing
+from scrapy.utils.test import get_crawler
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from propfair_scrapers.geocoding import (
+    PLACEHOLDER_COORDINATES,
+    Gazetteer,
+    GeocodingPipeline,
+    backfill,
+    place_key,
+)
+from propfair_scrapers.pipelines import ValidationPipeline
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+from tests.test_extraction import load_fixture
+
+
+def test_place_key_drops_qualifiers_and_accents():
+    assert place_key("Barrio El Chicó") == "chico"
+    assert place_key("Los Mártires") == "martires"
+    # A lone article is kept rather than emptied
+    assert place_key("La") == "la"
+
+
+def test_bundled_gazetteer_resolves_barrios():
+    gazetteer = Gazetteer.load()
+    assert len(gazetteer) > 50
+
+    exact = gazetteer.geocode("Bogotá", "Chapinero Alto")
+    assert (exact.method, exact.place.localidad) == ("exact", "Chapinero")
+    assert 4.5 < exact.latitude < 4.8 and -74.2 < exact.longitude < -74.0
+
+    # Portal suffixes, city aliases and accents do not matter
+    assert gazetteer.geocode("Bogotá D.C.", "Chico Navarra, Bogotá, Bogotá D.C.").place.name == "Chicó Navarra"
+    # A place named inside longer text
+    assert gazetteer.geocode("Bogotá", "Apartamento en Cedritos").method == "contains"
+    # Misspellings fall back to fuzzy matching
+    fuzzy = gazetteer.geocode("Bogotá", "Chapinero Altto")
+    assert (fuzzy.method, fuzzy.place.name) == ("fuzzy", "Chapinero Alto")
+    # The address is tried when the neighborhood is unknown
+    assert gazetteer.geocode("Bogotá", "Edificio Torre 5", "Carrera 7, Usaquén").place.name == "Usaquén"
+
+
+def test_gazetteer_never_returns_city_center():
+    gazetteer = Gazetteer.load()
+    assert gazetteer.geocode("Bogotá", "Bogotá") is None
+    assert gazetteer.geocode("Bogotá", "Conjunto Los Pinos") is None
+    assert gazetteer.geocode("Pasto", "Chapinero") is None
+    # Same name in another city resolves there
+    assert gazetteer.geocode("Medellín", "Castilla").latitude > 6
+    # Cities listed without any barrios
+    assert gazetteer.geocode("Cali", "Granada") is None
+    assert gazetteer.geocode("Barranquilla", "El Prado, Barranquilla") is None
+
+
+def test_gazetteer_memoizes_lookups():
+    gazetteer = Gazetteer.load()
+    rows = [("Bogotá", "Rosales", "Calle 72")] * 3 + [("Bogotá", "Niza", "")]
+    results = gazetteer.geocode_many(rows)
+
+    assert len(results) == 2
+    assert len(gazetteer._cache) == 2
+    assert gazetteer.geocode("Bogotá", "Rosales", "Calle 72") is results[rows[0]]
+
+
+def test_pipeline_geocodes_pages_without_map():
+    crawler = get_crawler(FincaRaizSpider)
+    pipeline = GeocodingPipeline.from_crawler(crawler)
+    spider = Mock()
+
+    item = FincaRaizSpider().extract_listing(load_fixture("191002345"))
+    assert item["latitude"] is None
+
+    item = pipeline.process_item(item, spider)
+    assert item["geocode_place"] == "Chapinero Alto"
+    assert (item["latitude"], item["longitude"]) != PLACEHOLDER_COORDINATES
+    assert item["coordinates_approximate"] is False
+
+    # Coordinates from the page are kept as they are
+    mapped = pipeline.process_item({"latitude": 4.6863, "longitude": -74.0465}, spider)
+    assert mapped == {"latitude": 4.6863, "longitude": -74.0465}
+
+    # No place matches: kept at the city centroid, flagged, and validated
+    for city, neighborhood in [("Bogotá", "Xyz"), ("Cali", "Granada")]:
+        item = FincaRaizSpider().extract_listing(load_fixture("191002345"))
+        item.update(city=city, neighborhood=neighborhood, address="")
+        item = pipeline.process_item(item, spider)
+        assert item["coordinates_approximate"] is True
+        assert item["geocode_place"] == city
+        assert ValidationPipeline().process_item(item, spider) is item
+
+    # Only a city missing from the gazetteer leaves coordinates empty
+    unknown = pipeline.process_item(
+        {"city": "Pasto", "neighborhood": "Xyz", "address": "", "latitude": None, "longitude": None},
+        spider,
+    )
+    assert unknown["latitude"] is None
+
+    stats = crawler.stats
+    assert stats.get_value("geocoding/exact") == 1
+    assert stats.get_value("geocoding/page") == 1
+    assert stats.get_value("geocoding/city") == 2
+    assert stats.get_value("geocoding/unresolved") == 1
+
+
+def test_backfill_replaces_placeholder_coordinates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'listings.db'}")
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+
+    def listing(external_id, neighborhood, coordinates):
+        return Listing(
+            id=f"id_{external_id}",
+            external_id=external_id,
+            source="fincaraiz",
+            url=f"https://example.com/{external_id}",
+            title="Test Apartment",
+            price=2000000,
+            bedrooms=2,
+            bathrooms=1,
+            parking_spaces=1,
+            area=60.0,
+            address=neighborhood,
+            neighborhood=neighborhood,
+            city="Bogotá",
+            latitude=coordinates[0],
+            longitude=coordinates[1],
+            images=[],
+            amenities=[],
+            first_seen_at=now,
+            last_seen_at=now,
+            is_active=True,
+            content_hash="hash",
+            created_at=now,
+            updated_at=now,
+        )
+
+    with Session(engine) as session:
+        session.add_all(
+            [
+                listing("a", "Rosales", PLACEHOLDER_COORDINATES),
+                listing("b", "Rosales", PLACEHOLDER_COORDINATES),
+                listing("c", "Nowhere", PLACEHOLDER_COORDINATES),
+                listing("d", "Rosales", (4.6531, -74.0529)),
+            ]
+        )
+        session.commit()
+        assert backfill(session, Gazetteer.load()) == (2, 1)
+        coordinates = dict(
+            session.execute(select(Listing.external_id, Listing.latitude)).all()
+        )
+
+    assert coordinates["a"] == coordinates["b"] != PLACEHOLDER_COORDINATES[0]
+    assert coordinates["c"] == PLACEHOLDER_COORDINATES[0]
+    assert coordinates["d"] == 4.6531
+    with Session(engine) as session:
+        approximate = session.scalars(
+            select(Listing.external_id).where(Listing.coordinates_approximate.is_(True))
+        ).all()
+    assert approximate == ["c"]
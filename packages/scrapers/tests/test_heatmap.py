@@ -0,0 +1,137 @@
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+# Add API models to path before importing pipelines
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
+
+from propfair_api.models import Base, Listing, NeighborhoodStats
+from propfair_api.tiles import TileStore, decode_tile, tile_position
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from propfair_scrapers.heatmap import HeatmapGenerator, update_tiles
+
+NOW = datetime(2026, 3, 1, tzinfo=UTC)
+
+
+def make_listing(listing_id, latitude, longitude, price, area=50.0, neighborhood="Chapinero"):
+    return Listing(
+        id=listing_id,
+        external_id=listing_id,
+        source="fincaraiz",
+        url=f"https://example.com/{listing_id}",
+        title="Test Apartment",
+        price=price,
+        bedrooms=2,
+        bathrooms=1,
+        parking_spaces=1,
+        area=area,
+        address="Calle 60",
+        neighborhood=neighborhood,
+        city="Bogotá",
+        latitude=latitude,
+        longitude=longitude,
+        images=[],
+        amenities=[],
+        first_seen_at=NOW,
+        last_seen_at=NOW,
+        is_active=True,
+        content_hash=listing_id,
+        created_at=NOW,
+        updated_at=NOW,
+    )
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'listings.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                make_listing("1", 4.6500, -74.0600, 2500000),
+                make_listing("2", 4.6501, -74.0601, 3500000),
+                make_listing("3", 4.7500, -74.0900, 2000000, neighborhood="Suba"),
+                NeighborhoodStats(
+                    city="Bogotá",
+                    neighborhood="Chapinero",
+                    active_listings=2,
+                    price_per_m2_median=60000.0,
+                    sketches={},
+                    updated_at=NOW,
+                ),
+            ]
+        )
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def cells(store, layer, zoom, latitude, longitude):
+    x, y = tile_position(latitude, longitude, zoom)
+    data = store.get(layer, zoom, int(x), int(y))
+    return decode_tile(data)["cells"] if data else []
+
+
+def test_full_build_merges_zoom_levels(session, tmp_path):
+    store = TileStore(str(tmp_path / "heatmap.mbtiles"))
+    HeatmapGenerator(store, min_zoom=10, max_zoom=14).update(session, now=NOW)
+
+    # Listings 1 and 2 share a cell at the deepest zoom: mean price per m²
+    [(_, _, count, value)] = cells(store, "prices", 14, 4.65, -74.06)
+    assert (count, value) == (2, 60000)
+    # Deals only where a neighborhood median exists: (1 - 50000/60000 + 1 - 70000/60000) / 2
+    [(_, _, count, value)] = cells(store, "deals", 14, 4.65, -74.06)
+    assert (count, value) == (2, 0.0)
+    assert cells(store, "deals", 14, 4.75, -74.09) == []
+
+    # Lower zooms are merged from their children and keep every listing
+    assert sum(cell[2] for cell in cells(store, "prices", 10, 4.65, -74.06)) == 3
+    assert store.metadata()["generated_at"] == NOW.isoformat()
+    store.close()
+
+
+def test_incremental_update_rewrites_changed_tiles_only(session, tmp_path):
+    path = str(tmp_path / "heatmap.mbtiles")
+    update_tiles(session, path, min_zoom=10, max_zoom=14)
+    store = TileStore(path)
+    suba_before = store.get("prices", 14, *map(int, tile_position(4.75, -74.09, 14)))
+    store.close()
+
+    later = datetime.now(UTC) + timedelta(seconds=1)
+    session.execute(update(Listing).where(Listing.id == "2").values(is_active=False, updated_at=later))
+    session.commit()
+    written = update_tiles(session, path, min_zoom=10, max_zoom=14)
+
+    store = TileStore(path)
+    # One tile per zoom level and layer around the deactivated listing
+    assert written == 2 * 5
+    [(_, _, count, value)] = cells(store, "prices", 14, 4.65, -74.06)
+    assert (count, value) == (1, 50000)
+    assert store.get("prices", 14, *map(int, tile_position(4.75, -74.09, 14))) == suba_before
+    assert sum(cell[2] for cell in cells(store, "prices", 10, 4.65, -74.06)) == 2
+    store.close()
+
+
+def test_incremental_update_clears_tile_a_listing_moved_out_of(session, tmp_path):
+    path = str(tmp_path / "heatmap.mbtiles")
+    update_tiles(session, path, min_zoom=10, max_zoom=14)
+
+    # Listing 3 is re-geocoded from Suba to Chapinero
+    later = datetime.now(UTC) + timedelta(seconds=1)
+    session.execute(
+        update(Listing)
+        .where(Listing.id == "3")
+        .values(latitude=4.6502, longitude=-74.0602, updated_at=later)
+    )
+    session.commit()
+    update_tiles(session, path, min_zoom=10, max_zoom=14)
+
+    store = TileStore(path)
+    assert store.get("prices", 14, *map(int, tile_position(4.75, -74.09, 14))) is None
+    assert sum(cell[2] for cell in cells(store, "prices", 14, 4.65, -74.06)) == 3
+    assert store.listing_tiles(["3"])["3"] == tuple(map(int, tile_position(4.6502, -74.0602, 14)))
+    store.close()
@@ -0,0 +1,192 @@
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+# Add API models to path before importing pipelines
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
+
+from propfair_api.models import Base, Listing, NeighborhoodStats, PriceHistory
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from propfair_scrapers import market_stats
+from propfair_scrapers.market_stats import MarketStatsDelta
+from propfair_scrapers.pipelines import DatabasePipeline
+from propfair_scrapers.sketches import QuantileSketch
+
+
+def test_sketch_merge_and_removal():
+    left, right = QuantileSketch(), QuantileSketch()
+    for value in range(1, 101):
+        (left if value % 2 else right).add(value)
+    left.merge(right)
+    assert left.count == 100
+    assert left.quantile(0.5) == pytest.approx(50, rel=0.03)
+
+    for value in range(51, 101):
+        left.add(value, count=-1)
+    assert left.count == 50
+    assert left.quantile(0.5) == pytest.approx(25, rel=0.03)
+
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_delta_city_totals_merge_neighborhoods():
+    delta = MarketStatsDelta()
+    delta.add(("Bogotá", "Chapinero"), 3000000, 60)
+    delta.add(("Bogotá", "Suba"), 2000000, 50)
+    delta.remove(("Bogotá", "Suba"), 1800000, 50)
+    delta.add(("Bogotá", ""), 2500000, 55)
+
+    totals = delta.with_city_totals()
+    assert set(totals) == {("Bogotá", "Chapinero"), ("Bogotá", "Suba"), ("Bogotá", "")}
+    assert totals[("Bogotá", "")]["price"].count == 2
+    assert totals[("Bogotá", "Suba")]["price"].count == 0
+
+
+@pytest.fixture
+def mock_spider():
+    spider = Mock()
+    spider.logger = Mock()
+    return spider
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, mock_spider):
+    database_url = f"sqlite:///{tmp_path / 'listings.db'}"
+    Base.metadata.create_all(create_engine(database_url))
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    pipeline = DatabasePipeline(stale_after_days=3)
+    pipeline.open_spider(mock_spider)
+    return pipeline
+
+
+def make_item(external_id, price, neighborhood="Chapinero", barrio=None, area=60.0):
+    return {
+        "external_id": external_id,
+        "source": "fincaraiz",
+        "url": f"https://example.com/{external_id}",
+        "title": "Test Apartment",
+        "price": price,
+        "bedrooms": 2,
+        "bathrooms": 1,
+        "parking_spaces": 1,
+        "area": area,
+        "address": "Calle 60",
+        "neighborhood": neighborhood,
+        "barrio": barrio,
+        "city": "Bogotá",
+        "latitude": 4.64,
+        "longitude": -74.06,
+        "images": [],
+        "amenities": [],
+        "content_hash": f"hash_{external_id}_{price}",
+    }
+
+
+def stats(pipeline):
+    with pipeline.Session() as session:
+        return {
+            (row.city, row.neighborhood): row
+            for row in session.scalars(select(NeighborhoodStats))
+        }
+
+
+def run(pipeline, spider, items, now):
+    pipeline.seen_keys.clear()
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.touch_and_deactivate(spider, now=now)
+    pipeline.update_market_stats(spider, now=now)
+
+
+def test_stats_follow_crawls_incrementally(pipeline, mock_spider):
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+    run(
+        pipeline,
+        mock_spider,
+        [
+            make_item("1", 3000000),
+            make_item("2", 4000000),
+            make_item("3", 2000000, neighborhood="Suba Portal", barrio="Suba Centro"),
+        ],
+        now,
+    )
+
+    rows = stats(pipeline)
+    assert rows[("Bogotá", "")].active_listings == 3
+    assert rows[("Bogotá", "Chapinero")].price_median == pytest.approx(3000000, rel=0.02)
+    # Official barrio wins over the portal's text
+    assert rows[("Bogotá", "Suba Centro")].active_listings == 1
+
+    # A re-price moves the listing within the sketches; a listing not seen goes stale
+    later = now + timedelta(days=5)
+    run(pipeline, mock_spider, [make_item("1", 5000000), make_item("3", 2000000, barrio="Suba Centro")], later)
+
+    rows = stats(pipeline)
+    assert rows[("Bogotá", "Chapinero")].active_listings == 1
+    assert rows[("Bogotá", "Chapinero")].price_median == pytest.approx(5000000, rel=0.02)
+    assert rows[("Bogotá", "")].active_listings == 2
+    assert rows[("Bogotá", "")].updated_at.replace(tzinfo=UTC) == later
+
+    # Incremental maintenance matches a rebuild from the listings table
+    with pipeline.Session() as session:
+        assert session.scalar(select(PriceHistory.price)) == 5000000
+        incremental = {key: (row.active_listings, row.price_median) for key, row in stats(pipeline).items()}
+        market_stats.rebuild(session, now=later)
+    assert {key: (row.active_listings, row.price_median) for key, row in stats(pipeline).items()} == incremental
+
+
+def test_stats_disabled(tmp_path, monkeypatch, mock_spider):
+    database_url = f"sqlite:///{tmp_path / 'listings.db'}"
+    Base.metadata.create_all(create_engine(database_url))
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    pipeline = DatabasePipeline(market_stats_enabled=False)
+    pipeline.open_spider(mock_spider)
+
+    run(pipeline, mock_spider, [make_item("1", 3000000)], datetime(2026, 3, 1, tzinfo=UTC))
+
+    assert stats(pipeline) == {}
+    with pipeline.Session() as session:
+        assert session.scalar(select(Listing.price)) == 3000000
+
+
+def test_apply_merges_into_row_created_concurrently(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+
+    def other_worker():
+        delta = MarketStatsDelta()
+        delta.add(("Bogotá", "Chapinero"), 3000000, 60)
+        with Session(engine) as other:
+            market_stats.apply(other, delta, now=now)
+
+    mine = MarketStatsDelta()
+    mine.add(("Bogotá", "Chapinero"), 4000000, 80)
+    with Session(engine) as session:
+        # The other worker inserts the same rows after this one found none
+        event.listen(session, "before_flush", lambda *args: other_worker(), once=True)
+        assert market_stats.apply(session, mine, now=now) == 2
+
+    with Session(engine) as session:
+        row = session.get(NeighborhoodStats, ("Bogotá", "Chapinero"))
+        assert row.active_listings == 2
+
+
+def test_stats_skipped_when_touch_fails(pipeline, mock_spider):
+    pipeline.process_item(make_item("1", 3000000), mock_spider)
+    pipeline.touch_and_deactivate = Mock(
+        side_effect=OperationalError("UPDATE listings", {}, Exception("database gone"))
+    )
+    pipeline.update_market_stats = Mock()
+
+    pipeline.spider_closed(mock_spider, "finished")
+
+    pipeline.update_market_stats.assert_not_called()
+    mock_spider.logger.error.assert_called_once()
@@ -0,0 +1,107 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+from scrapy import Request
+from scrapy.exceptions import DropItem
+from scrapy.utils.test import get_crawler
+
+from propfair_scrapers.metrics import (
+    CrawlMetrics,
+    Histogram,
+    LogSampler,
+    MetricsExporter,
+    metrics,
+    timed_stage,
+)
+from propfair_scrapers.pipelines import DeduplicationPipeline
+
+
+class Stage:
+    @timed_stage("test")
+    def process_item(self, item, spider):
+        if item.get("drop"):
+            raise DropItem("nope")
+        return item
+
+
+def test_timed_stage_records_duration_and_outcome():
+    metrics.reset()
+    stage = Stage()
+    stage.process_item({}, None)
+    with pytest.raises(DropItem):
+        stage.process_item({"drop": True}, None)
+
+    assert metrics.histogram("pipeline_stage_seconds", stage="test").count == 2
+    assert metrics.counters["pipeline_items_total"] == {
+        (("outcome", "passed"), ("stage", "test")): 1,
+        (("outcome", "dropped"), ("stage", "test")): 1,
+    }
+
+
+def test_histogram_quantiles_and_summary():
+    histogram = Histogram(buckets=(0.01, 0.1, 1))
+    for value in (0.005, 0.05, 0.05, 0.5):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.summary()["max"] == 0.5
+    assert histogram.summary()["count"] == 4
+
+
+def test_prometheus_rendering():
+    registry = CrawlMetrics()
+    registry.observe("db_write_seconds", 0.003)
+    registry.inc("pipeline_items_total", stage="validation", outcome="passed")
+
+    text = registry.render_prometheus({"items_per_second": {(): 2.5}})
+
+    assert "# TYPE propfair_db_write_seconds histogram" in text
+    assert 'propfair_db_write_seconds_bucket{le="0.005"} 1' in text
+    assert 'propfair_db_write_seconds_bucket{le="+Inf"} 1' in text
+    assert 'propfair_pipeline_items_total{outcome="passed",stage="validation"} 1' in text
+    assert "propfair_items_per_second 2.5" in text
+
+
+def test_log_sampler():
+    sampled = LogSampler(every=10, first=2)
+
+    assert sum(sampled() for _ in range(100)) == 12
+
+
+def test_dedup_drops_are_counted():
+    stats = Mock()
+    pipeline = DeduplicationPipeline(stats=stats)
+    item = {"external_id": "1", "source": "fincaraiz", "price": 1, "title": "t"}
+    pipeline.process_item(dict(item), None)
+
+    with pytest.raises(DropItem):
+        pipeline.process_item(dict(item), None)
+    stats.inc_value.assert_called_once_with("dedup/dropped/duplicate")
+
+
+def test_exporter_writes_textfile_and_json_summary(tmp_path):
+    crawler = get_crawler(
+        settings_dict={
+            "METRICS_TEXTFILE": str(tmp_path / "crawl.prom"),
+            "METRICS_JSON_PATH": str(tmp_path / "summary.json"),
+        }
+    )
+    exporter = MetricsExporter.from_crawler(crawler)
+    spider = Mock()
+    exporter.spider_opened(spider)
+
+    request = Request("https://example.com", meta={"playwright": True, "download_latency": 1.7})
+    exporter.response_received(Mock(), request, spider)
+    Stage().process_item({}, spider)
+    crawler.stats.set_value("item_scraped_count", 1)
+    crawler.stats.set_value("validation/dropped/outlier", 2)
+    exporter.spider_closed(spider, "finished")
+
+    prom = (tmp_path / "crawl.prom").read_text()
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert 'propfair_page_render_seconds_bucket{le="2.5"} 1' in prom
+    assert 'propfair_crawl_stat{name="item_scraped_count"} 1' in prom
+    assert summary["page_render"]["all"]["count"] == 1
+    assert summary["pipeline_stages"]["stage=test"]["count"] == 1
+    assert summary["drops"] == {"validation/outlier": 2}
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+from datetime import UTC, datetime
+from unittest.mock import Mock
+
+import pytest
+
+# Add API models to path before importing them
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
+
+from propfair_api.models import Base, Listing
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.test import get_crawler
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from propfair_scrapers.neighborhoods import (
+    NeighborhoodIndex,
+    NeighborhoodPipeline,
+    STRTree,
+    assign,
+)
+
+
+def square(min_x, min_y, size):
+    return [
+        [min_x, min_y],
+        [min_x + size, min_y],
+        [min_x + size, min_y + size],
+        [min_x, min_y + size],
+        [min_x, min_y],
+    ]
+
+
+@pytest.fixture
+def geojson_path(tmp_path):
+    """Two barrios side by side; the second is a ring around a park (hole) plus an island."""
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"name": "Rosales", "localidad": "Chapinero"},
+            "geometry": {"type": "Polygon", "coordinates": [square(-74.06, 4.64, 0.02)]},
+        },
+        {
+            "type": "Feature",
+            "properties": {"name": "El Nogal", "localidad": "Chapinero"},
+            "geometry": {
+                "type": "MultiPolygon",
+                "coordinates": [
+                    [square(-74.04, 4.64, 0.02), square(-74.035, 4.645, 0.01)],
+                    [square(-74.00, 4.70, 0.01)],
+                ],
+            },
+        },
+        {"type": "Feature", "properties": {"name": "Broken"}, "geometry": None},
+    ]
+    path = tmp_path / "barrios.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return path
+
+
+def test_str_tree_finds_every_containing_box():
+    boxes = [(x, y, x + 1.5, y + 1.5) for x in range(30) for y in range(30)]
+    tree = STRTree(boxes, node_capacity=4)
+
+    for point in [(0.5, 0.5), (10.2, 20.7), (29.9, 29.9), (-1, 5)]:
+        expected = {
+            index for index, (x1, y1, x2, y2) in enumerate(boxes)
+            if x1 <= point[0] <= x2 and y1 <= point[1] <= y2
+        }
+        assert set(tree.query(*point)) == expected
+
+    assert list(STRTree([]).query(0, 0)) == []
+
+
+def test_locate_points_in_polygons(geojson_path):
+    index = NeighborhoodIndex.from_geojson(geojson_path)
+    assert len(index) == 2
+
+    assert index.locate(4.65, -74.05).barrio == "Rosales"
+    assert index.locate(4.642, -74.038).barrio == "El Nogal"
+    # Inside the hole, on the island, and outside everything
+    assert index.locate(4.65, -74.03) is None
+    assert index.locate(4.705, -73.995).barrio == "El Nogal"
+    assert index.locate(4.70, -74.20) is None
+
+    located = index.locate_many([(4.65, -74.05), (4.70, -74.20)])
+    assert [n and n.localidad for n in located] == ["Chapinero", None]
+
+
+def test_pipeline_sets_official_neighborhood(geojson_path):
+    with pytest.raises(NotConfigured):
+        NeighborhoodPipeline.from_crawler(get_crawler(settings_dict={}))
+
+    crawler = get_crawler(settings_dict={"NEIGHBORHOODS_GEOJSON": str(geojson_path)})
+    pipeline = NeighborhoodPipeline.from_crawler(crawler)
+    spider = Mock()
+
+    item = pipeline.process_item({"latitude": 4.65, "longitude": -74.05}, spider)
+    assert (item["barrio"], item["localidad"]) == ("Rosales", "Chapinero")
+    outside = pipeline.process_item({"latitude": 6.2, "longitude": -75.5}, spider)
+    assert "barrio" not in outside
+    # Validation drops listings without coordinates later on
+    assert pipeline.process_item({"latitude": None, "longitude": None}, spider)
+    # A city centroid stand-in is not placed in the barrio it falls in
+    approximate = {"latitude": 4.65, "longitude": -74.05, "coordinates_approximate": True}
+    assert "barrio" not in pipeline.process_item(approximate, spider)
+
+    assert crawler.stats.get_value("neighborhoods/assigned") == 1
+    assert crawler.stats.get_value("neighborhoods/outside") == 1
+
+
+def test_assign_updates_stored_listings_in_batches(geojson_path, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'listings.db'}")
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 3, 1, tzinfo=UTC)
+    points = {"a": (4.65, -74.05), "b": (4.642, -74.038), "c": (4.70, -74.20), "d": (4.651, -74.051)}
+
+    with Session(engine) as session:
+        for external_id, (latitude, longitude) in points.items():
+            session.add(
+                Listing(
+                    id=f"id_{external_id}",
+                    external_id=external_id,
+                    source="fincaraiz",
+                    url=f"https://example.com/{external_id}",
+                    title="Test Apartment",
+                    price=2000000,
+                    bedrooms=2,
+                    bathrooms=1,
+                    parking_spaces=1,
+                    area=60.0,
+                    address="Calle 72",
+                    neighborhood="Rosales",
+                    city="Bogotá",
+                    latitude=latitude,
+                    longitude=longitude,
+                    images=[],
+                    amenities=[],
+                    first_seen_at=now,
+                    last_seen_at=now,
+                    is_active=True,
+                    content_hash="hash",
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+        session.commit()
+
+        index = NeighborhoodIndex.from_geojson(geojson_path)
+        assert assign(session, index, batch_size=2) == 3
+        barrios = dict(session.execute(select(Listing.external_id, Listing.barrio)).all())
+
+    assert barrios == {"a": "Rosales", "b": "El Nogal", "c": None, "d": "Rosales"}
@@ -0,0 +1,112 @@
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# Add API models to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../../apps/api/src"))
+
+from propfair_api.models import Base, Listing, PriceHistory
+
+from propfair_scrapers.recrawl import RecrawlPolicy, plan_recrawl
+from propfair_scrapers.spiders.fincaraiz import FincaRaizSpider
+
+NOW = datetime(2026, 3, 1, tzinfo=UTC)
+
+
+def test_volatile_listings_are_revisited_sooner():
+    policy = RecrawlPolicy()
+    first_seen = NOW - timedelta(days=60)
+
+    stable = policy.interval(0, first_seen, NOW)
+    volatile = policy.interval(8, first_seen, NOW)
+
+    assert volatile < stable
+    assert policy.min_interval <= volatile
+    assert stable <= policy.max_interval
+
+
+def test_new_listings_are_revisited_sooner():
+    policy = RecrawlPolicy()
+
+    assert policy.interval(0, NOW - timedelta(days=1), NOW) < policy.interval(0, NOW - timedelta(days=60), NOW)
+
+
+def test_priority_grows_with_staleness():
+    policy = RecrawlPolicy()
+    first_seen = NOW - timedelta(days=60)
+
+    assert policy.priority(0, first_seen, NOW - timedelta(days=30), NOW) > 1.0
+    assert policy.priority(0, first_seen, NOW, NOW) == 0.0
+
+
+def make_listing(listing_id, last_seen_days, first_seen_days=60, is_active=True):
+    return Listing(
+        id=listing_id,
+        external_id=listing_id,
+        source="fincaraiz",
+        url=f"https://example.com/{listing_id}",
+        title="Apartamento",
+        price=2000000,
+        bedrooms=2,
+        bathrooms=1,
+        parking_spaces=1,
+        area=60.0,
+        address="Calle 100",
+        neighborhood="Usaquén",
+        city="Bogotá",
+        latitude=4.68,
+        longitude=-74.04,
+        images=[],
+        amenities=[],
+        first_seen_at=NOW - timedelta(days=first_seen_days),
+        last_seen_at=NOW - timedelta(days=last_seen_days),
+        is_active=is_active,
+        content_hash="hash",
+        created_at=NOW,
+        updated_at=NOW,
+    )
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_plan_recrawl_ranks_due_listings_within_budget(session):
+    session.add_all(
+        [
+            make_listing("fresh", last_seen_days=0),
+            make_listing("stale", last_seen_days=10),
+            make_listing("volatile", last_seen_days=2),
+            make_listing("inactive", last_seen_days=30, is_active=False),
+        ]
+    )
+    session.add_all(
+        PriceHistory(id=f"ph{i}", listing_id="volatile", price=2000000 - i, recorded_at=NOW - timedelta(days=7 * i))
+        for i in range(8)
+    )
+    session.commit()
+
+    candidates = plan_recrawl(session, budget=10, now=NOW)
+
+    assert [c.listing_id for c in candidates] == ["volatile", "stale"]
+    assert plan_recrawl(session, budget=1, now=NOW)[0].listing_id == "volatile"
+
+
+def test_spider_consumes_recrawl_list(tmp_path):
+    recrawl = tmp_path / "recrawl.txt"
+    recrawl.write_text("https://example.com/a\nhttps://example.com/b\n\n")
+    spider = FincaRaizSpider(recrawl=str(recrawl))
+
+    requests = list(spider.start_requests())
+
+    assert [r.url for r in requests] == ["https://example.com/a", "https://example.com/b"]
+    assert requests[0].priority > requests[1].priority
+    assert requests[0].callback == spider.parse_listing_detail
@@ -0,0 +1,82 @@
+from propfair_scrapers.pipelines import EntityResolutionPipeline
+from propfair_scrapers.resolution import EntityResolver, address_similarity, normalize_text
+
+
+def listing(source, external_id, **overrides):
+    values = {
+        "title": "Apartamento en arriendo en Chicó, Bogotá",
+        "address": "Calle 93 # 11-40, Chicó",
+        "latitude": 4.6767,
+        "longitude": -74.0482,
+        "area": 85.0,
+        "bedrooms": 2,
+        "price": 4500000,
+    }
+    values.update(overrides)
+    return dict(source=source, external_id=external_id, **values)
+
+
+def test_normalize_text_strips_accents_and_expands_abbreviations():
+    assert normalize_text("Cl. 93 No. 11-40, CHICÓ") == "calle 93 11 40 chico"
+    assert normalize_text("Kr 7 # 45") == "carrera 7 45"
+    assert normalize_text(None) == ""
+
+
+def test_address_similarity_penalizes_different_house_numbers():
+    same = address_similarity(normalize_text("Calle 93 # 11-40"), normalize_text("Cl 93 No 11 40"))
+    other = address_similarity(normalize_text("Calle 93 # 11-40"), normalize_text("Calle 93 # 14-10"))
+
+    assert same == 1.0
+    assert other < 0.6
+
+
+def test_cross_portal_duplicate_shares_property_id():
+    resolver = EntityResolver()
+    first = resolver.resolve(**listing("fincaraiz", "1"))
+    second = resolver.resolve(
+        **listing(
+            "metrocuadrado",
+            "A-77",
+            title="Arriendo apartamento 2 habitaciones Chico",
+            address="Cl 93 No. 11 - 40 CHICO",
+            latitude=4.6771,
+            area=85,
+            price=4450000,
+        )
+    )
+
+    assert first == second
+    assert first.startswith("p")
+
+
+def test_different_properties_get_different_ids():
+    resolver = EntityResolver()
+    first = resolver.resolve(**listing("fincaraiz", "1"))
+
+    assert resolver.resolve(**listing("metrocuadrado", "2", address="Calle 93 # 14-10, Chicó")) != first
+    assert resolver.resolve(**listing("ciencuadras", "3", bedrooms=3)) != first
+    assert resolver.resolve(**listing("ciencuadras", "4", latitude=4.75)) != first
+
+
+def test_same_portal_listings_are_not_merged():
+    resolver = EntityResolver()
+
+    assert resolver.resolve(**listing("fincaraiz", "1")) != resolver.resolve(**listing("fincaraiz", "2"))
+
+
+def test_resolve_is_stable_and_accepts_known_ids():
+    resolver = EntityResolver()
+    resolver.resolve(**listing("fincaraiz", "1"), canonical_id="p-existing")
+
+    assert resolver.resolve(**listing("fincaraiz", "1")) == "p-existing"
+    assert resolver.resolve(**listing("metrocuadrado", "9")) == "p-existing"
+    assert len(resolver) == 2
+
+
+def test_pipeline_sets_property_id():
+    pipeline = EntityResolutionPipeline()
+    item = listing("fincaraiz", "1", url="https://example.com/1")
+
+    result = pipeline.process_item(item, spider=None)
+
+    assert result["property_id"].startswith("p")
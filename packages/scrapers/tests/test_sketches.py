@@ -0,0 +1,98 @@
+import random
+from unittest.mock import Mock
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from propfair_scrapers.pipelines import ValidationPipeline
+from propfair_scrapers.sketches import OutlierSketches, QuantileSketch
+
+
+def rental(price, area, neighborhood="Chicó", external_id="1"):
+    return {
+        "external_id": external_id,
+        "source": "fincaraiz",
+        "url": "https://example.com/1",
+        "title": "Apartamento",
+        "price": price,
+        "bedrooms": 2,
+        "bathrooms": 2,
+        "parking_spaces": 1,
+        "area": area,
+        "address": "Calle 93",
+        "neighborhood": neighborhood,
+        "city": "Bogotá",
+        "latitude": 4.67,
+        "longitude": -74.05,
+    }
+
+
+def warm(pipeline, count=200, neighborhood="Chicó"):
+    rng = random.Random(1)
+    for n in range(count):
+        area = rng.uniform(50, 120)
+        pipeline.process_item(rental(int(area * rng.uniform(45000, 65000)), area, neighborhood, str(n)), None)
+
+
+def test_quantile_sketch_is_within_relative_accuracy():
+    sketch = QuantileSketch(relative_accuracy=0.02)
+    for value in range(1, 10001):
+        sketch.add(value)
+
+    assert sketch.quantile(0.5) == pytest.approx(5000, rel=0.03)
+    assert sketch.quantile(0.9) == pytest.approx(9000, rel=0.03)
+    assert len(sketch.buckets) < 500
+
+
+def test_sketches_wait_for_min_count():
+    sketches = OutlierSketches(min_count=30)
+    for _ in range(10):
+        sketches.add(rental(3000000, 60))
+
+    assert sketches.check(rental(900000000, 6)) == []
+
+
+def test_validation_drops_outliers_with_reasons_in_stats():
+    stats = Mock()
+    pipeline = ValidationPipeline(stats=stats)
+    warm(pipeline)
+
+    with pytest.raises(DropItem, match="area_low"):
+        pipeline.process_item(rental(4000000, 6), None)
+    with pytest.raises(DropItem, match="price_high"):
+        pipeline.process_item(rental(850000000, 80), None)
+    assert pipeline.process_item(rental(4500000, 80), None)
+
+    stats.inc_value.assert_any_call("validation/outliers/area_low")
+    stats.inc_value.assert_any_call("validation/outliers/price_high")
+    stats.inc_value.assert_any_call("validation/dropped/outlier")
+
+
+def test_validation_flags_outliers_when_configured():
+    pipeline = ValidationPipeline(outlier_action="flag")
+    warm(pipeline)
+
+    item = pipeline.process_item(rental(4000000, 6), None)
+
+    assert "area_low" in item["outlier_reasons"]
+
+
+def test_unknown_neighborhood_falls_back_to_city_range():
+    pipeline = ValidationPipeline()
+    warm(pipeline)
+
+    with pytest.raises(DropItem):
+        pipeline.process_item(rental(850000000, 80, neighborhood="Nuevo"), None)
+
+
+def test_sketches_persist_between_runs(tmp_path):
+    path = tmp_path / "sketches.json"
+    first = ValidationPipeline(sketch_path=str(path))
+    warm(first)
+    first.close_spider(Mock())
+
+    second = ValidationPipeline(sketch_path=str(path))
+    second.open_spider(Mock())
+
+    with pytest.raises(DropItem):
+        second.process_item(rental(4000000, 6), None)
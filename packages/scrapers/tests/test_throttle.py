@@ -0,0 +1,174 @@
+import json
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from propfair_scrapers.throttle import DomainThrottle
+
+
+def make_throttle(**kwargs):
+    options = {
+        "delay": 1.0,
+        "concurrency": 4,
+        "min_delay": 0.1,
+        "max_delay": 10.0,
+        "min_concurrency": 1,
+        "max_concurrency": 8,
+        "target_latency": 1.0,
+    }
+    options.update(kwargs)
+    return DomainThrottle(**options)
+
+
+def test_ban_signal_halves_concurrency_and_doubles_delay():
+    throttle = make_throttle()
+
+    assert throttle.observe(latency=0.2, banned=True) == "backoff"
+    assert throttle.concurrency == 2
+    assert throttle.delay == 2.0
+
+
+def test_retry_after_sets_delay_floor_within_bounds():
+    throttle = make_throttle()
+
+    throttle.observe(banned=True, retry_after=7)
+    assert throttle.delay == 7.0
+
+    throttle.observe(banned=True, retry_after=120)
+    assert throttle.delay == 10.0
+
+
+def test_slow_responses_back_off_gradually():
+    throttle = make_throttle()
+
+    assert throttle.observe(latency=3.0) == "slowdown"
+    assert throttle.concurrency == 3
+    assert throttle.delay == 1.5
+
+
+def test_slow_render_time_backs_off():
+    throttle = make_throttle(target_render_time=4.0)
+
+    assert throttle.observe(latency=3.0, rendered=True) is None
+    assert throttle.observe(latency=12.0, rendered=True) == "slowdown"
+
+
+def test_healthy_site_speeds_up_to_bounds():
+    throttle = make_throttle()
+
+    decisions = [throttle.observe(latency=0.1) for _ in range(200)]
+
+    assert "speedup" in decisions
+    assert throttle.concurrency == 8
+    assert throttle.delay == 0.1
+
+
+def test_no_speedup_while_error_rate_is_high():
+    throttle = make_throttle()
+    throttle.observe(banned=True)
+
+    decisions = [throttle.observe(latency=0.1) for _ in range(5)]
+
+    assert "speedup" not in decisions
+
+
+class SlowdownHandler(BaseHTTPRequestHandler):
+    """Fast for the first requests, then slow, then rate-limited."""
+
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).requests += 1
+            count = self.requests
+        if count > 30:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if count > 15:
+            time.sleep(0.3)
+        body = f"<html><body>page {count}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+CRAWL_SCRIPT = """
+import json, sys
+import scrapy
+from scrapy.crawler import CrawlerProcess
+
+class PagesSpider(scrapy.Spider):
+    name = "pages"
+
+    async def start(self):
+        for n in range(40):
+            yield scrapy.Request(f"{sys.argv[1]}/page/{n}", dont_filter=True)
+
+    def parse(self, response):
+        pass
+
+process = CrawlerProcess({
+    "ADAPTIVE_THROTTLE_ENABLED": True,
+    "ADAPTIVE_THROTTLE_MIN_DELAY": 0,
+    "ADAPTIVE_THROTTLE_MAX_DELAY": 0.5,
+    "ADAPTIVE_THROTTLE_MAX_CONCURRENCY": 8,
+    "ADAPTIVE_THROTTLE_TARGET_LATENCY": 0.1,
+    "ADAPTIVE_THROTTLE_BAN_STATUSES": [429],
+    "DOWNLOADER_MIDDLEWARES": {"propfair_scrapers.throttle.AdaptiveThrottleMiddleware": 560},
+    "RETRY_ENABLED": False,
+    "DOWNLOAD_DELAY": 0,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+    "LOG_LEVEL": "ERROR",
+})
+crawler = process.create_crawler(PagesSpider)
+process.crawl(crawler)
+process.start()
+stats = {k: v for k, v in crawler.stats.get_stats().items() if k.startswith("throttle/")}
+with open(sys.argv[2], "w") as f:
+    json.dump(stats, f)
+"""
+
+
+@pytest.fixture
+def slowdown_server():
+    SlowdownHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowdownHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_crawl_adapts_to_local_server_slowdown(slowdown_server, tmp_path):
+    output = tmp_path / "stats.json"
+    src = Path(__file__).resolve().parents[1] / "src"
+    subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(CRAWL_SCRIPT), slowdown_server, str(output)],
+        check=True,
+        timeout=60,
+        env={"PYTHONPATH": str(src), "PATH": ""},
+    )
+    stats = json.loads(output.read_text())
+    slot = "throttle/127.0.0.1"
+
+    assert stats[f"{slot}/speedup"] >= 1
+    assert stats[f"{slot}/slowdown"] >= 1
+    assert stats[f"{slot}/backoff"] >= 1
+    assert stats["throttle/ban_signals"] == stats[f"{slot}/backoff"]
+    assert stats[f"{slot}/concurrency"] == 1
+    assert stats[f"{slot}/delay"] == 0.5